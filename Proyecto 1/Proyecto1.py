@@ -1,6 +1,15 @@
 import pandas as pd
+import argparse
+import contextlib
 import os
 
+from almacen import Tabla, TablaColumnar, is_id_field, get_modifiable_fields, generate_new_id
+from persistencia import (ARCHIVOS, escribir_atomico, escribir_feather, escribir_json, feather, feather_vigente,
+                          guardar_feather, guardar_tabla_csv, leer_feather, leer_json, leer_json_df)
+from wal import Compactador, RegistroWAL, reproducir_wal
+from consultas import Esquema, MontosVentas
+from importador import importar
+
 # Carpeta base
 # Usar ruta raw string o construirla con os.path.join para evitar escapes de backslash
 # He optado por usar os.path.join para mayor portabilidad
@@ -8,140 +17,294 @@ BASE = os.path.expanduser(r"~")
 CARPETA = os.path.join(BASE, "OneDrive", "Escritorio", "IA 2°año", "modelizado de mineria de datos", "Proyecto", "Proyecto 1")
 
 
-# Helpers para campos ID y generación de nuevos IDs
-def is_id_field(field_name: str) -> bool:
-    """Devuelve True si el nombre del campo parece ser un identificador (ej. 'id', 'id_cliente', 'ID')."""
-    if not isinstance(field_name, str):
-        return False
-    n = field_name.strip().lower()
-    # Reglas simples: empieza por 'id' o contiene 'id_' o termina en '_id' o es exactamente 'id'
-    return n == "id" or n.startswith("id") or n.startswith("id_") or n.endswith("_id") or ("id" in n and n.startswith("id"))
-
-
-def get_modifiable_fields(registro: dict) -> list:
-    """Devuelve la lista de campos que pueden modificarse (excluye campos id)."""
-    return [f for f in registro.keys() if not is_id_field(f)]
-
-
-def generate_new_id(tabla: list, id_field: str):
-    """Intenta generar un nuevo id entero a partir del máximo existente + 1.
-    Si no puede, devuelve la longitud actual (como fallback) o cadena vacía si no aplica.
-    """
-    try:
-        valores = [r.get(id_field) for r in tabla if id_field in r]
-        nums = []
-        for v in valores:
-            try:
-                nums.append(int(v))
-            except Exception:
-                # Ignorar valores no convertibles
-                pass
-        if nums:
-            return max(nums) + 1
+def leer_tabla(nombre, columnas=None):
+    """Lee una tabla como DataFrame. Usa la instantánea .feather si es más nueva
+    que el CSV; si no, lee el CSV y regenera la instantánea para el próximo arranque.
+    `columnas` permite leer sólo algunas columnas."""
+    ruta = os.path.join(CARPETA, ARCHIVOS.get(nombre, f"{nombre}.csv"))
+    if feather_vigente(ruta):
+        return leer_feather(ruta, columnas)
+    df = pd.read_csv(ruta)
+    if feather is not None:
+        try:
+            escribir_feather(df, ruta)
+        except Exception as e:
+            print(f" No se pudo generar {nombre}.feather:", e)
+    return df[columnas] if columnas else df
+
+
+# Leer CSV y convertir en tablas indexadas por clave primaria ---
+def cargar_tablas(columnar=False):
+    """Carga las 11 tablas. Con columnar=True usa TablaColumnar (columnas tipadas)
+    en lugar de un dict por registro, para tablas que no entran en memoria como dicts.
+    Después de leer los CSV reproduce lo que haya quedado en el WAL (cambios.wal)."""
+    tablas = {}
+    for nombre in ARCHIVOS:
+        df = leer_tabla(nombre)
+        if columnar:
+            tablas[nombre] = TablaColumnar(nombre, df)
         else:
-            return len(tabla) + 1
-    except Exception:
-        return ""
-
-# Leer CSV y convertir en diccionarios ---
-def cargar_tablas():
-    tablas = {
-    "clientes": pd.read_csv(os.path.join(CARPETA, "clientes.csv")).to_dict(orient="records"),
-    "localidades": pd.read_csv(os.path.join(CARPETA, "localidades.csv")).to_dict(orient="records"),
-    "provincias": pd.read_csv(os.path.join(CARPETA, "provincias.csv")).to_dict(orient="records"),
-    "productos": pd.read_csv(os.path.join(CARPETA, "productos.csv")).to_dict(orient="records"),
-    "clientes_mail": pd.read_csv(os.path.join(CARPETA, "clientes_mail.csv")).to_dict(orient="records"),
-    "clientes_tel": pd.read_csv(os.path.join(CARPETA, "clientes_tel.csv")).to_dict(orient="records"),
-    "rubros": pd.read_csv(os.path.join(CARPETA, "rubros.csv")).to_dict(orient="records"),
-    "sucursales": pd.read_csv(os.path.join(CARPETA, "sucursales.csv")).to_dict(orient="records"),
-    "facturaenc": pd.read_csv(os.path.join(CARPETA, "facturas_enc.csv")).to_dict(orient="records"),
-    "facturadet": pd.read_csv(os.path.join(CARPETA, "facturas_det.csv")).to_dict(orient="records"),
-    "ventas": pd.read_csv(os.path.join(CARPETA, "ventas.csv")).to_dict(orient="records"),
-
-    }
+            tablas[nombre] = Tabla(nombre, df.to_dict(orient="records"), campos=list(df.columns))
+    reproducir_wal(tablas, CARPETA)
     return tablas
 
 
-# Guardar todas las tablas en CSV
-def guardar_todo(tablas):
+def guardar_tabla(tabla, nombre):
+    """Guarda una tabla en su CSV escribiendo sólo los cambios (ver guardar_tabla_csv)."""
+    fname = ARCHIVOS.get(nombre, f"{nombre}.csv")
+    if tabla.wal is None:
+        return guardar_tabla_csv(tabla, os.path.join(CARPETA, fname))
+    # No escribir el archivo al mismo tiempo que la compactación del WAL
+    with tabla.wal.escritura, tabla.cerrojo():
+        return guardar_tabla_csv(tabla, os.path.join(CARPETA, fname))
+
+
+# Guardar todas las tablas en CSV (sólo las que cambiaron)
+def guardar_todo(tablas, wal=None):
     print("\n Guardando todos los cambios (CSV)...")
-    # Guardar CSV por cada tabla conocida (si existe en el dict)
-    mapping = {
-        "clientes": "clientes.csv",
-        "localidades": "localidades.csv",
-        "provincias": "provincias.csv",
-        "productos": "productos.csv",
-        "clientes_mail": "clientes_mail.csv",
-        "clientes_tel": "clientes_tel.csv",
-        "rubros": "rubros.csv",
-        "sucursales": "sucursales.csv",
-        "facturaenc": "facturas_enc.csv",
-        "facturadet": "facturas_det.csv",
-        "ventas": "ventas.csv",
-    }
-
-    for key, fname in mapping.items():
+    if wal is not None:
+        # Con WAL, guardar todo es compactar: escribe los CSV y vacía el log
+        for key, resultado in wal.compactar(tablas):
+            print(f"  {key}: {resultado}")
+        print(" Archivos CSV actualizados correctamente.\n")
+        return
+
+    for key in ARCHIVOS:
         if key in tablas:
-            pd.DataFrame(tablas[key]).to_csv(os.path.join(CARPETA, fname), index=False)
+            resultado = guardar_tabla(tablas[key], key)
+            if resultado != "sin cambios":
+                print(f"  {key}: {resultado}")
 
     print(" Archivos CSV actualizados correctamente.\n")
 
 
-def exportar_tabla_json(tabla, nombre):
-    """Exporta una tabla (lista de dicts) a un archivo JSON en la carpeta CARPETA."""
-    import json
-    ruta = os.path.join(CARPETA, f"{nombre}.json")
+def guardar_todo_feather(tablas, wal=None):
+    """Guarda todas las tablas como instantáneas Feather (arranque rápido en cargar_tablas).
+    Primero guarda los CSV, para que ambas copias tengan los mismos datos."""
+    if feather is None:
+        print(" Para guardar en Feather hay que instalar pyarrow.")
+        return
+    guardar_todo(tablas, wal)
+    print("\n Guardando todos los cambios (Feather)...")
+    for nombre, tabla in tablas.items():
+        guardar_feather(tabla, os.path.join(CARPETA, ARCHIVOS.get(nombre, f"{nombre}.csv")))
+    print(" Archivos Feather actualizados correctamente.\n")
+
+
+def exportar_tabla_json(tabla, nombre, formato="array", indentar=True):
+    """Exporta una tabla (Tabla o lista de dicts) a un archivo JSON en la carpeta CARPETA.
+
+    Los registros se escriben de a uno (ver escribir_json): formato='array' genera
+    <nombre>.json y formato='jsonl' genera <nombre>.jsonl (un registro por línea).
+    indentar=False omite la indentación y achica el archivo.
+    """
+    extension = "jsonl" if formato == "jsonl" else "json"
+    ruta = os.path.join(CARPETA, f"{nombre}.{extension}")
+    # Con WAL activo, leer la tabla sin competir con la compactación en segundo plano
+    cerrojo = tabla.cerrojo() if isinstance(tabla, Tabla) else contextlib.nullcontext()
     try:
-        with open(ruta, "w", encoding="utf-8") as f:
-            json.dump(tabla, f, ensure_ascii=False, indent=2)
+        with cerrojo:
+            escribir_atomico(ruta, lambda f: escribir_json(iter(tabla), f, formato, indentar))
         print(f" Tabla '{nombre}' exportada a {ruta}")
     except Exception as e:
         print(" Error exportando a JSON:", e)
 
 
-def guardar_todo_json(tablas):
+def cargar_tabla_json(nombre, columnar=False):
+    """Carga una tabla desde <nombre>.jsonl o <nombre>.json leyendo el archivo por partes."""
+    ruta = os.path.join(CARPETA, f"{nombre}.jsonl")
+    if not os.path.exists(ruta):
+        ruta = os.path.join(CARPETA, f"{nombre}.json")
+    if columnar:
+        return TablaColumnar(nombre, leer_json_df(ruta))
+    return Tabla(nombre, list(leer_json(ruta)))
+
+
+def guardar_todo_json(tablas, formato="array", indentar=True):
     """Guarda todas las tablas en archivos JSON en CARPETA."""
     print("\n Guardando todos los cambios (JSON)...")
     for nombre, tabla in tablas.items():
-        exportar_tabla_json(tabla, nombre)
+        exportar_tabla_json(tabla, nombre, formato, indentar)
     print(" Archivos JSON actualizados correctamente.\n")
 
 
-# Mostrar tabla con IDs 
-def mostrar_tabla(tabla, nombre):
-    if not tabla:
+def preguntar_guardado(tabla, nombre_tabla):
+    """Pregunta si se guarda la tabla ahora y en qué formato."""
+    guardar_choice = input("Guardar cambios para esta tabla ahora? (C)SV / (J)SON / (B)oth / (N)o: ").strip().lower()
+    if guardar_choice in ('c', 'b'):
+        guardar_tabla(tabla, nombre_tabla)
+        print(" Guardado CSV de la tabla.")
+    if guardar_choice in ('j', 'b'):
+        exportar_tabla_json(tabla, nombre_tabla)
+
+
+# Mostrar tabla con IDs, de a una página
+TAM_PAGINA = 20
+
+
+def mostrar_tabla(tabla, nombre, pagina=0, tam_pagina=TAM_PAGINA, claves=None, anchos=None):
+    """Muestra una página de la tabla. Sólo se leen y formatean los registros visibles.
+
+    claves: lista de claves a paginar (por ejemplo el resultado de un filtro);
+    por defecto, toda la tabla. anchos: dict de anchos de columna que se reutiliza
+    y sólo crece entre páginas, para que las columnas no salten al navegar.
+    Devuelve la cantidad de páginas.
+    """
+    total = len(tabla) if claves is None else len(claves)
+    if not total:
         print(f"\n--- {nombre.upper()} ---")
         print("No hay registros en esta tabla.")
-        return
-
-    # Obtener todas las claves del primer registro
-    campos = list(tabla[0].keys())
-    
-    # Calcular el ancho máximo para cada columna
-    anchos = {campo: len(str(campo)) for campo in campos}
-    for registro in tabla:
+        return 0
+
+    paginas = (total + tam_pagina - 1) // tam_pagina
+    pagina = max(0, min(pagina, paginas - 1))
+    inicio = pagina * tam_pagina
+    if claves is None:
+        visibles = tabla.rebanada(inicio, inicio + tam_pagina)
+    else:
+        visibles = [(c, tabla.obtener(c)) for c in claves[inicio:inicio + tam_pagina]]
+
+    # Obtener los campos de la tabla
+    campos = list(tabla.campos)
+
+    # Calcular el ancho de cada columna sólo con la página visible
+    if anchos is None:
+        anchos = {}
+    for campo in campos:
+        anchos[campo] = max(anchos.get(campo, 0), len(str(campo)))
+    for _, registro in visibles:
         for campo in campos:
             anchos[campo] = max(anchos[campo], len(str(registro.get(campo, ''))))
 
     # Imprimir encabezado
-    print(f"\n--- {nombre.upper()} ---")
+    print(f"\n--- {nombre.upper()} (página {pagina + 1}/{paginas}, {total} registros) ---")
     print("ID  " + " | ".join(f"{campo:<{anchos[campo]}}" for campo in campos))
-    print("-" * (4 + sum(anchos.values()) + (len(campos) - 1) * 3))
+    print("-" * (4 + sum(anchos[c] for c in campos) + (len(campos) - 1) * 3))
 
-    # Imprimir registros
-    for i, registro in enumerate(tabla):
+    # Imprimir registros (la primera columna es la clave primaria)
+    for clave, registro in visibles:
         valores = []
         for campo in campos:
             valor = str(registro.get(campo, ''))
             if valor.lower() == 'nan':
                 valor = '-'
             valores.append(f"{valor:<{anchos[campo]}}")
-        print(f"{i:2d}  " + " | ".join(valores))
+        print(f"{clave!s:>2}  " + " | ".join(valores))
+    return paginas
+
+
+def pagina_de(tabla, clave, tam_pagina=TAM_PAGINA):
+    """Número de página donde está el registro con esa clave (0 si no existe)."""
+    pos = tabla.posicion(clave)
+    return 0 if pos is None else pos // tam_pagina
+
+
+def navegar_tabla(tabla, nombre, tam_pagina=TAM_PAGINA):
+    """Visor paginado: siguiente/anterior, ir a página o a un ID y filtrar por campo=valor."""
+    pagina, claves, anchos = 0, None, {}
+    while True:
+        paginas = mostrar_tabla(tabla, nombre, pagina, tam_pagina, claves, anchos)
+        accion = input("\n(S)iguiente / (A)nterior / (P)ágina N / (I)r a ID / (F)iltrar / (L)impiar filtro / (V)olver: ").strip().lower()
+        if accion == "v":
+            break
+        elif accion == "s":
+            pagina = min(pagina + 1, max(paginas - 1, 0))
+        elif accion == "a":
+            pagina = max(pagina - 1, 0)
+        elif accion.startswith("p"):
+            try:
+                pagina = int(accion[1:].strip() or input("Número de página: ")) - 1
+            except ValueError:
+                print(" Ingrese un número válido.")
+        elif accion == "i":
+            valor = input("ID: ").strip()
+            if valor not in tabla:
+                print(" No existe un registro con ese ID.")
+                continue
+            if claves is None:
+                pagina = pagina_de(tabla, valor, tam_pagina)
+            else:
+                posiciones = [i for i, c in enumerate(claves) if str(c) == valor]
+                pagina = posiciones[0] // tam_pagina if posiciones else pagina
+        elif accion == "f":
+            campo = input(f"Campo ({', '.join(tabla.campos)}): ").strip()
+            if campo not in tabla.campos:
+                print(" Campo inválido.")
+                continue
+            claves = tabla.buscar(campo, input("Valor: ").strip())
+            pagina, anchos = 0, {}
+        elif accion == "l":
+            pagina, claves, anchos = 0, None, {}
+        else:
+            print("Acción no válida.")
+
+
+def menu_consultas(esquema):
+    """Consultas sobre las relaciones entre tablas (ver consultas.Esquema)."""
+    while True:
+        print("\n Consultas:")
+        print("1. Total facturado por cliente")
+        print("2. Ventas por rubro y sucursal")
+        print("3. Verificar integridad referencial")
+        print("4. Volver")
+        opcion = input("\nElige una consulta: ").strip()
+        if opcion == "1":
+            print(esquema.totales_por_cliente().to_string(index=False))
+        elif opcion == "2":
+            print(esquema.ventas_por_rubro_sucursal().to_string(index=False))
+        elif opcion == "3":
+            faltantes = esquema.verificar_integridad()
+            if not faltantes:
+                print(" Todas las claves foráneas apuntan a registros existentes.")
+            for (hija, campo), valores in faltantes.items():
+                print(f" {hija}.{campo}: {valores} no existen en la tabla referenciada.")
+        elif opcion == "4":
+            break
+        else:
+            print(" Opción inválida.")
+
+
+def importar_archivo(nombre, ruta, columnar=False, tam_lote=100_000):
+    """Importación masiva sin menú: carga las tablas, inserta o actualiza en `nombre`
+    las filas del archivo (CSV, JSON o JSON Lines) y guarda todo una sola vez.
+
+    El guardado compacta el WAL, así que lo que hubiera pendiente en el log queda
+    en los CSV antes de la importación y no se vuelve a aplicar encima de ella.
+    """
+    tablas = cargar_tablas(columnar)
+    if nombre not in tablas:
+        raise ValueError(f"No existe la tabla '{nombre}'.")
+    esquema = Esquema(tablas)
+    MontosVentas(esquema)
+    wal = RegistroWAL(CARPETA)
+    for tabla in tablas.values():
+        tabla.wal = wal
+    try:
+        resumen = importar(tablas, nombre, ruta, esquema, tam_lote)
+        print(f" {nombre}: {resumen['leidas']} filas leídas, {resumen['insertadas']} insertadas, "
+              f"{resumen['actualizadas']} actualizadas, {resumen['rechazadas']} rechazadas "
+              f"({resumen['segundos']:.1f}s, {resumen['filas_por_minuto']:,.0f} filas/min)")
+        if resumen["rechazados"]:
+            print(f" Filas rechazadas y motivo en {resumen['rechazados']}")
+        guardar_todo(tablas, wal)
+    finally:
+        wal.cerrar()
+    return resumen
 
 
 # Menú de selección 
-def menu():
-    tablas = cargar_tablas()
+def menu(columnar=False):
+    tablas = cargar_tablas(columnar)
+    esquema = Esquema(tablas)
+    # ventas.monto se calcula de facturadet × productos.precio y se mantiene al día
+    MontosVentas(esquema)
+
+    # Cada cambio queda en el WAL; un hilo lo compacta en los CSV cada tanto
+    wal = RegistroWAL(CARPETA)
+    for tabla in tablas.values():
+        tabla.wal = wal
+    compactador = Compactador(wal, tablas)
+    compactador.start()
 
     while True:
         nombres = list(tablas.keys())
@@ -152,7 +315,9 @@ def menu():
         # Opciones globales
         print(f"{len(nombres) + 1}. Guardar todo (CSV)")
         print(f"{len(nombres) + 2}. Guardar todo (JSON)")
-        print(f"{len(nombres) + 3}. Salir")
+        print(f"{len(nombres) + 3}. Guardar todo (Feather)")
+        print(f"{len(nombres) + 4}. Consultas")
+        print(f"{len(nombres) + 5}. Salir")
 
         try:
             opcion = int(input("\nElige una tabla por número: "))
@@ -162,7 +327,7 @@ def menu():
 
         # Manejar opciones globales
         if opcion == len(nombres) + 1:
-            guardar_todo(tablas)
+            guardar_todo(tablas, wal)
             continue
 
         if opcion == len(nombres) + 2:
@@ -170,7 +335,17 @@ def menu():
             continue
 
         if opcion == len(nombres) + 3:
+            guardar_todo_feather(tablas, wal)
+            continue
+
+        if opcion == len(nombres) + 4:
+            menu_consultas(esquema)
+            continue
+
+        if opcion == len(nombres) + 5:
             print(" Saliendo del programa.")
+            compactador.detener()
+            wal.cerrar()
             break
 
         if opcion < 1 or opcion > len(nombres):
@@ -183,35 +358,39 @@ def menu():
 
         # Submenú por tabla
         while True:
-            accion = input("\n(A)gregar / (M)odificar / (B)orrar / (E)xportar / (V)olver: ").strip().lower()
+            accion = input("\n(A)gregar / (M)odificar / (B)orrar / (E)xportar / (N)avegar / (V)olver: ").strip().lower()
 
             if accion == "v":
                 break
 
+            elif accion == "n":
+                navegar_tabla(tabla, nombre_tabla)
+
             elif accion == "a":
-                # Agregar: no pedir campos identificadores (id)
+                # Agregar: no pedir la clave primaria; las claves foráneas se piden y se validan
                 nuevo = {}
-                campos = list(tabla[0].keys()) if tabla else []
+                campos = list(tabla.campos)
+                foraneas = dict(esquema.foraneas_de(nombre_tabla))
                 for campo in campos:
-                    if is_id_field(campo):
+                    if campo in foraneas:
+                        nuevo[campo] = input(f"Ingrese {campo} (ID de {foraneas[campo]}): ")
+                    elif is_id_field(campo):
                         # Generar id automáticamente si es posible
                         nuevo[campo] = generate_new_id(tabla, campo)
                     else:
                         nuevo[campo] = input(f"Ingrese {campo}: ")
-                tabla.append(nuevo)
-                print(" Registro agregado con ID", len(tabla) - 1)
-                mostrar_tabla(tabla, nombre_tabla)
+                errores = esquema.validar(nombre_tabla, nuevo)
+                if errores:
+                    for error in errores:
+                        print("", error)
+                    print(" Registro no agregado.")
+                    continue
+                clave = tabla.agregar(nuevo)
+                print(" Registro agregado con ID", clave)
+                mostrar_tabla(tabla, nombre_tabla, pagina_de(tabla, clave))
 
                 # Preguntar si se desea guardar la tabla en CSV/JSON/both inmediatamente
-                guardar_choice = input("Guardar cambios para esta tabla ahora? (C)SV / (J)SON / (B)oth / (N)o: ").strip().lower()
-                if guardar_choice == 'c':
-                    pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                    print(" Guardado CSV de la tabla.")
-                elif guardar_choice == 'j':
-                    exportar_tabla_json(tabla, nombre_tabla)
-                elif guardar_choice == 'b':
-                    pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                    exportar_tabla_json(tabla, nombre_tabla)
+                preguntar_guardado(tabla, nombre_tabla)
 
             elif accion == "m":
                 try:
@@ -220,22 +399,23 @@ def menu():
                     print(" Ingrese un número válido.")
                     continue
 
-                if 0 <= idx < len(tabla):
-                    campos_mod = get_modifiable_fields(tabla[idx])
+                registro = tabla.obtener(idx)
+                if registro is not None:
+                    campos_mod = get_modifiable_fields(registro)
                     if not campos_mod:
                         print(" No hay campos modificables en este registro.")
                         continue
 
                     print("Campos modificables:")
                     for i_c, campo in enumerate(campos_mod, start=1):
-                        print(f"{i_c}. {campo} ({tabla[idx].get(campo)})")
+                        print(f"{i_c}. {campo} ({registro.get(campo)})")
                     print("T. Modificar todos los campos anteriores")
                     elec = input("Elija el número del campo a modificar (o 'T'): ").strip().lower()
                     if elec == 't':
                         for campo in campos_mod:
-                            valor = input(f"{campo} ({tabla[idx].get(campo)}): ")
+                            valor = input(f"{campo} ({registro.get(campo)}): ")
                             if valor:
-                                tabla[idx][campo] = valor
+                                tabla.actualizar(idx, {campo: valor})
                     else:
                         try:
                             sel = int(elec) - 1
@@ -244,28 +424,20 @@ def menu():
                             continue
                         if 0 <= sel < len(campos_mod):
                             campo = campos_mod[sel]
-                            valor = input(f"{campo} ({tabla[idx].get(campo)}): ")
+                            valor = input(f"{campo} ({registro.get(campo)}): ")
                             if valor:
-                                tabla[idx][campo] = valor
+                                tabla.actualizar(idx, {campo: valor})
                         else:
                             print(" Número de campo inválido.")
 
                     print(" Registro modificado.")
-                    mostrar_tabla(tabla, nombre_tabla)
+                    mostrar_tabla(tabla, nombre_tabla, pagina_de(tabla, idx))
 
                     # Opciones de guardado al modificar
-                    guardar_choice = input("Guardar cambios para esta tabla ahora? (C)SV / (J)SON / (B)oth / (N)o: ").strip().lower()
-                    if guardar_choice == 'c':
-                        pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                        print(" Guardado CSV de la tabla.")
-                    elif guardar_choice == 'j':
-                        exportar_tabla_json(tabla, nombre_tabla)
-                    elif guardar_choice == 'b':
-                        pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                        exportar_tabla_json(tabla, nombre_tabla)
+                    preguntar_guardado(tabla, nombre_tabla)
 
                 else:
-                    print(" ID fuera de rango.")
+                    print(" No existe un registro con ese ID.")
 
             elif accion == "b":
                 try:
@@ -274,26 +446,18 @@ def menu():
                     print(" Ingrese un número válido.")
                     continue
 
-                if 0 <= idx < len(tabla):
+                registro = tabla.obtener(idx)
+                if registro is not None:
                     # No borrar/alterar campos id: vaciar solo campos modificables
-                    campos_no_id = get_modifiable_fields(tabla[idx])
-                    for campo in campos_no_id:
-                        tabla[idx][campo] = ""
+                    campos_no_id = get_modifiable_fields(registro)
+                    tabla.actualizar(idx, {campo: "" for campo in campos_no_id})
                     print(f" Registro ID {idx} vaciado (campos no id).")
-                    mostrar_tabla(tabla, nombre_tabla)
+                    mostrar_tabla(tabla, nombre_tabla, pagina_de(tabla, idx))
 
                     # Preguntar guardar tras borrar/vaciar campos
-                    guardar_choice = input("Guardar cambios para esta tabla ahora? (C)SV / (J)SON / (B)oth / (N)o: ").strip().lower()
-                    if guardar_choice == 'c':
-                        pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                        print(" Guardado CSV de la tabla.")
-                    elif guardar_choice == 'j':
-                        exportar_tabla_json(tabla, nombre_tabla)
-                    elif guardar_choice == 'b':
-                        pd.DataFrame(tabla).to_csv(os.path.join(CARPETA, f"{nombre_tabla}.csv"), index=False)
-                        exportar_tabla_json(tabla, nombre_tabla)
+                    preguntar_guardado(tabla, nombre_tabla)
                 else:
-                    print(" ID fuera de rango.")
+                    print(" No existe un registro con ese ID.")
 
             elif accion == "e":
                 # Exportar tabla a JSON
@@ -305,4 +469,17 @@ def menu():
 
 
 if __name__ == "__main__":
-    menu()
+    # python Proyecto1.py [--columnar]                        -> menú interactivo
+    # python Proyecto1.py [--columnar] importar TABLA ARCHIVO  -> importación masiva
+    parser = argparse.ArgumentParser(description="Gestión de las tablas del Proyecto 1.")
+    parser.add_argument("--columnar", action="store_true", help="almacenamiento en columnas tipadas")
+    comandos = parser.add_subparsers(dest="comando")
+    parser_importar = comandos.add_parser("importar", help="insertar o actualizar registros desde un CSV/JSON")
+    parser_importar.add_argument("tabla", choices=list(ARCHIVOS))
+    parser_importar.add_argument("archivo")
+    parser_importar.add_argument("--lote", type=int, default=100_000, help="filas por lote (100000)")
+    args = parser.parse_args()
+    if args.comando == "importar":
+        importar_archivo(args.tabla, args.archivo, args.columnar, args.lote)
+    else:
+        menu(columnar=args.columnar)
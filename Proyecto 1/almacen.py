@@ -0,0 +1,742 @@
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+
+# Helpers para campos ID y generación de nuevos IDs
+def is_id_field(field_name: str) -> bool:
+    """Devuelve True si el nombre del campo parece ser un identificador (ej. 'id', 'id_cliente', 'ID')."""
+    if not isinstance(field_name, str):
+        return False
+    n = field_name.strip().lower()
+    # Reglas simples: empieza por 'id' o contiene 'id_' o termina en '_id' o es exactamente 'id'
+    return n == "id" or n.startswith("id") or n.startswith("id_") or n.endswith("_id") or ("id" in n and n.startswith("id"))
+
+
+def get_modifiable_fields(registro: dict) -> list:
+    """Devuelve la lista de campos que pueden modificarse (excluye campos id)."""
+    return [f for f in registro.keys() if not is_id_field(f)]
+
+
+def generate_new_id(tabla, id_field: str):
+    """Intenta generar un nuevo id entero a partir del máximo existente + 1.
+    Si no puede, devuelve la longitud actual (como fallback) o cadena vacía si no aplica.
+    Con una Tabla usa el máximo que ésta mantiene, sin recorrer los registros.
+    """
+    if isinstance(tabla, Tabla) and id_field in tabla.campos:
+        return tabla.siguiente_id(id_field)
+    try:
+        valores = [r.get(id_field) for r in tabla if id_field in r]
+        nums = []
+        for v in valores:
+            try:
+                nums.append(int(v))
+            except Exception:
+                # Ignorar valores no convertibles
+                pass
+        if nums:
+            return max(nums) + 1
+        else:
+            return len(tabla) + 1
+    except Exception:
+        return ""
+
+
+def _como_entero(valor):
+    """Devuelve el valor como int si es convertible, o None."""
+    try:
+        return int(valor)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def normalizar_clave(valor):
+    """Forma en que se indexan las claves: int si es convertible ('3', 3.0 -> 3), si no el valor tal cual."""
+    entero = _como_entero(valor)
+    return entero if entero is not None else valor
+
+
+class Tabla:
+    """Tabla en memoria con índice hash sobre la clave primaria.
+
+    La clave primaria es el primer campo que cumple is_id_field(). Los registros
+    se guardan en una lista y el índice mapea clave -> posición, así que buscar,
+    modificar o borrar por clave no depende del tamaño de la tabla. Para cada
+    campo id se mantiene además el máximo entero visto, de modo que generar un
+    id nuevo tampoco recorre los registros.
+
+    Todas las modificaciones pasan por agregar/actualizar/borrar, que anotan el
+    cambio para el guardado incremental y, si la tabla tiene un registro WAL
+    asociado (atributo wal), lo escriben en el log. Otros componentes (índices de
+    claves foráneas, agregados materializados) se enteran con suscribir().
+    """
+
+    wal = None  # RegistroWAL asociado (ver wal.py)
+    observadores = ()  # funciones avisadas de cada cambio (ver suscribir)
+
+    def __init__(self, nombre, registros=None, campos=None):
+        registros = registros if registros is not None else []
+        self.nombre = nombre
+        if campos is None:
+            campos = list(registros[0].keys()) if registros else []
+        self.campos = list(campos)
+        self.id_field = next((c for c in self.campos if is_id_field(c)), None)
+        self._filas = []      # registros (dict) o None si la posición fue borrada
+        self._indice = {}     # clave primaria -> posición en _filas
+        self._borrados = 0
+        self._insertados = 0  # clave de respaldo para tablas sin campo id
+        self._max = {c: None for c in self.campos if is_id_field(c)}
+        for registro in registros:
+            self._anexar(dict(registro))
+        self.marcar_guardada()
+
+    # --- acceso ---
+    def __len__(self):
+        return len(self._indice)
+
+    def __iter__(self):
+        return (r for r in self._filas if r is not None)
+
+    def __contains__(self, clave):
+        return self._clave(clave) in self._indice
+
+    def claves(self):
+        """Devuelve las claves primarias en orden de inserción."""
+        return list(self._indice.keys())
+
+    def obtener(self, clave):
+        """Devuelve el registro con esa clave primaria o None si no existe."""
+        pos = self._indice.get(self._clave(clave))
+        return None if pos is None else self._filas[pos]
+
+    def registros(self):
+        """Devuelve los registros vivos como lista de dicts."""
+        return list(self)
+
+    def a_dataframe(self):
+        return pd.DataFrame(self.registros(), columns=self.campos)
+
+    def filas(self, claves):
+        """DataFrame con los registros de esas claves, en ese orden."""
+        return pd.DataFrame([self.obtener(c) for c in claves], columns=self.campos)
+
+    def rebanada(self, inicio, fin):
+        """Pares (clave, registro) de las posiciones [inicio, fin), sin recorrer el resto."""
+        with self.cerrojo():
+            if self._borrados:
+                self._compactar()
+            registros = self._filas[inicio:fin]
+            if self.id_field:
+                claves = [self._clave(r[self.id_field]) for r in registros]
+            else:
+                claves = list(self._indice)[inicio:fin]
+        return list(zip(claves, registros))
+
+    def posicion(self, clave):
+        """Posición (0..len-1) del registro con esa clave, o None."""
+        with self.cerrojo():
+            if self._borrados:
+                self._compactar()
+            return self._indice.get(self._clave(clave))
+
+    def buscar(self, campo, valor):
+        """Claves de los registros cuyo campo, como texto, es igual a valor."""
+        valor = str(valor)
+        return [clave for clave, r in zip(self.claves(), self) if str(r.get(campo, "")) == valor]
+
+    # --- seguimiento de cambios desde el último guardado ---
+    def marcar_guardada(self):
+        """Olvida los cambios pendientes (la tabla coincide con su archivo)."""
+        self._agregadas = {}  # claves agregadas, en orden (dict como conjunto ordenado)
+        self._modificadas = set()
+        self._reescribir = False
+
+    def marcar_sucia(self):
+        """Fuerza que el próximo guardado reescriba el archivo completo."""
+        self._reescribir = True
+
+    def tiene_cambios(self):
+        return bool(self._agregadas or self._modificadas or self._reescribir)
+
+    def solo_agregados(self):
+        """True si desde el último guardado sólo se agregaron registros."""
+        return bool(self._agregadas) and not self._modificadas and not self._reescribir
+
+    def claves_agregadas(self):
+        return list(self._agregadas)
+
+    def suscribir(self, funcion):
+        """Registra funcion(tabla, operacion, clave, datos), llamada después de cada
+        agregar (datos = registro completo), actualizar (datos = cambios) o borrar."""
+        self.observadores = list(self.observadores) + [funcion]
+
+    def _registrar_cambio(self, operacion, clave, datos=None):
+        if self.wal is not None:
+            self.wal.registrar(self.nombre, operacion, clave, datos)
+        self._anotar_cambio(operacion, clave)
+        for funcion in self.observadores:
+            funcion(self, operacion, clave, datos)
+
+    def _anotar_cambio(self, operacion, clave):
+        if operacion == "agregar":
+            self._agregadas[clave] = None
+        elif operacion == "actualizar":
+            # Un registro nuevo modificado se sigue guardando como agregado
+            if clave not in self._agregadas:
+                self._modificadas.add(clave)
+        elif clave in self._agregadas:
+            del self._agregadas[clave]
+        else:
+            self._modificadas.discard(clave)
+            self._reescribir = True
+
+    def cerrojo(self):
+        # Con WAL, las modificaciones comparten su cerrojo con la compactación en segundo plano
+        return self.wal.bloqueo if self.wal is not None else contextlib.nullcontext()
+
+    def siguiente_id(self, campo=None):
+        """Máximo + 1 del campo id (por defecto la clave primaria), igual que generate_new_id()."""
+        campo = campo or self.id_field
+        maximo = self._max.get(campo)
+        return maximo + 1 if maximo is not None else len(self) + 1
+
+    # --- modificación ---
+    def agregar(self, registro):
+        """Agrega un registro y devuelve su clave. Si no trae clave primaria se genera una."""
+        with self.cerrojo():
+            clave = self._agregar(registro)
+            self._registrar_cambio("agregar", clave, self.obtener(clave))
+        return clave
+
+    def actualizar(self, clave, cambios):
+        """Modifica campos del registro con esa clave. La clave primaria no puede cambiar."""
+        with self.cerrojo():
+            registro = self._actualizar(clave, cambios)
+            self._registrar_cambio("actualizar", self._clave(clave), dict(cambios))
+        return registro
+
+    def borrar(self, clave):
+        """Elimina el registro con esa clave primaria."""
+        with self.cerrojo():
+            self._borrar(clave)
+            self._registrar_cambio("borrar", self._clave(clave))
+
+    def asignar_columna(self, campo, valores):
+        """Asigna en bloque {clave: valor} en un campo (recálculos masivos, importaciones).
+
+        No escribe en el WAL ni avisa registro por registro: marca la tabla para
+        reescribirla en el próximo guardado y avisa a los observadores una sola
+        vez con la operación 'recargar'.
+        """
+        if not valores:
+            return
+        with self.cerrojo():
+            self._asignar_columna(campo, valores)
+            self.marcar_sucia()
+            self.notificar_recarga()
+
+    def cargar_lote(self, df, avisar=True):
+        """Inserta o actualiza en bloque las filas de un DataFrame (upsert por clave primaria).
+
+        Si una clave aparece más de una vez gana la última fila. Las filas nuevas
+        quedan anotadas como agregadas (el guardado puede anexarlas al CSV) y las
+        existentes como modificadas. En las existentes un valor vacío no pisa el
+        dato actual (un JSON puede omitir campos); a las nuevas les quedan vacíos. Como asignar_columna(), no escribe en el WAL: los cambios
+        quedan en disco con el próximo guardado. Con avisar=False no se avisa a
+        los observadores, para hacerlo una sola vez al final de una importación
+        (notificar_recarga). Devuelve (insertados, actualizados).
+        """
+        desconocidos = [c for c in df.columns if c not in self.campos]
+        if desconocidos:
+            raise ValueError(f"Campos desconocidos en '{self.nombre}': {', '.join(map(str, desconocidos))}.")
+        if self.id_field:
+            if self.id_field not in df.columns:
+                raise ValueError(f"Falta la clave primaria '{self.id_field}'.")
+            df = df.drop_duplicates(subset=self.id_field, keep="last")
+        with self.cerrojo():
+            insertados, actualizados = self._cargar_lote(df)
+            if avisar and (insertados or actualizados):
+                self.notificar_recarga()
+        return insertados, actualizados
+
+    def notificar_recarga(self):
+        """Avisa a los observadores que la tabla cambió en bloque (operación 'recargar')."""
+        for funcion in self.observadores:
+            funcion(self, "recargar", None, None)
+
+    def _asignar_columna(self, campo, valores):
+        for clave, valor in valores.items():
+            self._filas[self._posicion(clave)][campo] = valor
+            self._actualizar_max(campo, valor)
+
+    def _cargar_lote(self, df):
+        insertados = actualizados = 0
+        # Los faltantes quedan como NaN, igual que al leer el CSV
+        df = df.astype(object).where(df.notna(), float("nan"))
+        for registro in df.to_dict(orient="records"):
+            pos = self._indice.get(self._clave(registro[self.id_field])) if self.id_field else None
+            if pos is None:
+                clave = self._anexar({c: registro.get(c, "") for c in self.campos})
+                self._agregadas[clave] = None
+                insertados += 1
+            else:
+                cambios = {c: v for c, v in registro.items() if not _es_vacio(v)}
+                self._filas[pos].update(cambios)
+                for campo in self._max:
+                    self._actualizar_max(campo, cambios.get(campo))
+                self._anotar_cambio("actualizar", self._clave(registro[self.id_field]))
+                actualizados += 1
+        return insertados, actualizados
+
+    def _agregar(self, registro):
+        registro = {c: registro.get(c, "") for c in self.campos} if self.campos else dict(registro)
+        if not self.campos:
+            self.campos = list(registro.keys())
+            self.id_field = next((c for c in self.campos if is_id_field(c)), None)
+            self._max = {c: None for c in self.campos if is_id_field(c)}
+        if self.id_field and registro.get(self.id_field) in (None, ""):
+            registro[self.id_field] = self.siguiente_id()
+        return self._anexar(registro)
+
+    def _actualizar(self, clave, cambios):
+        pos = self._posicion(clave)
+        if self.id_field in cambios and self._clave(cambios[self.id_field]) != self._clave(clave):
+            raise ValueError(f"No se puede modificar la clave primaria '{self.id_field}'.")
+        registro = self._filas[pos]
+        for campo, valor in cambios.items():
+            registro[campo] = valor
+            self._actualizar_max(campo, valor)
+        return registro
+
+    def _borrar(self, clave):
+        clave = self._clave(clave)
+        pos = self._posicion(clave)
+        del self._indice[clave]
+        self._filas[pos] = None
+        self._borrados += 1
+        # Compactar cuando la mitad de las posiciones son huecos
+        if self._borrados > 1024 and self._borrados * 2 > len(self._filas):
+            self._compactar()
+
+    # --- internos ---
+    def _clave(self, valor):
+        return normalizar_clave(valor)
+
+    def _posicion(self, clave):
+        try:
+            return self._indice[self._clave(clave)]
+        except KeyError:
+            raise KeyError(f"No existe un registro con {self.id_field or 'ID'} = {clave} en '{self.nombre}'.") from None
+
+    def _actualizar_max(self, campo, valor):
+        if campo not in self._max:
+            return
+        entero = _como_entero(valor)
+        if entero is not None and (self._max[campo] is None or entero > self._max[campo]):
+            self._max[campo] = entero
+
+    def _anexar(self, registro):
+        # Sin campo id la clave es el orden de inserción
+        clave = self._clave(registro[self.id_field]) if self.id_field else self._insertados
+        if clave in self._indice:
+            raise ValueError(f"Clave duplicada {clave} en '{self.nombre}'.")
+        self._indice[clave] = len(self._filas)
+        self._filas.append(registro)
+        self._insertados += 1
+        for campo in self._max:
+            self._actualizar_max(campo, registro.get(campo))
+        return clave
+
+    def _compactar(self):
+        self._filas = [r for r in self._filas if r is not None]
+        if self.id_field:
+            self._indice = {self._clave(r[self.id_field]): i for i, r in enumerate(self._filas)}
+        else:
+            self._indice = {clave: i for i, clave in enumerate(self._indice)}
+        self._borrados = 0
+
+
+def _tipo_entero(serie):
+    """Devuelve el tipo entero nullable más chico que admite los valores de la serie."""
+    valores = serie.dropna()
+    if valores.empty:
+        return "Int32"
+    minimo, maximo = valores.min(), valores.max()
+    for tipo, limite in (("Int8", 2 ** 7), ("Int16", 2 ** 15), ("Int32", 2 ** 31)):
+        if -limite <= minimo and maximo < limite:
+            return tipo
+    return "Int64"
+
+
+def _ampliar_entero(tipo, minimo, maximo):
+    """Tipo entero para una columna de tipo `tipo` que además debe admitir valores
+    entre minimo y maximo: el mismo si entran; si no, el más chico que los admite.
+    Nunca achica la columna y no la recorre (sólo mira los límites del tipo)."""
+    limites = np.iinfo(getattr(tipo, "numpy_dtype", tipo))
+    if limites.min <= minimo and maximo <= limites.max:
+        return str(tipo)
+    anchos = ["Int8", "Int16", "Int32", "Int64"]
+    actual = anchos.index({1: "Int8", 2: "Int16", 4: "Int32"}.get(limites.bits // 8, "Int64"))
+    return anchos[max(actual, anchos.index(_tipo_entero(pd.Series([minimo, maximo]))))]
+
+
+def tipar_columnas(df, esquema=None):
+    """Convierte un DataFrame leído del CSV a tipos compactos.
+
+    Los campos id pasan a enteros nullable de al menos 32 bits, el resto de los
+    enteros al tipo más chico posible y los textos repetitivos a 'category'.
+    El parámetro esquema ({columna: dtype}) permite fijar tipos explícitos.
+    """
+    esquema = esquema or {}
+    df = df.copy()
+    for campo in df.columns:
+        serie = df[campo]
+        if campo in esquema:
+            df[campo] = serie.astype(esquema[campo])
+        elif pd.api.types.is_bool_dtype(serie):
+            continue
+        elif pd.api.types.is_numeric_dtype(serie):
+            valores = serie.dropna()
+            if pd.api.types.is_integer_dtype(serie) or (valores == valores.round()).all():
+                tipo = _tipo_entero(serie)
+                if is_id_field(campo) and tipo in ("Int8", "Int16"):
+                    tipo = "Int32"
+                df[campo] = serie.astype(tipo)
+        else:
+            texto = serie.astype("string")
+            if texto.nunique() * 2 <= len(texto):
+                df[campo] = texto.astype("category")
+            else:
+                df[campo] = texto
+    return df
+
+
+def _es_vacio(valor):
+    return valor is None or valor is pd.NA or (isinstance(valor, str) and valor == "") or (
+        isinstance(valor, float) and valor != valor)
+
+
+class TablaColumnar(Tabla):
+    """Tabla con los datos en columnas tipadas (DataFrame) en lugar de un dict por registro.
+
+    Ofrece la misma interfaz que Tabla. El índice del DataFrame es la clave
+    primaria, así que obtener/actualizar/borrar usan la tabla hash de pandas.
+    Los registros agregados se acumulan en un buffer chico y se consolidan en
+    bloque; los borrados se marcan en una máscara y se compactan luego.
+    obtener() devuelve una copia del registro: los cambios se hacen con actualizar().
+    """
+
+    LIMITE_BUFFER = 4096
+
+    def __init__(self, nombre, df, esquema=None):
+        self.nombre = nombre
+        self.campos = list(df.columns)
+        self.id_field = next((c for c in self.campos if is_id_field(c)), None)
+        self._df = tipar_columnas(df, esquema)
+        if self.id_field:
+            self._df.index = pd.Index(self._df[self.id_field].astype("int64"))
+            if not self._df.index.is_unique:
+                raise ValueError(f"Claves duplicadas en '{nombre}'.")
+        self._vivo = np.ones(len(self._df), dtype=bool)
+        self._borrados = 0
+        self._insertados = len(self._df)
+        self._nuevas = []         # registros agregados aún no consolidados
+        self._indice_nuevas = {}  # clave -> posición en _nuevas
+        self._max = {}
+        for campo in self.campos:
+            if is_id_field(campo):
+                valores = pd.to_numeric(self._df[campo], errors="coerce").dropna()
+                self._max[campo] = int(valores.max()) if not valores.empty else None
+        self.marcar_guardada()
+
+    # --- acceso ---
+    def __len__(self):
+        return len(self._df) - self._borrados + len(self._nuevas)
+
+    def _vista(self):
+        """DataFrame con los registros vivos (consolida el buffer antes)."""
+        with self.cerrojo():
+            self._consolidar()
+            return self._df[self._vivo] if self._borrados else self._df
+
+    def __iter__(self):
+        df = self._vista()
+        # Recorrer por bloques para no materializar todos los registros a la vez
+        for inicio in range(0, len(df), 10_000):
+            bloque = df.iloc[inicio:inicio + 10_000]
+            columnas = [self._columna_nativa(bloque[c]) for c in self.campos]
+            for valores in zip(*columnas):
+                yield dict(zip(self.campos, valores))
+
+    def __contains__(self, clave):
+        return self._buscar(clave) is not None
+
+    def claves(self):
+        return self._vista().index.tolist()
+
+    def obtener(self, clave):
+        with self.cerrojo():
+            pos = self._buscar(clave)
+            if pos is None:
+                return None
+            if isinstance(pos, tuple):
+                return {c: self._valor_nativo(v) for c, v in self._nuevas[pos[1]].items()}
+            fila = self._df.iloc[pos]
+        return {c: self._valor_nativo(fila[c]) for c in self.campos}
+
+    def a_dataframe(self):
+        return self._vista().reset_index(drop=True)
+
+    def rebanada(self, inicio, fin):
+        with self.cerrojo():
+            # Compactar primero para que las posiciones no incluyan borrados
+            self._consolidar(compactar=True)
+            bloque = self._vista().iloc[inicio:fin]
+        columnas = [self._columna_nativa(bloque[c]) for c in self.campos]
+        return list(zip(bloque.index.tolist(), (dict(zip(self.campos, v)) for v in zip(*columnas))))
+
+    def posicion(self, clave):
+        with self.cerrojo():
+            self._consolidar(compactar=True)
+            pos = self._buscar(clave)
+        return pos if isinstance(pos, int) else None
+
+    def buscar(self, campo, valor):
+        df = self._vista()
+        columna = df[campo]
+        valor = str(valor)
+        if pd.api.types.is_numeric_dtype(columna):
+            # Comparar como número sobre la columna tipada; el texto debe coincidir con el mostrado
+            try:
+                numero = float(valor)
+            except ValueError:
+                return []
+            if pd.api.types.is_integer_dtype(columna) and (not numero.is_integer() or "." in valor):
+                return []
+            mascara = (columna == numero).fillna(False).to_numpy(dtype=bool)
+        else:
+            mascara = (columna.astype("string") == valor).fillna(False).to_numpy(dtype=bool)
+        return df.index[mascara].tolist()
+
+    def filas(self, claves):
+        df = self._vista()
+        if self.id_field:
+            return df.loc[[self._clave(c) for c in claves]].reset_index(drop=True)
+        return self._df.iloc[list(claves)].reset_index(drop=True)
+
+    # --- modificación ---
+    def _agregar(self, registro):
+        registro = {c: registro.get(c, "") for c in self.campos}
+        if self.id_field and _es_vacio(registro.get(self.id_field)):
+            registro[self.id_field] = self.siguiente_id()
+        registro = {c: self._preparar(c, v) for c, v in registro.items()}
+        clave = self._clave(registro[self.id_field]) if self.id_field else self._insertados
+        if clave in self:
+            raise ValueError(f"Clave duplicada {clave} en '{self.nombre}'.")
+        if self.id_field and clave in self._df.index:
+            # La clave perteneció a un registro borrado: compactar antes de reutilizarla
+            self._consolidar(compactar=True)
+        self._indice_nuevas[clave] = len(self._nuevas)
+        self._nuevas.append(registro)
+        self._insertados += 1
+        for campo in self._max:
+            self._actualizar_max(campo, registro.get(campo))
+        if len(self._nuevas) >= self.LIMITE_BUFFER:
+            self._consolidar()
+        return clave
+
+    def _actualizar(self, clave, cambios):
+        pos = self._posicion(clave)
+        if self.id_field in cambios and self._clave(cambios[self.id_field]) != self._clave(clave):
+            raise ValueError(f"No se puede modificar la clave primaria '{self.id_field}'.")
+        if isinstance(pos, tuple):
+            self._nuevas[pos[1]].update({c: self._preparar(c, v) for c, v in cambios.items()})
+        else:
+            for campo, valor in cambios.items():
+                self._asignar(pos, campo, valor)
+        for campo, valor in cambios.items():
+            self._actualizar_max(campo, valor)
+        return self.obtener(clave)
+
+    def _asignar_columna(self, campo, valores):
+        self._consolidar()
+        posiciones = self._df.index.get_indexer([self._clave(c) for c in valores])
+        if (posiciones < 0).any():
+            raise KeyError(f"Hay claves inexistentes en '{self.nombre}'.")
+        self._asignar_posiciones(campo, posiciones, pd.Series(list(valores.values())))
+
+    def _cargar_lote(self, df):
+        # Compactar antes, para que una clave borrada no se confunda con una existente
+        self._consolidar(compactar=True)
+        df = df.reset_index(drop=True)
+        if self.id_field:
+            claves = pd.to_numeric(df[self.id_field]).astype("int64")
+            posiciones = self._df.index.get_indexer(claves)
+        else:
+            # Sin campo id la clave es la posición: todas las filas son nuevas
+            claves = pd.Series(np.arange(len(self._df), len(self._df) + len(df)))
+            posiciones = np.full(len(df), -1)
+        existentes = posiciones >= 0
+        if existentes.any():
+            for campo in df.columns:
+                if campo == self.id_field:
+                    continue
+                valores = df[campo][existentes]
+                presentes = ~(valores.isna() | (valores.astype(object) == "")).to_numpy(dtype=bool)
+                if presentes.any():
+                    self._asignar_posiciones(campo, posiciones[existentes][presentes], valores[presentes])
+            # Un registro agregado desde el último guardado se sigue guardando como agregado
+            self._modificadas.update(set(claves[existentes].tolist()) - self._agregadas.keys())
+        if not existentes.all():
+            self._anexar_df(df[~existentes])
+            if not self.id_field:
+                self._insertados += int((~existentes).sum())
+            self._agregadas.update(dict.fromkeys(claves[~existentes].tolist()))
+        return int((~existentes).sum()), int(existentes.sum())
+
+    def _borrar(self, clave):
+        pos = self._posicion(clave)
+        if isinstance(pos, tuple):
+            # Todavía en el buffer: consolidar y marcar como borrado
+            self._consolidar()
+            pos = self._posicion(clave)
+        self._vivo[pos] = False
+        self._borrados += 1
+        if self.id_field and self._borrados > 1024 and self._borrados * 2 > len(self._df):
+            self._consolidar(compactar=True)
+
+    # --- internos ---
+    def _buscar(self, clave):
+        """Posición entera en _df, ('nueva', i) si está en el buffer, o None."""
+        clave = self._clave(clave) if self.id_field else clave
+        if clave in self._indice_nuevas:
+            return ("nueva", self._indice_nuevas[clave])
+        if self.id_field:
+            try:
+                pos = self._df.index.get_loc(clave)
+            except (KeyError, TypeError):
+                return None
+        else:
+            # Sin campo id la clave es el orden de inserción
+            pos = clave if isinstance(clave, int) and 0 <= clave < len(self._df) else None
+            if pos is None:
+                return None
+        return pos if self._vivo[pos] else None
+
+    def _posicion(self, clave):
+        pos = self._buscar(clave)
+        if pos is None:
+            raise KeyError(f"No existe un registro con {self.id_field or 'ID'} = {clave} en '{self.nombre}'.")
+        return pos
+
+    def _preparar(self, campo, valor):
+        """Convierte un valor al tipo de su columna, ampliando el tipo si no entra."""
+        columna = self._df[campo]
+        if _es_vacio(valor):
+            return pd.NA if isinstance(columna.dtype, pd.api.extensions.ExtensionDtype) else float("nan")
+        if isinstance(columna.dtype, pd.CategoricalDtype):
+            valor = str(valor)
+            if valor not in columna.cat.categories:
+                self._df[campo] = columna.cat.add_categories([valor])
+            return valor
+        if not pd.api.types.is_numeric_dtype(columna):
+            return str(valor)
+        try:
+            numero = float(valor)
+        except (TypeError, ValueError):
+            # Valor no numérico: la columna pasa a texto para no perder el dato
+            self._df[campo] = columna.astype("string")
+            return str(valor)
+        if not pd.api.types.is_integer_dtype(columna):
+            return numero
+        if not numero.is_integer():
+            self._df[campo] = columna.astype("Float64")
+            return numero
+        valor = int(numero)
+        tipo = _ampliar_entero(columna.dtype, valor, valor)
+        if tipo != str(columna.dtype):
+            self._df[campo] = columna.astype(tipo)
+        return valor
+
+    def _asignar(self, pos, campo, valor):
+        valor = self._preparar(campo, valor)
+        self._df.iloc[pos, self._df.columns.get_loc(campo)] = valor
+
+    def _consolidar(self, compactar=False):
+        """Pasa el buffer de registros nuevos al DataFrame y, si se pide, descarta los borrados."""
+        # Sin campo id la clave es la posición, así que no se compacta
+        if compactar and self._borrados and self.id_field:
+            self._df = self._df[self._vivo]
+            self._vivo = self._vivo[self._vivo]
+            self._borrados = 0
+        if not self._nuevas:
+            return
+        self._anexar_df(pd.DataFrame(self._nuevas, columns=self.campos))
+        self._nuevas = []
+        self._indice_nuevas = {}
+
+    def _anexar_df(self, nuevas):
+        """Agrega al final de _df las filas de un DataFrame (sin claves repetidas), con los tipos de _df."""
+        nuevas = pd.DataFrame({campo: self._convertir(campo, nuevas[campo]) if campo in nuevas.columns
+                               else self._convertir(campo, pd.Series([None] * len(nuevas), dtype=object))
+                               for campo in self.campos})
+        if self.id_field:
+            nuevas.index = pd.Index(nuevas[self.id_field].astype("int64"))
+        else:
+            nuevas.index = range(len(self._df), len(self._df) + len(nuevas))
+        self._df = pd.concat([self._df, nuevas])
+        self._vivo = np.concatenate([self._vivo, np.ones(len(nuevas), dtype=bool)])
+        for campo in self._max:
+            self._actualizar_max(campo, pd.to_numeric(nuevas[campo], errors="coerce").max())
+
+    def _asignar_posiciones(self, campo, posiciones, valores):
+        """Asigna en bloque los valores (Series) en esas posiciones de _df."""
+        valores = self._convertir(campo, valores)
+        self._df.iloc[posiciones, self._df.columns.get_loc(campo)] = valores.array
+        if campo in self._max:
+            self._actualizar_max(campo, pd.to_numeric(valores, errors="coerce").max())
+
+    def _convertir(self, campo, valores):
+        """Convierte una serie al tipo de la columna; si no entra, amplía el tipo de la columna
+        (entero más grande, Float64 o texto), como _preparar() con un solo valor."""
+        columna = self._df[campo]
+        valores = valores.reset_index(drop=True).astype(object)
+        vacios = (valores.isna() | (valores == "")).to_numpy(dtype=bool)
+        valores = valores.mask(vacios, None)
+        if isinstance(columna.dtype, pd.CategoricalDtype):
+            texto = valores.astype("string")
+            faltantes = pd.Index(texto.dropna().unique()).difference(columna.cat.categories)
+            if len(faltantes):
+                self._df[campo] = columna.cat.add_categories(faltantes)
+            return texto.astype(self._df[campo].dtype)
+        if pd.api.types.is_numeric_dtype(columna):
+            numeros = pd.to_numeric(valores, errors="coerce")
+            if (numeros.notna() | vacios).all():
+                presentes = numeros.dropna()
+                if not pd.api.types.is_integer_dtype(columna):
+                    tipo = str(columna.dtype)
+                elif presentes.empty:
+                    tipo = str(columna.dtype)
+                elif (presentes == presentes.round()).all():
+                    tipo = _ampliar_entero(columna.dtype, presentes.min(), presentes.max())
+                else:
+                    tipo = "Float64"
+                if tipo != str(columna.dtype):
+                    self._df[campo] = columna.astype(tipo)
+                return numeros.astype(tipo)
+        # El tipo actual no admite los valores nuevos: la columna pasa a texto
+        if str(columna.dtype) != "string":
+            self._df[campo] = columna.astype("string")
+        return valores.astype("string")
+
+    @staticmethod
+    def _valor_nativo(valor):
+        if valor is pd.NA or valor is None:
+            return float("nan")
+        return valor.item() if hasattr(valor, "item") else valor
+
+    @staticmethod
+    def _columna_nativa(serie):
+        # tolist() devuelve tipos de Python; los faltantes quedan como NaN igual que en read_csv
+        return [float("nan") if v is pd.NA or v is None else v for v in serie.astype(object).tolist()]
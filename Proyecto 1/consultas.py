@@ -0,0 +1,394 @@
+import pandas as pd
+
+from almacen import normalizar_clave
+
+
+# Relaciones del esquema: (tabla, campo, tabla referenciada). El campo apunta a
+# la clave primaria de la tabla referenciada.
+CLAVES_FORANEAS = [
+    ("clientes", "id_localidad", "localidades"),
+    ("localidades", "id_provincia", "provincias"),
+    ("productos", "id_rubro", "rubros"),
+    ("facturaenc", "id_cliente", "clientes"),
+    ("facturaenc", "id_sucursal", "sucursales"),
+    ("facturadet", "id_factura_enc", "facturaenc"),
+    ("facturadet", "id_producto", "productos"),
+    ("ventas", "id_factura_enc", "facturaenc"),
+]
+
+
+def _vacio(valor):
+    return valor is None or valor is pd.NA or valor == "" or (isinstance(valor, float) and valor != valor)
+
+
+def _claves(columna):
+    """Valores de una columna normalizados como claves; una columna entera sin nulos ya lo está."""
+    if pd.api.types.is_integer_dtype(columna) and not columna.isna().any():
+        return columna.astype("int64").tolist()
+    return [normalizar_clave(v) for v in columna.tolist()]
+
+
+class IndiceForaneo:
+    """Índice hash de una clave foránea: valor -> claves de la tabla hija que lo usan.
+
+    Se construye una vez y después se mantiene con cada cambio de la tabla hija,
+    así que buscar los hijos de un registro cuesta lo mismo con 10 o 10M filas.
+    """
+
+    def __init__(self, tabla, campo):
+        self.campo = campo
+        self._hijos = {}    # valor -> set de claves de la tabla hija
+        self._valor_de = {}  # clave hija -> valor actual (para poder mover/quitar)
+        for clave, valor in zip(tabla.claves(), tabla.a_dataframe()[campo].tolist()):
+            self._agregar(clave, valor)
+
+    def hijos(self, valor):
+        return self._hijos.get(normalizar_clave(valor), set())
+
+    def valores(self):
+        return self._hijos.keys()
+
+    def aplicar(self, operacion, clave, datos):
+        if operacion == "agregar":
+            self._agregar(clave, datos.get(self.campo))
+        elif operacion == "actualizar" and self.campo in datos:
+            self._quitar(clave)
+            self._agregar(clave, datos[self.campo])
+        elif operacion == "borrar":
+            self._quitar(clave)
+
+    def _agregar(self, clave, valor):
+        if _vacio(valor):
+            return
+        valor = normalizar_clave(valor)
+        self._hijos.setdefault(valor, set()).add(clave)
+        self._valor_de[clave] = valor
+
+    def _quitar(self, clave):
+        valor = self._valor_de.pop(clave, None)
+        if valor is not None:
+            self._hijos[valor].discard(clave)
+            if not self._hijos[valor]:
+                del self._hijos[valor]
+
+
+class Esquema:
+    """Capa de consultas sobre las tablas en memoria, con las claves foráneas declaradas.
+
+    - validar(): chequeo de integridad referencial en O(1) por campo, usando el
+      índice de clave primaria de la tabla referenciada.
+    - hijos()/referencias(): registros que apuntan a uno dado, vía IndiceForaneo.
+    - unir()/agrupar(): joins vectorizados contra el índice de clave primaria del
+      padre (pandas Index, construido una vez y reutilizado mientras la tabla no
+      cambie) y agregaciones con groupby.
+    """
+
+    def __init__(self, tablas, claves_foraneas=CLAVES_FORANEAS):
+        self.tablas = tablas
+        self.claves_foraneas = [
+            (hija, campo, padre) for hija, campo, padre in claves_foraneas
+            if hija in tablas and padre in tablas and campo in tablas[hija].campos
+        ]
+        self._foraneos = {}   # (hija, campo) -> IndiceForaneo, se crean al primer uso
+        self._marcos = {}     # nombre -> DataFrame de la tabla (caché)
+        self._indices_pk = {}  # nombre -> pandas Index de la clave primaria (caché)
+        for tabla in tablas.values():
+            tabla.suscribir(self._al_cambiar)
+
+    def _al_cambiar(self, tabla, operacion, clave, datos):
+        self._marcos.pop(tabla.nombre, None)
+        self._indices_pk.pop(tabla.nombre, None)
+        for (hija, campo), indice in list(self._foraneos.items()):
+            if hija != tabla.nombre:
+                continue
+            if operacion == "recargar":
+                # Cambio en bloque: el índice se reconstruye al próximo uso
+                del self._foraneos[(hija, campo)]
+            else:
+                indice.aplicar(operacion, clave, datos)
+
+    # --- integridad referencial ---
+    def foraneas_de(self, nombre):
+        """Claves foráneas (campo, tabla referenciada) de una tabla."""
+        return [(campo, padre) for hija, campo, padre in self.claves_foraneas if hija == nombre]
+
+    def validar(self, nombre, registro):
+        """Devuelve la lista de errores de integridad del registro (vacía si es válido)."""
+        errores = []
+        for campo, padre in self.foraneas_de(nombre):
+            valor = registro.get(campo)
+            if not _vacio(valor) and valor not in self.tablas[padre]:
+                errores.append(f"{campo} = {valor} no existe en '{padre}'.")
+        return errores
+
+    def indice(self, hija, campo):
+        if (hija, campo) not in self._foraneos:
+            self._foraneos[(hija, campo)] = IndiceForaneo(self.tablas[hija], campo)
+        return self._foraneos[(hija, campo)]
+
+    def hijos(self, hija, campo, clave):
+        """Claves de los registros de `hija` cuyo `campo` apunta a `clave`."""
+        return sorted(self.indice(hija, campo).hijos(clave))
+
+    def referencias(self, nombre, clave):
+        """Registros de otras tablas que apuntan a (nombre, clave): {(hija, campo): [claves]}."""
+        refs = {}
+        for hija, campo, padre in self.claves_foraneas:
+            if padre == nombre:
+                claves = self.hijos(hija, campo, clave)
+                if claves:
+                    refs[(hija, campo)] = claves
+        return refs
+
+    def verificar_integridad(self):
+        """Valores de claves foráneas que no existen en la tabla referenciada: {(hija, campo): [valores]}."""
+        faltantes = {}
+        for hija, campo, padre in self.claves_foraneas:
+            valores = [v for v in self.indice(hija, campo).valores() if v not in self.tablas[padre]]
+            if valores:
+                faltantes[(hija, campo)] = sorted(valores, key=str)
+        return faltantes
+
+    # --- consultas ---
+    def marco(self, nombre):
+        """DataFrame de la tabla, reutilizado hasta que la tabla cambie."""
+        if nombre not in self._marcos:
+            self._marcos[nombre] = self.tablas[nombre].a_dataframe()
+        return self._marcos[nombre]
+
+    def indice_pk(self, nombre):
+        if nombre not in self._indices_pk:
+            tabla = self.tablas[nombre]
+            claves = pd.to_numeric(self.marco(nombre)[tabla.id_field], errors="coerce")
+            self._indices_pk[nombre] = pd.Index(claves)
+        return self._indices_pk[nombre]
+
+    def unir(self, izquierda, campo, padre=None, columnas=None, como="inner"):
+        """Join de `izquierda` (tabla o DataFrame) con la tabla a la que apunta `campo`.
+
+        Las columnas del padre se agregan con el prefijo '<padre>.'. El cruce usa
+        el índice de clave primaria del padre (get_indexer), sin ordenar ni
+        reconstruir tablas hash en cada consulta.
+        """
+        if isinstance(izquierda, str):
+            padre = padre or dict(self.foraneas_de(izquierda))[campo]
+            izquierda = self.marco(izquierda)
+        if padre is None:
+            raise ValueError(f"Falta indicar la tabla referenciada por '{campo}'.")
+        posiciones = self.indice_pk(padre).get_indexer(pd.to_numeric(izquierda[campo], errors="coerce"))
+        encontrados = posiciones >= 0
+        datos_padre = self.marco(padre)
+        if columnas is not None:
+            datos_padre = datos_padre[columnas]
+        if como == "inner":
+            izquierda = izquierda[encontrados]
+            posiciones = posiciones[encontrados]
+            unidas = datos_padre.take(posiciones)
+        else:
+            # reindex con la posición -1 (inexistente) deja la fila del padre vacía
+            unidas = datos_padre.reset_index(drop=True).reindex(posiciones)
+        unidas = unidas.add_prefix(f"{padre}.").reset_index(drop=True)
+        return pd.concat([izquierda.reset_index(drop=True), unidas], axis=1)
+
+    @staticmethod
+    def agrupar(df, por, valor, funcion="sum"):
+        return df.groupby(por, observed=True)[valor].agg(funcion).reset_index()
+
+    def detalle_valorizado(self):
+        """facturadet con precio del producto, importe y datos de la factura (cliente, sucursal)."""
+        det = self.unir("facturadet", "id_producto", columnas=["precio", "id_rubro"])
+        det = self.unir(det, "id_factura_enc", padre="facturaenc", columnas=["id_cliente", "id_sucursal"])
+        det["importe"] = pd.to_numeric(det["cantidad"], errors="coerce") * pd.to_numeric(det["productos.precio"], errors="coerce")
+        return det
+
+    def totales_por_cliente(self):
+        """Total facturado por cliente (cantidad × precio de cada línea de factura)."""
+        det = self.detalle_valorizado()
+        totales = self.agrupar(det, "facturaenc.id_cliente", "importe")
+        totales = totales.rename(columns={"facturaenc.id_cliente": "id_cliente", "importe": "total"})
+        totales = self.unir(totales, "id_cliente", padre="clientes", columnas=["nombre"], como="left")
+        return totales.sort_values("total", ascending=False, ignore_index=True)
+
+    def ventas_por_rubro_sucursal(self):
+        """Importe vendido por rubro y sucursal."""
+        det = self.detalle_valorizado()
+        totales = self.agrupar(det, ["productos.id_rubro", "facturaenc.id_sucursal"], "importe")
+        return totales.rename(columns={"productos.id_rubro": "id_rubro",
+                                       "facturaenc.id_sucursal": "id_sucursal",
+                                       "importe": "total"})
+
+
+def _numero(valor):
+    """Valor numérico de un campo (los ingresados por menú llegan como texto); 0 si no hay."""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if numero != numero else numero
+
+
+class MontosVentas:
+    """Mantiene ventas.monto = Σ cantidad × precio de las líneas de la factura.
+
+    Al crearse calcula todos los montos de una vez (join + groupby vectorizado)
+    y los escribe con asignar_columna(). Después escucha los cambios de
+    facturadet, productos y ventas y suma a cada factura afectada sólo la
+    diferencia: la de la línea que cambió o, si cambia un precio, Δprecio ×
+    Σ cantidad de ese producto en la factura. Para eso guarda la factura,
+    producto y cantidad de cada línea y el precio de cada producto (los
+    observadores reciben los valores nuevos, no los anteriores). Los montos de
+    ventas que cambian se escriben juntos con asignar_columna().
+    Un monto editado a mano se vuelve a calcular: es un dato derivado.
+    """
+
+    def __init__(self, esquema):
+        self.esquema = esquema
+        self.tablas = esquema.tablas
+        self.montos = {}       # id_factura_enc -> total (redondeado, el de ventas.monto)
+        self._totales = {}     # id_factura_enc -> total sin redondear, al que se suman las diferencias
+        self._lineas = {}      # id_factura_det -> (id_factura_enc, id_producto, cantidad)
+        self._precios = {}     # id_producto -> precio
+        self._cantidades = {}  # id_producto -> {id_factura_enc: Σ cantidad}
+        self._ventas_de = {}   # id_factura_enc -> claves de ventas
+        self._factura_de_venta = {}
+        self._escribiendo = False
+        self.recalcular_todo()
+        self.tablas["facturadet"].suscribir(self._al_cambiar_detalle)
+        self.tablas["productos"].suscribir(self._al_cambiar_producto)
+        self.tablas["ventas"].suscribir(self._al_cambiar_venta)
+
+    def recalcular_todo(self):
+        """Cálculo completo y vectorizado (se usa al cargar y con cambios en bloque)."""
+        detalle, productos = self.tablas["facturadet"], self.tablas["productos"]
+        marco = self.esquema.marco("productos")
+        self._precios = {k: _numero(v) for k, v in zip(_claves(marco[productos.id_field]), marco["precio"].tolist())}
+        marco = self.esquema.marco("facturadet")
+        lineas = pd.DataFrame({
+            "factura": _claves(marco["id_factura_enc"]),
+            "producto": _claves(marco["id_producto"]),
+            "cantidad": pd.to_numeric(marco["cantidad"], errors="coerce").fillna(0).to_numpy(),
+        })
+        self._lineas = dict(zip(_claves(marco[detalle.id_field]),
+                                zip(lineas["factura"].tolist(), lineas["producto"].tolist(),
+                                    lineas["cantidad"].tolist())))
+        if lineas["factura"].dtype == object:  # si son todas enteras no hay vacías
+            lineas = lineas[[not _vacio(f) for f in lineas["factura"].tolist()]]
+        lineas = lineas.assign(importe=lineas["cantidad"] * lineas["producto"].map(self._precios).fillna(0))
+        self._totales = lineas.groupby("factura")["importe"].sum().to_dict()
+        self.montos = {factura: self._redondear(total) for factura, total in self._totales.items()}
+        self._cantidades = {}
+        sumas = lineas.groupby(["producto", "factura"])["cantidad"].sum()
+        for producto, factura, cantidad in zip(sumas.index.get_level_values(0).tolist(),
+                                               sumas.index.get_level_values(1).tolist(), sumas.tolist()):
+            self._cantidades.setdefault(producto, {})[factura] = cantidad
+        self._recalcular_ventas()
+
+    def _recalcular_ventas(self):
+        """Arma la relación factura -> ventas y corrige en bloque los montos que difieran."""
+        ventas = self.tablas["ventas"]
+        marco = self.esquema.marco("ventas")
+        claves = _claves(marco[ventas.id_field])
+        facturas = _claves(marco["id_factura_enc"])
+        self._factura_de_venta = dict(zip(claves, facturas))
+        self._ventas_de = {}
+        for clave, factura in zip(claves, facturas):
+            self._ventas_de.setdefault(factura, set()).add(clave)
+        calculados = [self.montos.get(f, 0) for f in facturas]
+        self._escribir({clave: nuevo for clave, actual, nuevo in zip(claves, marco["monto"].tolist(), calculados)
+                        if _numero(actual) != nuevo})
+
+    def _escribir(self, cambios):
+        """Montos de ventas en bloque; el 'recargar' que avisa asignar_columna es propio y se ignora."""
+        self._escribiendo = True
+        try:
+            self.tablas["ventas"].asignar_columna("monto", cambios)
+        finally:
+            self._escribiendo = False
+
+    def _sumar_linea(self, factura, producto, cantidad, signo, afectadas):
+        if _vacio(factura) or not cantidad:
+            return
+        por_factura = self._cantidades.setdefault(producto, {})
+        por_factura[factura] = por_factura.get(factura, 0) + signo * cantidad
+        if not por_factura[factura]:
+            del por_factura[factura]
+        self._totales[factura] = self._totales.get(factura, 0) + signo * cantidad * self._precios.get(producto, 0)
+        afectadas.add(factura)
+
+    def _actualizar_ventas(self, afectadas):
+        """Redondea los totales de las facturas afectadas y escribe juntos los montos que cambiaron."""
+        cambios = {}
+        for factura in afectadas:
+            total = self._redondear(self._totales.get(factura, 0))
+            if self.montos.get(factura) != total:
+                self.montos[factura] = total
+                cambios.update(dict.fromkeys(self._ventas_de.get(factura, ()), total))
+        self._escribir(cambios)
+
+    def _al_cambiar_detalle(self, tabla, operacion, clave, datos):
+        if operacion == "recargar":
+            self.recalcular_todo()
+            return
+        clave = normalizar_clave(clave)
+        afectadas = set()
+        anterior = self._lineas.pop(clave, None)
+        if anterior is not None:
+            self._sumar_linea(*anterior, -1, afectadas)
+        if operacion != "borrar":
+            if anterior is None or operacion == "agregar":
+                registro = datos if operacion == "agregar" else tabla.obtener(clave)
+                factura, producto, cantidad = registro["id_factura_enc"], registro["id_producto"], registro["cantidad"]
+            else:
+                # actualizar: `datos` trae sólo los campos que cambiaron
+                factura, producto, cantidad = (datos.get(campo, valor) for campo, valor in
+                                               zip(("id_factura_enc", "id_producto", "cantidad"), anterior))
+            linea = (normalizar_clave(factura), normalizar_clave(producto), _numero(cantidad))
+            self._lineas[clave] = linea
+            self._sumar_linea(*linea, 1, afectadas)
+        self._actualizar_ventas(afectadas)
+
+    def _al_cambiar_producto(self, tabla, operacion, clave, datos):
+        if operacion == "recargar":
+            self.recalcular_todo()
+            return
+        if operacion == "actualizar" and "precio" not in datos:
+            return
+        clave = normalizar_clave(clave)
+        # Un producto borrado no suma, como una línea con un producto inexistente
+        precio = 0 if operacion == "borrar" else _numero(datos["precio"])
+        diferencia = precio - self._precios.get(clave, 0)
+        if operacion == "borrar":
+            self._precios.pop(clave, None)
+        else:
+            self._precios[clave] = precio
+        if not diferencia:
+            return
+        afectadas = set()
+        for factura, cantidad in self._cantidades.get(clave, {}).items():
+            self._totales[factura] = self._totales.get(factura, 0) + diferencia * cantidad
+            afectadas.add(factura)
+        self._actualizar_ventas(afectadas)
+
+    def _al_cambiar_venta(self, tabla, operacion, clave, datos):
+        if operacion == "recargar":
+            if not self._escribiendo:
+                self._recalcular_ventas()
+            return
+        clave = normalizar_clave(clave)
+        anterior = self._factura_de_venta.pop(clave, None)
+        if anterior is not None:
+            self._ventas_de.get(anterior, set()).discard(clave)
+        if operacion == "borrar":
+            return
+        registro = tabla.obtener(clave)
+        factura = normalizar_clave(registro["id_factura_enc"])
+        self._factura_de_venta[clave] = factura
+        self._ventas_de.setdefault(factura, set()).add(clave)
+        total = self.montos.get(factura, 0)
+        if _numero(registro["monto"]) != total:
+            tabla.actualizar(clave, {"monto": total})
+
+    @staticmethod
+    def _redondear(total):
+        total = float(total)
+        return int(total) if total.is_integer() else round(total, 2)
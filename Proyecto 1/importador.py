@@ -0,0 +1,150 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from almacen import is_id_field
+from persistencia import leer_json
+
+
+def leer_por_lotes(ruta, tam_lote=100_000):
+    """Devuelve el archivo en DataFrames de hasta tam_lote filas (generador).
+
+    Acepta CSV, JSON (arreglo de objetos) o JSON Lines según la extensión; nunca
+    tiene el archivo completo en memoria.
+    """
+    if os.path.splitext(ruta)[1].lower() in (".json", ".jsonl", ".ndjson"):
+        lote = []
+        for registro in leer_json(ruta):
+            lote.append(registro)
+            if len(lote) >= tam_lote:
+                yield pd.DataFrame.from_records(lote)
+                lote = []
+        if lote:
+            yield pd.DataFrame.from_records(lote)
+    else:
+        with pd.read_csv(ruta, chunksize=tam_lote) as lector:
+            yield from lector
+
+
+def campos_numericos(tabla, muestra=1000):
+    """Campos que la tabla guarda como números: los campos id y los numéricos en una muestra de registros."""
+    registros = [r for _, r in tabla.rebanada(0, muestra)]
+    df = pd.DataFrame(registros, columns=tabla.campos)
+    return [c for c in tabla.campos
+            if is_id_field(c) or (pd.api.types.is_numeric_dtype(df[c]) and df[c].notna().any())]
+
+
+def _vacios(serie):
+    if pd.api.types.is_numeric_dtype(serie):
+        return serie.isna()
+    return serie.isna() | (serie.astype(object) == "")
+
+
+def validar_lote(tabla, df, numericos, esquema=None):
+    """Valida tipos y claves foráneas de un lote, de forma vectorizada.
+
+    Los campos numéricos se convierten a número (un campo id además debe ser
+    entero) y cada clave foránea no vacía debe existir en el índice de clave
+    primaria de la tabla referenciada. Devuelve (válidas, rechazadas); las
+    rechazadas quedan con los valores tal como venían y una columna 'motivo' con
+    el primer error encontrado.
+    """
+    convertidos = {}
+    motivo = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    def rechazar(malas, texto):
+        nonlocal motivo
+        motivo = motivo.mask(motivo.isna() & malas, texto)
+
+    for campo in numericos:
+        if campo not in df.columns:
+            continue
+        vacios = _vacios(df[campo])
+        numeros = pd.to_numeric(df[campo], errors="coerce")
+        rechazar(numeros.isna() & ~vacios, f"{campo} no es numérico")
+        if is_id_field(campo):
+            rechazar(numeros.notna() & (numeros != numeros.round()), f"{campo} no es entero")
+        convertidos[campo] = numeros
+    if esquema is not None:
+        for campo, padre in esquema.foraneas_de(tabla.nombre):
+            if campo not in df.columns:
+                continue
+            valores = pd.to_numeric(df[campo], errors="coerce")
+            rechazar(valores.notna() & ~valores.isin(esquema.indice_pk(padre)),
+                     f"{campo} no existe en '{padre}'")
+    malas = motivo.notna().to_numpy(dtype=bool)
+    rechazadas = df[malas].assign(motivo=motivo[malas])
+    # Sólo las válidas llevan los valores convertidos
+    validas = df[~malas].copy()
+    for campo, numeros in convertidos.items():
+        numeros = numeros[~malas]
+        enteros = numeros.dropna()
+        if len(enteros) == 0 or (enteros == enteros.round()).all():
+            # Entero con faltantes: que no quede como float (1.0) por los vacíos
+            numeros = numeros.astype("Int64")
+        validas[campo] = numeros
+    return validas, rechazadas
+
+
+def asignar_ids(tabla, df):
+    """Completa la clave primaria de las filas que no la traen, con la semántica de
+    generate_new_id(): máximo + 1 en orden. El máximo incluye las claves del lote,
+    para que una clave generada no pise a otra fila del mismo lote."""
+    campo = tabla.id_field
+    if campo is None:
+        return df
+    if campo not in df.columns:
+        df = df.assign(**{campo: np.nan})
+    faltan = df[campo].isna().to_numpy(dtype=bool)
+    if faltan.any():
+        inicio = tabla.siguiente_id()
+        if not faltan.all():
+            inicio = max(inicio, int(df[campo][~faltan].max()) + 1)
+        df = df.copy()
+        df.loc[faltan, campo] = np.arange(inicio, inicio + faltan.sum())
+    return df.astype({campo: "int64"})
+
+
+def importar(tablas, nombre, ruta, esquema=None, tam_lote=100_000, ruta_rechazados=None):
+    """Importa un archivo CSV/JSON grande a una tabla: inserta o actualiza por clave primaria.
+
+    Lee el archivo por lotes, valida cada lote (validar_lote), completa las
+    claves faltantes (asignar_ids) y lo carga con Tabla.cargar_lote(). Los
+    observadores (índices, montos de ventas) se avisan una sola vez al final.
+    No guarda: los cambios quedan anotados para un único guardado incremental.
+    Las filas rechazadas se escriben con su motivo en `ruta_rechazados`
+    (por defecto <archivo>.rechazados.csv). Devuelve un resumen (dict).
+    """
+    tabla = tablas[nombre]
+    ruta_rechazados = ruta_rechazados or os.path.splitext(ruta)[0] + ".rechazados.csv"
+    if os.path.exists(ruta_rechazados):
+        os.remove(ruta_rechazados)
+    numericos = campos_numericos(tabla)
+    resumen = {"leidas": 0, "insertadas": 0, "actualizadas": 0, "rechazadas": 0}
+    inicio = time.perf_counter()
+    try:
+        for lote in leer_por_lotes(ruta, tam_lote):
+            desconocidos = [c for c in lote.columns if c not in tabla.campos]
+            if desconocidos:
+                raise ValueError(f"Campos desconocidos en '{nombre}': {', '.join(map(str, desconocidos))}.")
+            resumen["leidas"] += len(lote)
+            validas, rechazadas = validar_lote(tabla, lote, numericos, esquema)
+            if len(rechazadas):
+                rechazadas.to_csv(ruta_rechazados, mode="a", index=False,
+                                  header=not os.path.exists(ruta_rechazados), lineterminator="\n")
+                resumen["rechazadas"] += len(rechazadas)
+            with tabla.cerrojo():
+                insertadas, actualizadas = tabla.cargar_lote(asignar_ids(tabla, validas), avisar=False)
+            resumen["insertadas"] += insertadas
+            resumen["actualizadas"] += actualizadas
+    finally:
+        # Aunque falle a mitad de camino, lo ya cargado debe verse en índices y agregados
+        if resumen["insertadas"] or resumen["actualizadas"]:
+            tabla.notificar_recarga()
+    segundos = time.perf_counter() - inicio
+    resumen["segundos"] = segundos
+    resumen["filas_por_minuto"] = resumen["leidas"] / segundos * 60 if segundos else 0
+    resumen["rechazados"] = ruta_rechazados if resumen["rechazadas"] else None
+    return resumen
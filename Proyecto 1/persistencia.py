@@ -0,0 +1,257 @@
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    from pyarrow import feather
+except ImportError:  # pyarrow es opcional: sin él sólo se usan CSV y JSON
+    feather = None
+
+
+# Archivo CSV de cada tabla
+ARCHIVOS = {
+    "clientes": "clientes.csv",
+    "localidades": "localidades.csv",
+    "provincias": "provincias.csv",
+    "productos": "productos.csv",
+    "clientes_mail": "clientes_mail.csv",
+    "clientes_tel": "clientes_tel.csv",
+    "rubros": "rubros.csv",
+    "sucursales": "sucursales.csv",
+    "facturaenc": "facturas_enc.csv",
+    "facturadet": "facturas_det.csv",
+    "ventas": "ventas.csv",
+}
+
+
+def escribir_atomico(ruta, escribir, modo="w"):
+    """Escribe un archivo completo de forma atómica: archivo temporal en la misma
+    carpeta + os.replace(). Si algo falla, el archivo original queda intacto.
+    `escribir` recibe el archivo abierto y vuelca el contenido.
+    """
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=carpeta)
+    try:
+        with os.fdopen(fd, modo, encoding=None if "b" in modo else "utf-8", newline=None if "b" in modo else "") as f:
+            escribir(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _cabecera_csv(ruta):
+    with open(ruta, "r", encoding="utf-8", newline="") as f:
+        return f.readline().rstrip("\r\n")
+
+
+def anexar_csv(ruta, df):
+    """Agrega filas al final de un CSV existente. Si la escritura falla se trunca
+    el archivo a su tamaño original, para no dejar una fila a medias."""
+    tamanio = os.path.getsize(ruta)
+    with open(ruta, "rb+") as f:
+        # Respetar el fin de línea que ya usa el archivo (\r\n si se guardó en Windows)
+        fin_linea = "\r\n" if f.readline().endswith(b"\r\n") else "\n"
+        if tamanio:
+            f.seek(-1, os.SEEK_END)
+            falta_salto = f.read(1) not in (b"\n", b"\r")
+        else:
+            falta_salto = False
+        f.seek(0, os.SEEK_END)
+        try:
+            if falta_salto:
+                f.write(fin_linea.encode())
+            f.write(df.to_csv(index=False, header=False, lineterminator=fin_linea).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.truncate(tamanio)
+            raise
+
+
+def preparar_guardado(tabla, ruta, incremental=True):
+    """Decide cómo guardar la tabla y toma en memoria los datos a escribir.
+
+    - Sin cambios desde el último guardado: no hay nada que escribir.
+    - Sólo registros agregados (caso típico de facturadet y ventas): se toman
+      sólo las filas nuevas, para agregarlas al final del archivo existente.
+    - Cualquier otro cambio: se toma la tabla completa para reescribirla.
+
+    Devuelve (modo, df) con modo 'sin cambios', 'agregado' o 'reescrito', y deja
+    la tabla marcada como guardada. Separarlo de la escritura permite tomar los
+    datos bajo un cerrojo y escribir el archivo fuera de él (ver wal.py).
+    """
+    existe = os.path.exists(ruta)
+    if incremental and existe and not tabla.tiene_cambios():
+        return "sin cambios", None
+    if incremental and existe and tabla.solo_agregados() and _cabecera_csv(ruta) == ",".join(tabla.campos):
+        df = tabla.filas(tabla.claves_agregadas())
+        modo = "agregado"
+    else:
+        df = tabla.a_dataframe()
+        modo = "reescrito"
+    tabla.marcar_guardada()
+    return modo, df
+
+
+def escribir_guardado(ruta, modo, df):
+    """Escribe en disco lo que devolvió preparar_guardado()."""
+    if modo == "agregado":
+        anexar_csv(ruta, df)
+    elif modo == "reescrito":
+        escribir_atomico(ruta, lambda f: df.to_csv(f, index=False, lineterminator="\n"))
+
+
+def guardar_tabla_csv(tabla, ruta, incremental=True):
+    """Guarda una tabla en CSV escribiendo sólo lo necesario (ver preparar_guardado).
+
+    Devuelve 'sin cambios', 'agregado' o 'reescrito'.
+    """
+    modo, df = preparar_guardado(tabla, ruta, incremental)
+    try:
+        escribir_guardado(ruta, modo, df)
+    except BaseException:
+        # El archivo quedó como estaba: la próxima vez se reescribe completo
+        tabla.marcar_sucia()
+        raise
+    return modo
+
+
+# --- Instantáneas binarias (Arrow IPC / Feather) ---
+def ruta_feather(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".feather"
+
+
+def feather_vigente(ruta_csv):
+    """True si hay un .feather al menos tan nuevo como el CSV y pyarrow está disponible."""
+    ruta = ruta_feather(ruta_csv)
+    if feather is None or not os.path.exists(ruta):
+        return False
+    return not os.path.exists(ruta_csv) or os.path.getmtime(ruta) >= os.path.getmtime(ruta_csv)
+
+
+def _para_arrow(df):
+    """Deja cada columna con un tipo único: las columnas object mezclan números
+    leídos del CSV con textos ingresados en el menú ('12', 12)."""
+    df = df.copy()
+    for campo in df.columns:
+        if df[campo].dtype == object:
+            numeros = pd.to_numeric(df[campo], errors="coerce")
+            if numeros.notna().sum() == df[campo].map(lambda v: v not in ("", None) and v == v).sum():
+                df[campo] = numeros
+            else:
+                df[campo] = df[campo].astype("string")
+    return df
+
+
+def escribir_feather(df, ruta_csv):
+    """Escribe la instantánea Feather junto al CSV (sin compresión, para poder leerla con mmap)."""
+    if feather is None:
+        raise RuntimeError("Se necesita pyarrow para guardar en formato Feather.")
+    df = _para_arrow(df)
+    escribir_atomico(ruta_feather(ruta_csv),
+                     lambda f: feather.write_feather(df, f, compression="uncompressed"), modo="wb")
+
+
+def guardar_feather(tabla, ruta_csv):
+    with tabla.cerrojo():
+        df = tabla.a_dataframe()
+    escribir_feather(df, ruta_csv)
+
+
+def leer_feather(ruta_csv, columnas=None):
+    """Lee la instantánea Feather mapeada en memoria; `columnas` limita las columnas leídas."""
+    tabla = feather.read_table(ruta_feather(ruta_csv), columns=columnas, memory_map=True)
+    return tabla.to_pandas()
+
+
+# --- JSON por streaming ---
+def a_json(valor):
+    """Convierte tipos de numpy/pandas a tipos que json puede escribir (default= de json.dumps)."""
+    if hasattr(valor, "item"):
+        return valor.item()
+    return None
+
+
+def escribir_json(registros, f, formato="array", indentar=True):
+    """Escribe los registros de a uno, sin armar el documento completo en memoria.
+
+    formato='array' produce un arreglo JSON (con indentar=True, el mismo texto que
+    json.dump(..., indent=2)); formato='jsonl' produce JSON Lines, un registro por línea.
+    """
+    if formato == "jsonl":
+        for registro in registros:
+            f.write(json.dumps(registro, ensure_ascii=False, default=a_json))
+            f.write("\n")
+        return
+    primero = True
+    for registro in registros:
+        if indentar:
+            texto = "  " + json.dumps(registro, ensure_ascii=False, indent=2, default=a_json).replace("\n", "\n  ")
+        else:
+            texto = json.dumps(registro, ensure_ascii=False, separators=(",", ":"), default=a_json)
+        f.write(("[\n" if primero else ",\n") + texto)
+        primero = False
+    f.write("[]" if primero else "\n]")
+
+
+def leer_json(ruta, tam_bloque=1 << 16):
+    """Devuelve los registros de un archivo JSON de a uno (generador).
+
+    Acepta un arreglo JSON de objetos o JSON Lines; el formato se detecta por el
+    primer carácter. Sólo mantiene en memoria un bloque del archivo por vez.
+    """
+    decodificador = json.JSONDecoder()
+    with open(ruta, "r", encoding="utf-8") as f:
+        buffer = f.read(tam_bloque).lstrip("\ufeff")
+        inicio = len(buffer) - len(buffer.lstrip())
+        if inicio < len(buffer) and buffer[inicio] != "[":
+            # JSON Lines
+            f.seek(0)
+            for linea in f:
+                linea = linea.strip().lstrip("\ufeff")
+                if linea:
+                    yield json.loads(linea)
+            return
+        pos = inicio + 1
+        fin_archivo = False
+        while True:
+            # Saltar separadores entre registros
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            if pos < len(buffer):
+                try:
+                    registro, pos = decodificador.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if fin_archivo:
+                        raise
+                else:
+                    yield registro
+                    continue
+            elif fin_archivo:
+                raise ValueError(f"JSON incompleto en {ruta}")
+            # Falta texto: descartar lo ya leído y agregar otro bloque
+            bloque = f.read(tam_bloque)
+            fin_archivo = not bloque
+            buffer = buffer[pos:] + bloque
+            pos = 0
+
+
+def leer_json_df(ruta, tam_lote=100_000):
+    """Lee un JSON (arreglo o JSON Lines) como DataFrame, armándolo por lotes."""
+    lotes, lote = [], []
+    for registro in leer_json(ruta):
+        lote.append(registro)
+        if len(lote) >= tam_lote:
+            lotes.append(pd.DataFrame.from_records(lote))
+            lote = []
+    if lote or not lotes:
+        lotes.append(pd.DataFrame.from_records(lote))
+    return pd.concat(lotes, ignore_index=True) if len(lotes) > 1 else lotes[0]
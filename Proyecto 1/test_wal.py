@@ -0,0 +1,113 @@
+import os
+import random
+import time
+
+import pandas as pd
+import pytest
+
+from almacen import Tabla, TablaColumnar
+from persistencia import guardar_tabla_csv
+from wal import NOMBRE_WAL, Compactador, RegistroWAL, reproducir_wal
+
+
+PRODUCTOS = pd.DataFrame({
+    "id_producto": [1, 2, 3, 4],
+    "nombre": ["yerba", "azúcar", "harina", "aceite"],
+    "precio": [10.5, 3.25, 2.0, 8.75],
+})
+
+
+@pytest.fixture(params=[False, True], ids=["dicts", "columnar"])
+def columnar(request):
+    return request.param
+
+
+def _cargar(carpeta, columnar):
+    """Como Proyecto1.cargar_tablas(): el CSV y después lo que quedó en el WAL."""
+    df = pd.read_csv(os.path.join(carpeta, "productos.csv"))
+    if columnar:
+        tabla = TablaColumnar("productos", df)
+    else:
+        tabla = Tabla("productos", df.to_dict(orient="records"), campos=list(df.columns))
+    tablas = {"productos": tabla}
+    reproducir_wal(tablas, carpeta)
+    return tablas
+
+
+def _estado(tabla):
+    df = tabla.a_dataframe().sort_values("id_producto").reset_index(drop=True)
+    return df.astype({"id_producto": "int64", "precio": "float64"})
+
+
+def _abrir(carpeta, columnar, **opciones):
+    PRODUCTOS.to_csv(os.path.join(carpeta, "productos.csv"), index=False)
+    tablas = _cargar(carpeta, columnar)
+    wal = RegistroWAL(carpeta, **opciones)
+    tablas["productos"].wal = wal
+    return tablas, wal
+
+
+def _operar(tabla, aleatorio):
+    claves = list(tabla.claves())
+    operacion = aleatorio.random()
+    if operacion < 0.4 or len(claves) < 3:
+        tabla.agregar({"nombre": f"producto {aleatorio.randrange(1000)}", "precio": aleatorio.randrange(100) / 4})
+    elif operacion < 0.8:
+        tabla.actualizar(aleatorio.choice(claves), {"precio": aleatorio.randrange(100) / 4})
+    else:
+        tabla.borrar(aleatorio.choice(claves))
+
+
+def test_reproduce_el_wal_despues_de_un_corte(tmp_path, columnar):
+    tablas, wal = _abrir(tmp_path, columnar, lote=1000, intervalo=60)
+    productos = tablas["productos"]
+    aleatorio = random.Random(0)
+    for _ in range(50):
+        _operar(productos, aleatorio)
+    wal.sincronizar()
+    # El proceso muere a mitad de escribir una línea: ni cerrar() ni compactar()
+    with open(tmp_path / NOMBRE_WAL, "a", encoding="utf-8") as f:
+        f.write('{"tabla": "productos", "op": "agre')
+    try:
+        recuperadas = _cargar(tmp_path, columnar)
+        pd.testing.assert_frame_equal(_estado(recuperadas["productos"]), _estado(productos))
+    finally:
+        wal.cerrar()
+
+
+def test_compacta_mientras_se_sigue_escribiendo(tmp_path, columnar):
+    tablas, wal = _abrir(tmp_path, columnar, lote=10, intervalo=0.01)
+    productos = tablas["productos"]
+    compactador = Compactador(wal, tablas, cada=0.005, minimo=1)
+    compactaciones = []
+    compactar = wal.compactar
+    wal.compactar = lambda tablas: compactaciones.append(compactar(tablas))
+    compactador.start()
+    aleatorio = random.Random(1)
+    try:
+        for _ in range(2000):
+            _operar(productos, aleatorio)
+            if len(compactaciones) >= 5:
+                break
+            time.sleep(0.0002)  # dar lugar al compactador
+    finally:
+        compactador.detener()
+        wal.cerrar()
+    assert compactaciones
+    recuperadas = _cargar(tmp_path, columnar)
+    pd.testing.assert_frame_equal(_estado(recuperadas["productos"]), _estado(productos))
+
+
+def test_reproducir_dos_veces_sobre_un_csv_mas_nuevo_da_lo_mismo(tmp_path, columnar):
+    tablas, wal = _abrir(tmp_path, columnar, lote=1000, intervalo=60)
+    productos = tablas["productos"]
+    aleatorio = random.Random(2)
+    for _ in range(50):
+        _operar(productos, aleatorio)
+    wal.cerrar()
+    # Corte de una compactación después de escribir el CSV y antes de borrar el log
+    guardar_tabla_csv(productos, str(tmp_path / "productos.csv"))
+    recuperadas = _cargar(tmp_path, columnar)
+    pd.testing.assert_frame_equal(_estado(recuperadas["productos"]), _estado(productos))
+    assert reproducir_wal(recuperadas, tmp_path) > 0
+    pd.testing.assert_frame_equal(_estado(recuperadas["productos"]), _estado(productos))
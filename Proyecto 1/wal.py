@@ -0,0 +1,184 @@
+import glob
+import json
+import os
+import threading
+import time
+
+from persistencia import ARCHIVOS, a_json, escribir_guardado, preparar_guardado
+
+
+NOMBRE_WAL = "cambios.wal"
+
+
+class RegistroWAL:
+    """Write-ahead log de las operaciones por registro (agregar, actualizar, borrar).
+
+    Cada operación se escribe como una línea JSON en CARPETA/cambios.wal. Para
+    no pagar un fsync por operación, se sincroniza en lote: cada `lote`
+    operaciones o, como mucho, `intervalo` segundos después de la primera
+    pendiente (un hilo se encarga de esto último).
+
+    compactar() vuelca las tablas con cambios a sus CSV y descarta la parte del
+    log que ya quedó en los archivos. Al arrancar, reproducir_wal() aplica sobre
+    los CSV lo que haya quedado en el log.
+    """
+
+    def __init__(self, carpeta, nombre=NOMBRE_WAL, lote=100, intervalo=0.2):
+        self.carpeta = carpeta
+        self.ruta = os.path.join(carpeta, nombre)
+        self.lote = lote
+        self.intervalo = intervalo
+        self.bloqueo = threading.RLock()      # modificaciones de tablas y escritura del log
+        self.escritura = threading.Lock()     # escritura de los archivos de datos
+        self.operaciones = 0                  # operaciones desde la última compactación
+        self._pendientes = 0                  # operaciones escritas y aún no sincronizadas
+        self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self._cerrado = threading.Event()
+        self._hilo = threading.Thread(target=self._sincronizar_periodicamente, daemon=True)
+        self._hilo.start()
+
+    def registrar(self, tabla, operacion, clave, datos=None):
+        linea = json.dumps({"tabla": tabla, "op": operacion, "clave": clave, "datos": datos},
+                           ensure_ascii=False, default=a_json)
+        with self.bloqueo:
+            self._archivo.write(linea + "\n")
+            self._pendientes += 1
+            self.operaciones += 1
+            if self._pendientes >= self.lote:
+                self.sincronizar()
+
+    def sincronizar(self):
+        """Fuerza a disco las operaciones pendientes."""
+        with self.bloqueo:
+            if self._pendientes:
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+                self._pendientes = 0
+
+    def _sincronizar_periodicamente(self):
+        while not self._cerrado.wait(self.intervalo):
+            self.sincronizar()
+
+    def _rotar(self):
+        """Cierra el log actual como segmento numerado y abre uno vacío. Llamar con el cerrojo tomado."""
+        self.sincronizar()
+        self._archivo.close()
+        numero = max([_numero_segmento(r) for r in _segmentos(self.ruta)] + [0]) + 1
+        segmento = f"{self.ruta}.{numero}"
+        os.replace(self.ruta, segmento)
+        self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self.operaciones = 0
+        return numero
+
+    def compactar(self, tablas):
+        """Vuelca a los CSV las tablas con cambios y elimina el log ya aplicado.
+
+        Los datos se toman bajo el cerrojo (copia en memoria) y los archivos se
+        escriben fuera de él, así que el menú puede seguir editando mientras tanto.
+        """
+        with self.escritura:
+            with self.bloqueo:
+                pendientes = []
+                for nombre, tabla in tablas.items():
+                    ruta = os.path.join(self.carpeta, ARCHIVOS.get(nombre, f"{nombre}.csv"))
+                    modo, df = preparar_guardado(tabla, ruta)
+                    pendientes.append((nombre, ruta, modo, df))
+                numero = self._rotar()
+            try:
+                for nombre, ruta, modo, df in pendientes:
+                    escribir_guardado(ruta, modo, df)
+            except BaseException:
+                # Los segmentos quedan en disco y se reproducen al reiniciar
+                with self.bloqueo:
+                    for nombre, _, modo, _ in pendientes:
+                        if modo != "sin cambios":
+                            tablas[nombre].marcar_sucia()
+                raise
+            for segmento in _segmentos(self.ruta):
+                if _numero_segmento(segmento) <= numero:
+                    os.remove(segmento)
+        return [(nombre, modo) for nombre, _, modo, _ in pendientes if modo != "sin cambios"]
+
+    def cerrar(self):
+        self._cerrado.set()
+        self._hilo.join()
+        with self.bloqueo:
+            self.sincronizar()
+            self._archivo.close()
+
+
+class Compactador(threading.Thread):
+    """Hilo que compacta el WAL en segundo plano cada `cada` segundos,
+    si se acumularon al menos `minimo` operaciones."""
+
+    def __init__(self, wal, tablas, cada=30.0, minimo=1000):
+        super().__init__(daemon=True)
+        self.wal = wal
+        self.tablas = tablas
+        self.cada = cada
+        self.minimo = minimo
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.cada):
+            if self.wal.operaciones >= self.minimo:
+                try:
+                    self.wal.compactar(self.tablas)
+                except Exception as e:
+                    print(" Error compactando el WAL:", e)
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _segmentos(ruta):
+    return sorted(glob.glob(glob.escape(ruta) + ".*"), key=_numero_segmento)
+
+
+def _numero_segmento(ruta):
+    try:
+        return int(ruta.rsplit(".", 1)[1])
+    except ValueError:
+        return 0
+
+
+def reproducir_wal(tablas, carpeta, nombre=NOMBRE_WAL):
+    """Aplica sobre las tablas recién cargadas las operaciones que quedaron en el log.
+
+    Las operaciones se aplican como "dejar el registro así" (agregar sobre una
+    clave existente la actualiza, actualizar o borrar una clave inexistente se
+    ignora), de modo que reproducir un log que ya estaba en parte en los CSV da
+    el mismo resultado. Una última línea incompleta (corte durante la escritura)
+    se descarta. Devuelve la cantidad de operaciones aplicadas.
+    """
+    ruta = os.path.join(carpeta, nombre)
+    archivos = _segmentos(ruta) + ([ruta] if os.path.exists(ruta) else [])
+    aplicadas = 0
+    inicio = time.perf_counter()
+    for archivo in archivos:
+        with open(archivo, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    op = json.loads(linea)
+                except json.JSONDecodeError:
+                    break
+                tabla = tablas.get(op["tabla"])
+                if tabla is None:
+                    continue
+                clave, datos = op["clave"], op.get("datos") or {}
+                if op["op"] == "agregar":
+                    if clave in tabla:
+                        tabla.actualizar(clave, datos)
+                    else:
+                        tabla.agregar(datos)
+                elif op["op"] == "actualizar":
+                    if clave in tabla:
+                        tabla.actualizar(clave, datos)
+                elif op["op"] == "borrar":
+                    if clave in tabla:
+                        tabla.borrar(clave)
+                aplicadas += 1
+    if aplicadas:
+        print(f" WAL: {aplicadas} operaciones recuperadas en {time.perf_counter() - inicio:.2f}s")
+    return aplicadas
@@ -2,66 +2,126 @@
 # Análisis de Recompra en Campaña de Marketing
 # Dataset: Mini_Proyecto_Clientes_Promociones.xlsx
 # ==============================================
+# Uso: python Proyecto2.py [--excel LIBRO] [--sin-graficos | --graficos DIR] [--reentrenar]
+#      python Proyecto2.py --buscar [--pliegues K] [--procesos N] [--metrica M]
+# El libro se convierte una vez a una copia columnar (ver datos.py) y el modelo
+# se guarda con la huella de sus datos (ver modelo.py): una nueva ejecución con
+# los mismos datos no vuelve a leer el Excel ni a entrenar. Con --buscar se
+# comparan modelos e hiperparámetros por validación cruzada (ver busqueda.py).
+# Para puntuar clientes nuevos con el modelo guardado: ver puntuar.py. Con
+# --graficos los gráficos se guardan como PNG sin pantalla (ver figuras.py).
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier, plot_tree
-from sklearn.metrics import classification_report, confusion_matrix
+import argparse
+import time
 
-# --- 1️⃣ Carga de datos ---
-df = pd.read_excel("C:/Users/colat/OneDrive/Escritorio/IA 2°año/modelizado de mineria de datos/Proyecto/Proyecto2/Mini_Proyecto_Clientes_Promociones.xlsx")
+import datos
+import figuras
+import modelo
 
-# --- 2️⃣ Limpieza y transformación ---
-df['Genero'] = df['Genero'].map({'F': 0, 'M': 1})
-df['Recibio_Promo'] = df['Recibio_Promo'].map({'Si': 1, 'No': 0})
-df['Recompra'] = df['Recompra'].map({'Si': 1, 'No': 0})
-
-# Eliminamos filas sin valor de recompra
-df.dropna(subset=['Recompra'], inplace=True)
 
 # --- 3️⃣ Gráfico 1: Boxplot de Monto Promocional vs Recompra ---
-plt.figure(figsize=(8, 5))
-sns.boxplot(data=df, x='Recompra', y='Monto_Promo', palette='coolwarm')
-plt.title('Distribución de Monto Promocional según Recompra', fontsize=14)
-plt.xlabel('Recompra (0 = No, 1 = Sí)')
-plt.ylabel('Monto Promocional')
-plt.grid(axis='y', linestyle='--', alpha=0.6)
-plt.show()
+def grafico_monto(tabla):
+    return {
+        'tipo': 'caja', 'archivo': 'monto_promo_recompra.png', 'tamano': (8, 5),
+        'datos': tabla[['Recompra', 'Monto_Promo']], 'categoria': 'Recompra', 'valor': 'Monto_Promo',
+        'colores': 'coolwarm',
+        'titulo': 'Distribución de Monto Promocional según Recompra',
+        'etiqueta_x': 'Recompra (0 = No, 1 = Sí)',
+        'etiqueta_y': 'Monto Promocional',
+    }
+
 
 # --- 4️⃣ Gráfico 2: Tasa de Recompra según Recepción de Promoción ---
-plt.figure(figsize=(7, 5))
-sns.barplot(
-    data=df,
-    x='Recibio_Promo',
-    y='Recompra',
-    estimator=lambda x: sum(x) / len(x),  # calcula porcentaje
-    palette='viridis'
-)
-plt.title('Tasa de Recompra según Recepción de Promoción', fontsize=14)
-plt.xlabel('Recibió Promoción (0 = No, 1 = Sí)')
-plt.ylabel('Porcentaje de Recompra')
-plt.ylim(0, 1)
-plt.grid(axis='y', linestyle='--', alpha=0.6)
-plt.show()
-
-# --- 5️⃣ Modelo de Árbol de Decisión ---
-X = df.drop(['Cliente_ID', 'Recompra'], axis=1)
-y = df['Recompra']
-
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-modelo = DecisionTreeClassifier(max_depth=4, random_state=42)
-modelo.fit(X_train, y_train)
-y_pred = modelo.predict(X_test)
-
-print("📊 MATRIZ DE CONFUSIÓN:\n", confusion_matrix(y_test, y_pred))
-print("\n📋 REPORTE DE CLASIFICACIÓN:\n", classification_report(y_test, y_pred))
+def grafico_tasa(tabla):
+    tasa = tabla.groupby('Recibio_Promo')['Recompra'].mean().reset_index()  # calcula porcentaje
+    tasa['Recibio_Promo'] = tasa['Recibio_Promo'].astype(int)
+    return {
+        'tipo': 'barras', 'archivo': 'tasa_recompra_promo.png', 'tamano': (7, 5),
+        'datos': tasa, 'categoria': 'Recibio_Promo', 'valor': 'Recompra', 'colores': 'viridis',
+        'limites_y': (0, 1),
+        'titulo': 'Tasa de Recompra según Recepción de Promoción',
+        'etiqueta_x': 'Recibió Promoción (0 = No, 1 = Sí)',
+        'etiqueta_y': 'Porcentaje de Recompra',
+    }
+
 
 # --- 6️⃣ Visualización del Árbol ---
-plt.figure(figsize=(12, 6))
-plot_tree(modelo, feature_names=X.columns, class_names=["No Recompra", "Recompra"], filled=True)
-plt.title("Árbol de Decisión — Recompra de Clientes", fontsize=14)
-plt.show()
+def grafico_arbol(pipeline):
+    return {
+        'tipo': 'arbol', 'archivo': 'arbol_recompra.png', 'tamano': (12, 6),
+        'modelo': pipeline.named_steps['arbol'], 'variables': modelo.CARACTERISTICAS, 'clases': modelo.CLASES,
+        'titulo': 'Árbol de Decisión — Recompra de Clientes',
+    }
+
+
+def para_graficos(df):
+    """Las columnas de los gráficos codificadas a 0/1, como en los ejes."""
+    X, y = modelo.preparar(df)
+    X = modelo.codificar(X)
+    X['Recompra'] = y
+    return X
+
+
+def graficos(df, pipeline):
+    """Especificaciones de los tres gráficos (ver figuras.py)."""
+    tabla = para_graficos(df)
+    return [grafico_monto(tabla), grafico_tasa(tabla), grafico_arbol(pipeline)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análisis de recompra: gráficos y árbol de decisión.")
+    parser.add_argument("--excel", default=datos.RUTA_EXCEL, help="libro de clientes y promociones")
+    parser.add_argument("--sin-graficos", action="store_true", help="modo sin pantalla: no dibuja nada")
+    parser.add_argument("--graficos", metavar="DIR",
+                        help="guardar los gráficos como PNG en DIR, sin pantalla (sólo los que cambiaron)")
+    parser.add_argument("--reentrenar", action="store_true", help="entrenar aunque haya un modelo vigente")
+    parser.add_argument("--buscar", action="store_true",
+                        help="búsqueda de hiperparámetros con validación cruzada (tabla en LIBRO.busqueda.csv)")
+    parser.add_argument("--pliegues", type=int, default=5, help="pliegues de la validación cruzada estratificada")
+    parser.add_argument("--procesos", type=int, default=-1,
+                        help="procesos para la búsqueda y los gráficos (-1: todos los núcleos)")
+    parser.add_argument("--metrica", default="roc_auc", help="métrica de scikit-learn para ordenar los candidatos")
+    args = parser.parse_args(argv)
+
+    # --- 1️⃣ Carga de datos ---
+    inicio = time.perf_counter()
+    df = datos.cargar_clientes(args.excel)
+    print(f"📂 {len(df):,} clientes cargados en {time.perf_counter() - inicio:.2f} s")
+
+    if args.buscar:
+        import busqueda
+        ruta = busqueda.ruta_tabla(args.excel)
+        tabla, segundos = busqueda.correr(df, ruta, pliegues=args.pliegues, metrica=args.metrica,
+                                          procesos=args.procesos)
+        print(f"🔎 {len(tabla)} combinaciones evaluadas en {segundos:.1f} s -> {ruta}")
+        print(tabla.head(10).to_string())
+        return
+
+    # --- 2️⃣ Limpieza y transformación: dentro del Pipeline (ver modelo.py) ---
+
+    # --- 5️⃣ Modelo de Árbol de Decisión ---
+    artefacto, reutilizado = modelo.obtener(df, modelo.ruta_modelo(args.excel), forzar=args.reentrenar)
+    if reutilizado:
+        print(f"♻️ Modelo reutilizado (entrenado {artefacto['entrenado']}, mismos datos y parámetros)")
+    else:
+        print(f"🌳 Modelo entrenado con {artefacto['filas']:,} clientes en {artefacto['segundos']:.2f} s")
+
+    print("📊 MATRIZ DE CONFUSIÓN:\n", artefacto['matriz_confusion'])
+    print("\n📋 REPORTE DE CLASIFICACIÓN:\n", artefacto['reporte'])
+
+    if args.sin_graficos:
+        return
+    especificaciones = graficos(df, artefacto['pipeline'])
+    if args.graficos:
+        procesos = None if args.procesos < 0 else args.procesos
+        for archivo, estado, segundos in figuras.renderizar(especificaciones, args.graficos, procesos):
+            print(f"🖼️ {archivo}: {estado}" + (f" en {segundos:.2f} s" if estado == 'dibujado' else ""))
+    else:
+        import matplotlib.pyplot as plt
+        for spec in especificaciones:
+            figuras.dibujar(spec, plt.figure(figsize=spec['tamano']))
+            plt.show()
+
 
+if __name__ == "__main__":
+    main()
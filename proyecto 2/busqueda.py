@@ -0,0 +1,114 @@
+import os
+import time
+
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (habilita HalvingGridSearchCV)
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, StratifiedKFold
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeClassifier
+
+import modelo
+
+
+# Búsqueda de hiperparámetros del modelo de recompra: validación cruzada
+# estratificada sobre árboles, bosques y gradient boosting, repartida en
+# procesos (joblib) y con successive halving: todas las combinaciones se
+# prueban primero con pocas filas y sólo las mejores llegan a usar todas.
+
+SEMILLA = 42
+
+ESPACIO = [
+    {
+        'clasificador': [DecisionTreeClassifier(random_state=SEMILLA)],
+        'clasificador__max_depth': [2, 3, 4, 6, 8, None],
+        'clasificador__min_samples_leaf': [1, 5, 20, 100],
+        'clasificador__class_weight': [None, 'balanced'],
+    },
+    {
+        # 50 árboles: para ordenar candidatos alcanza, y cada ajuste cuesta la mitad
+        'clasificador': [RandomForestClassifier(n_estimators=50, random_state=SEMILLA, n_jobs=1)],
+        'clasificador__max_depth': [4, 8, None],
+        'clasificador__min_samples_leaf': [1, 5, 20],
+        'clasificador__class_weight': [None, 'balanced_subsample'],
+    },
+    {
+        # early_stopping='auto': con más de 10.000 filas corta cuando deja de mejorar
+        'clasificador': [HistGradientBoostingClassifier(early_stopping='auto', random_state=SEMILLA)],
+        'clasificador__learning_rate': [0.05, 0.1, 0.2],
+        'clasificador__max_leaf_nodes': [15, 31],
+        'clasificador__min_samples_leaf': [20, 100],
+        'clasificador__class_weight': [None, 'balanced'],
+    },
+]
+
+FACTOR = 3           # en cada ronda del halving queda 1/FACTOR de los candidatos, con FACTOR veces más filas
+MIN_FILAS = 20_000   # filas de la primera ronda; con menos datos se prueba todo con todas (GridSearchCV)
+MAX_FILAS = 1_000_000  # filas de la última ronda: con millones de clientes, una muestra alcanza para ordenar
+
+
+def ruta_tabla(ruta_excel):
+    return os.path.splitext(ruta_excel)[0] + ".busqueda.csv"
+
+
+def armar_pipeline():
+    """La misma codificación que modelo.armar_pipeline(), con el clasificador a elegir."""
+    return Pipeline([
+        ('codificar', FunctionTransformer(modelo.codificar, feature_names_out='one-to-one')),
+        ('clasificador', DecisionTreeClassifier(random_state=SEMILLA)),
+    ])
+
+
+def buscar(df, pliegues=5, metrica='roc_auc', procesos=-1, halving=None, espacio=ESPACIO,
+           min_filas=MIN_FILAS, max_filas=MAX_FILAS):
+    """Corre la búsqueda y devuelve el buscador ya ajustado (ver tabla_posiciones).
+
+    `halving`: None elige según la cantidad de filas (ver MIN_FILAS).
+    `procesos`: procesos de joblib (-1: todos los núcleos).
+    """
+    X, y = modelo.preparar(df)
+    pliegues = min(pliegues, int(y.value_counts().min()))
+    if pliegues < 2:
+        raise ValueError("hacen falta al menos 2 clientes de cada clase para validar")
+    cv = StratifiedKFold(n_splits=pliegues, shuffle=True, random_state=SEMILLA)
+    if halving is None:
+        halving = len(X) >= min_filas * FACTOR
+    if halving:
+        buscador = HalvingGridSearchCV(armar_pipeline(), espacio, factor=FACTOR, resource='n_samples',
+                                       min_resources=min_filas, max_resources=min(len(X), max_filas),
+                                       scoring=metrica, cv=cv, n_jobs=procesos, random_state=SEMILLA,
+                                       refit=False)
+    else:
+        buscador = GridSearchCV(armar_pipeline(), espacio, scoring=metrica, cv=cv, n_jobs=procesos, refit=False)
+    return buscador.fit(X, y)
+
+
+def tabla_posiciones(buscador, filas):
+    """Una fila por combinación evaluada (la última ronda a la que llegó), de mejor a peor.
+    `filas`: las usadas sin halving."""
+    resultados = pd.DataFrame(buscador.cv_results_)
+    if 'iter' in resultados:
+        clave = resultados['params'].map(repr)
+        resultados = resultados.loc[resultados.assign(clave=clave).sort_values('iter')
+                                    .drop_duplicates('clave', keep='last').index]
+    tabla = pd.DataFrame({
+        'modelo': [type(p['clasificador']).__name__ for p in resultados['params']],
+        'parametros': [{k.split('__', 1)[1]: v for k, v in p.items() if '__' in k} for p in resultados['params']],
+        'puntaje': resultados['mean_test_score'],
+        'desvio': resultados['std_test_score'],
+        'ronda': resultados['iter'] if 'iter' in resultados else 0,
+        'filas': resultados['n_resources'] if 'n_resources' in resultados else filas,
+        'segundos_ajuste': resultados['mean_fit_time'],
+    })
+    # Primero las que llegaron más lejos en el halving; dentro de cada ronda, por puntaje
+    return tabla.sort_values(['ronda', 'puntaje'], ascending=False).reset_index(drop=True)
+
+
+def correr(df, ruta, **opciones):
+    """Busca, guarda la tabla de posiciones en CSV y la devuelve junto con los segundos."""
+    inicio = time.perf_counter()
+    tabla = tabla_posiciones(buscar(df, **opciones), len(df))
+    segundos = time.perf_counter() - inicio
+    tabla.to_csv(ruta, index_label='posicion')
+    return tabla, segundos
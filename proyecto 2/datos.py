@@ -0,0 +1,333 @@
+import hashlib
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pyarrow es opcional: sin él se lee siempre el Excel
+    pa = feather = None
+
+try:
+    import python_calamine  # noqa: F401 (motor de pandas.read_excel en Rust)
+    MOTOR_EXCEL = 'calamine'
+except ImportError:  # opcional: sin él se lee con openpyxl de a lotes
+    MOTOR_EXCEL = None
+
+
+# Columnas del archivo de clientes y su tipo. Las de texto (F/M, Si/No) quedan
+# como categorías: la codificación a 0/1 la hace el Pipeline del modelo. El ID es
+# entero con faltantes (Int64): una fila sin ID se carga igual, como con read_excel.
+ESQUEMA = {
+    'Cliente_ID': 'Int64',
+    'Genero': 'category',
+    'Edad': 'float32',
+    'Recibio_Promo': 'category',
+    'Monto_Promo': 'float32',
+    'Recompra': 'category',
+    'Total_Compras': 'float32',
+    'Ingreso_Mensual': 'float32',
+}
+
+VERSION_CACHE = 3  # cambiarla si cambia ESQUEMA, para descartar las copias viejas
+
+RUTA_EXCEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Mini_Proyecto_Clientes_Promociones.xlsx")
+
+# Copias Feather de los libros, con el hash del contenido como nombre: un libro
+# reenviado con otro nombre o en otra carpeta usa la misma copia. indice.json
+# recuerda ruta, fecha y tamaño de cada libro para no recalcular el hash.
+DIR_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+MAX_COPIAS = 8  # se borran las menos usadas
+
+
+def ruta_cache(huella_libro, dir_cache=DIR_CACHE):
+    return os.path.join(dir_cache, huella_libro + ".feather")
+
+
+def huella(ruta, tam_bloque=1 << 20):
+    """Hash (blake2b) del contenido del archivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_datos(df):
+    """Hash de los valores del DataFrame (no del archivo): identifica los datos con
+    los que se entrenó un modelo aunque el libro se vuelva a guardar igual."""
+    valores = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    h = hashlib.blake2b(valores.tobytes(), digest_size=16)
+    h.update(json.dumps(list(df.columns)).encode())
+    return h.hexdigest()
+
+
+def tipar(df):
+    """Convierte las columnas de ESQUEMA presentes a sus tipos (las demás quedan igual)."""
+    tipos = {c: t for c, t in ESQUEMA.items() if c in df}
+    for columna, tipo in tipos.items():
+        if tipo != 'category':
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+    return df.astype(tipos)
+
+
+def leer_excel(ruta_excel, tam_lote=100_000):
+    """Lee la primera hoja del libro, tipada.
+
+    Con python-calamine instalado, pandas lo lee en Rust (varias veces más
+    rápido que openpyxl). Si no, se recorre con openpyxl de sólo lectura y se
+    tipa de a tam_lote filas (ver leer_por_lotes): en memoria quedan las columnas
+    ya tipadas y no un objeto de Python por celda del libro entero.
+    """
+    if MOTOR_EXCEL is not None:
+        return tipar(pd.read_excel(ruta_excel, engine=MOTOR_EXCEL))
+    lotes = list(leer_por_lotes(ruta_excel, tam_lote))
+    if not lotes:
+        return tipar(pd.DataFrame(columns=list(ESQUEMA)))
+    # Cada lote trae sus propias categorías: se vuelven a unificar
+    return tipar(pd.concat(lotes, ignore_index=True))
+
+
+_XLSX = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_RELACION = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+
+def _primera_hoja(libro):
+    """(nombre dentro del zip de la primera hoja, textos compartidos) de un .xlsx abierto."""
+    hoja = ET.fromstring(libro.read("xl/workbook.xml")).find(_XLSX + "sheets")[0]
+    relaciones = ET.fromstring(libro.read("xl/_rels/workbook.xml.rels"))
+    destino = next(r.get("Target") for r in relaciones if r.get("Id") == hoja.get(_RELACION))
+    nombre = destino.lstrip("/") if destino.startswith("/") else "xl/" + destino
+    compartidos = []
+    if "xl/sharedStrings.xml" in libro.namelist():
+        with libro.open("xl/sharedStrings.xml") as f:
+            for _, elemento in ET.iterparse(f):
+                if elemento.tag == _XLSX + "si":
+                    compartidos.append("".join(t.text or "" for t in elemento.iter(_XLSX + "t")))
+                    elemento.clear()
+    return nombre, compartidos
+
+
+def _indice_columna(letras):
+    indice = 0
+    for letra in letras:
+        indice = indice * 26 + ord(letra) - 64
+    return indice - 1
+
+
+def _filas_xlsx(libro, nombre, compartidos):
+    """Filas (listas de valores) de la hoja, recorriendo su XML con iterparse.
+
+    Tres veces más rápido que openpyxl de sólo lectura, que arma un objeto por
+    celda. Los números quedan int o float y las fechas, como número de serie de
+    Excel: el libro de clientes no tiene fechas.
+    """
+    fila_tag, celda_v, texto_t = _XLSX + "row", _XLSX + "v", _XLSX + "t"
+    columnas = {}
+    datos_hoja = None
+    for evento, elemento in ET.iterparse(libro.open(nombre), events=("start", "end")):
+        if evento == "start":
+            if elemento.tag == _XLSX + "sheetData":
+                datos_hoja = elemento
+            continue
+        if elemento.tag != fila_tag:
+            continue
+        fila = []
+        for celda in elemento:
+            referencia = celda.get("r")
+            if referencia:
+                letras = referencia.rstrip("0123456789")
+                posicion = columnas.get(letras)
+                if posicion is None:
+                    posicion = columnas[letras] = _indice_columna(letras)
+                if posicion > len(fila):
+                    fila.extend([None] * (posicion - len(fila)))
+            tipo = celda.get("t")
+            valor = celda.findtext(celda_v)
+            if tipo is None or tipo == "n":
+                if valor is not None:
+                    valor = float(valor) if "." in valor or "E" in valor or "e" in valor else int(valor)
+            elif tipo == "s":
+                valor = compartidos[int(valor)]
+            elif tipo == "inlineStr":
+                valor = "".join(t.text or "" for t in celda.iter(texto_t))
+            elif tipo == "b":
+                valor = valor == "1"
+            elif tipo == "e":
+                valor = None
+            fila.append(valor)
+        datos_hoja.clear()  # las filas ya leídas no quedan colgadas del árbol
+        yield fila
+
+
+def _filas_excel(ruta):
+    """Filas (listas de valores) de la primera hoja, encabezado incluido (generador).
+    Nunca tiene el libro entero en memoria; si el .xlsx no tiene la estructura
+    esperada, lo lee openpyxl en modo de sólo lectura."""
+    try:
+        libro = zipfile.ZipFile(ruta)
+        nombre, compartidos = _primera_hoja(libro)
+    except (OSError, KeyError, IndexError, TypeError, StopIteration, zipfile.BadZipFile, ET.ParseError):
+        from openpyxl import load_workbook
+        libro = load_workbook(ruta, read_only=True, data_only=True)
+        try:
+            yield from libro.worksheets[0].iter_rows(values_only=True)
+        finally:
+            libro.close()
+        return
+    with libro:
+        yield from _filas_xlsx(libro, nombre, compartidos)
+
+
+def leer_por_lotes(ruta, tam_lote=250_000, columnas=None):
+    """Devuelve el archivo en DataFrames tipados de hasta tam_lote filas (generador).
+
+    Acepta CSV, Parquet o Excel (.xlsx) según la extensión; nunca tiene el
+    archivo completo en memoria. `columnas`: sólo esas (las que falten en el
+    archivo se ignoran).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".parquet":
+        from pyarrow import parquet
+        archivo = parquet.ParquetFile(ruta)
+        if columnas is not None:
+            columnas = [c for c in columnas if c in archivo.schema_arrow.names]
+        for lote in archivo.iter_batches(batch_size=tam_lote, columns=columnas):
+            yield tipar(lote.to_pandas())
+    elif extension in (".xlsx", ".xlsm"):
+        filas = _filas_excel(ruta)
+        try:
+            encabezado = [str(c) for c in next(filas, ())]
+            indices = [i for i, c in enumerate(encabezado) if columnas is None or c in columnas]
+            nombres = [encabezado[i] for i in indices]
+            lote = []
+            for fila in filas:
+                lote.append([fila[i] if i < len(fila) else None for i in indices])
+                if len(lote) >= tam_lote:
+                    yield tipar(pd.DataFrame(lote, columns=nombres))
+                    lote = []
+            if lote:
+                yield tipar(pd.DataFrame(lote, columns=nombres))
+        finally:
+            filas.close()
+    else:
+        tipos = {c: t for c, t in ESQUEMA.items() if t == 'category'}
+        usar = None if columnas is None else (lambda c: c in columnas)
+        with pd.read_csv(ruta, chunksize=tam_lote, usecols=usar, dtype=tipos) as lector:
+            for lote in lector:
+                yield tipar(lote)
+
+
+def escribir_cache(df, ruta, origen):
+    """Copia Feather (columnar) en `ruta`, con `origen` en los metadatos.
+    Escritura atómica: archivo temporal en la misma carpeta + os.replace()."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[b'origen'] = json.dumps(origen).encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+    _escribir_atomico(ruta, lambda f: feather.write_feather(tabla, f))
+
+
+def _escribir_atomico(ruta, escribir):
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _origen_cache(ruta):
+    """Metadatos 'origen' guardados en la copia Feather, o None si no hay copia legible."""
+    try:
+        with pa.memory_map(ruta) as archivo:
+            metadatos = pa.ipc.open_file(archivo).schema.metadata or {}
+        return json.loads(metadatos[b'origen'])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def _leer_indice(dir_cache):
+    try:
+        with open(os.path.join(dir_cache, "indice.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def huella_libro(ruta_excel, dir_cache=DIR_CACHE):
+    """Hash del contenido del libro. Si ruta, fecha de modificación y tamaño son los
+    del índice, se toma de ahí sin leer el archivo; si no, se calcula y se anota."""
+    estado = os.stat(ruta_excel)
+    clave = os.path.abspath(ruta_excel)
+    actual = {'mtime': estado.st_mtime_ns, 'tamano': estado.st_size}
+    indice = _leer_indice(dir_cache)
+    anotado = indice.get(clave, {})
+    if anotado.get('mtime') == actual['mtime'] and anotado.get('tamano') == actual['tamano']:
+        return anotado['huella']
+    actual['huella'] = huella(ruta_excel)
+    indice[clave] = actual
+    try:
+        _escribir_atomico(os.path.join(dir_cache, "indice.json"),
+                          lambda f: f.write(json.dumps(indice, ensure_ascii=False, indent=1).encode()))
+    except OSError:
+        pass  # sin índice sólo se pierde el atajo: la próxima vez se vuelve a calcular el hash
+    return actual['huella']
+
+
+def cache_vigente(ruta):
+    """True si hay una copia Feather legible en `ruta` y es de esta VERSION_CACHE."""
+    if feather is None or not os.path.exists(ruta):
+        return False
+    guardado = _origen_cache(ruta)
+    return guardado is not None and guardado.get('version') == VERSION_CACHE
+
+
+def podar_cache(dir_cache=DIR_CACHE, max_copias=MAX_COPIAS):
+    """Deja las max_copias copias usadas más recientemente (la fecha se actualiza al leerlas)."""
+    try:
+        copias = [e for e in os.scandir(dir_cache) if e.name.endswith(".feather")]
+    except OSError:
+        return
+    copias.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for copia in copias[max_copias:]:
+        try:
+            os.remove(copia.path)
+        except OSError:
+            pass
+
+
+def cargar_clientes(ruta_excel=RUTA_EXCEL, dir_cache=DIR_CACHE):
+    """Clientes del libro, tipados según ESQUEMA.
+
+    Busca la copia Feather por el hash del contenido (ver huella_libro); si no
+    hay, lee el Excel (ver leer_excel) y guarda la copia para las próximas
+    ejecuciones, con éste o con cualquier otro nombre de archivo.
+    """
+    if feather is None:
+        return leer_excel(ruta_excel)
+    huella_actual = huella_libro(ruta_excel, dir_cache)
+    ruta = ruta_cache(huella_actual, dir_cache)
+    if cache_vigente(ruta):
+        try:
+            os.utime(ruta)  # recién usada: la última en podarse
+        except OSError:
+            pass
+        return feather.read_table(ruta).to_pandas()
+    df = leer_excel(ruta_excel)
+    try:
+        escribir_cache(df, ruta, {'version': VERSION_CACHE, 'huella': huella_actual,
+                                  'libro': os.path.basename(ruta_excel)})
+        podar_cache(dir_cache)
+    except OSError as e:
+        print(f" No se pudo guardar {ruta}:", e)
+    return df
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+# Gráficos sin pantalla a partir de una especificación declarativa (dict):
+#
+#   {'tipo': 'barras_h', 'archivo': 'ventas.png', 'datos': df, 'categoria': 'rubro',
+#    'valor': 'importe', 'titulo': 'Ventas por rubro', ...}
+#
+# dibujar() arma la figura con matplotlib.figure.Figure (backend Agg, sin pyplot,
+# así no hace falta pantalla ni un estado global). renderizar() guarda muchas
+# en paralelo en un pool de procesos y saltea las que ya están dibujadas con los
+# mismos datos: la huella de la especificación va en los metadatos del PNG.
+
+VERSION_FIGURAS = 1  # cambiarla si cambia el dibujo de algún tipo, para redibujar todo
+DPI = 150
+TAMANO = (10, 6)
+
+
+def _huella_valor(h, valor):
+    if isinstance(valor, pd.DataFrame):
+        h.update(repr((list(valor.columns), [str(t) for t in valor.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(repr((valor.name, str(valor.dtype))).encode())
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        h.update(repr((valor.shape, str(valor.dtype))).encode())
+        h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, dict):
+        for clave in sorted(valor, key=repr):
+            h.update(repr(clave).encode())
+            _huella_valor(h, valor[clave])
+    elif isinstance(valor, (list, tuple)):
+        h.update(f"[{len(valor)}".encode())
+        for elemento in valor:
+            _huella_valor(h, elemento)
+    elif valor is None or isinstance(valor, (str, int, float, bool)):
+        h.update(repr(valor).encode())
+    else:  # p. ej. el árbol entrenado de plot_tree
+        h.update(pickle.dumps(valor, protocol=4))
+
+
+def huella(spec):
+    """Hash de la especificación completa (datos incluidos), salvo el archivo de salida."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(VERSION_FIGURAS).encode())
+    _huella_valor(h, {k: v for k, v in spec.items() if k != 'archivo'})
+    return h.hexdigest()
+
+
+def _colores(nombre, n):
+    mapa = matplotlib.colormaps[nombre]
+    return mapa(np.linspace(0, 1, n)) if n > 1 else mapa(np.full(n, 0.5))
+
+
+def _barras_h(fig, spec):
+    """Barras horizontales con 'valor (porcentaje%)' en cada una: adentro y en blanco
+    si la barra es larga, afuera y en negro si no. En el orden de las filas."""
+    ax = fig.subplots()
+    datos = spec['datos']
+    valores = datos[spec['valor']].to_numpy(dtype=float)
+    porcentajes = (datos[spec['porcentaje']].to_numpy(dtype=float) if 'porcentaje' in spec
+                   else valores / valores.sum() * 100 if valores.sum() > 0 else np.zeros(len(valores)))
+    y = np.arange(len(valores))
+    colores = _colores(spec.get('colores', 'viridis'), len(valores))
+    maximo = valores.max() if len(valores) else 0
+    adentro = valores > maximo * 0.12 if maximo > 0 else np.zeros(len(valores), dtype=bool)
+    etiquetas = np.array([f"{v:,.2f} ({p:.1f}%)" for v, p in zip(valores, porcentajes)])
+    # Dos grupos de barras, uno por ubicación de la etiqueta: un bar_label por grupo
+    for grupo, separacion, alineacion, color in ((adentro, -6, 'right', 'white'), (~adentro, 6, 'left', 'black')):
+        if not grupo.any():
+            continue
+        barras = ax.barh(y[grupo], valores[grupo], color=colores[grupo])
+        for texto in ax.bar_label(barras, labels=etiquetas[grupo], padding=separacion, color=color, fontsize=9):
+            texto.set_horizontalalignment(alineacion)
+    ax.set_yticks(y, labels=datos[spec['categoria']].astype(str))
+    ax.invert_yaxis()
+    ax.set_xlabel(spec.get('etiqueta_x', spec['valor']))
+    ax.set_title(spec.get('titulo', ''))
+
+
+def _barras(fig, spec):
+    """Barras verticales ya agregadas (una por fila), con colores del mapa."""
+    ax = fig.subplots()
+    datos = spec['datos']
+    x = np.arange(len(datos))
+    ax.bar(x, datos[spec['valor']].to_numpy(dtype=float), color=_colores(spec.get('colores', 'viridis'), len(datos)))
+    ax.set_xticks(x, labels=datos[spec['categoria']].astype(str))
+    if 'limites_y' in spec:
+        ax.set_ylim(*spec['limites_y'])
+    ax.set_xlabel(spec.get('etiqueta_x', spec['categoria']))
+    ax.set_ylabel(spec.get('etiqueta_y', spec['valor']))
+    ax.set_title(spec.get('titulo', ''), fontsize=14)
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+
+
+def _caja(fig, spec):
+    """Diagrama de caja de 'valor' por cada categoría de 'categoria'."""
+    ax = fig.subplots()
+    datos = spec['datos']
+    grupos = datos.groupby(spec['categoria'], observed=True, sort=True)[spec['valor']]
+    nombres = [str(nombre) for nombre, _ in grupos]
+    cajas = ax.boxplot([serie.dropna().to_numpy(dtype=float) for _, serie in grupos], patch_artist=True,
+                       tick_labels=nombres, medianprops={'color': 'black'})
+    for caja, color in zip(cajas['boxes'], _colores(spec.get('colores', 'coolwarm'), len(nombres))):
+        caja.set_facecolor(color)
+    ax.set_xlabel(spec.get('etiqueta_x', spec['categoria']))
+    ax.set_ylabel(spec.get('etiqueta_y', spec['valor']))
+    ax.set_title(spec.get('titulo', ''), fontsize=14)
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+
+
+def _prediccion(fig, spec):
+    """Serie histórica y pronóstico, con flechas desde el último dato por cada paso."""
+    ax = fig.subplots()
+    historico, pronostico = spec['historico'], spec['pronostico']
+    ax.plot(historico.index, historico.to_numpy(), label='Histórico', marker='o')
+    ax.plot(pronostico.index, pronostico.to_numpy(), label='Predicción', marker='o', linestyle='--', color='tab:orange')
+    puntos = list(zip(pronostico.index, pronostico.to_numpy()))
+    desde = [(historico.index[-1], historico.iloc[-1])] + puntos[:-1]
+    for i, (origen, destino) in enumerate(zip(desde, puntos)):
+        ax.annotate('', xy=destino, xytext=origen,
+                    arrowprops=dict(arrowstyle='->', color='tab:orange', lw=1.5 if i == 0 else 1))
+    ax.set_title(spec.get('titulo', ''))
+    ax.set_ylabel(spec.get('etiqueta_y', ''))
+    ax.set_xlabel(spec.get('etiqueta_x', ''))
+    ax.legend()
+
+
+def _arbol(fig, spec):
+    """plot_tree de un árbol de decisión ya entrenado ('modelo')."""
+    from sklearn.tree import plot_tree
+    ax = fig.subplots()
+    plot_tree(spec['modelo'], feature_names=spec.get('variables'), class_names=spec.get('clases'), filled=True, ax=ax)
+    ax.set_title(spec.get('titulo', ''), fontsize=14)
+
+
+TIPOS = {
+    'barras_h': _barras_h,
+    'barras': _barras,
+    'caja': _caja,
+    'prediccion': _prediccion,
+    'arbol': _arbol,
+}
+
+
+def dibujar(spec, fig=None):
+    """Figura de la especificación. `fig`: una ya creada (p. ej. plt.figure() para
+    mostrarla en pantalla); si no, una Figure sin pyplot."""
+    if spec['tipo'] not in TIPOS:
+        raise ValueError(f"tipo de gráfico desconocido: {spec['tipo']!r} (ver figuras.TIPOS)")
+    if fig is None:
+        fig = Figure(figsize=spec.get('tamano', TAMANO))
+        FigureCanvasAgg(fig)
+    TIPOS[spec['tipo']](fig, spec)
+    fig.tight_layout()
+    return fig
+
+
+def huella_guardada(ruta):
+    """Huella en los metadatos del PNG, o None si no existe o no la tiene."""
+    from PIL import Image
+    try:
+        with Image.open(ruta) as imagen:
+            return imagen.text.get('huella')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def guardar(spec, ruta, huella_spec=None):
+    """Dibuja y guarda el PNG con su huella. Escritura atómica: archivo temporal en
+    la misma carpeta + os.replace(). Devuelve los segundos que llevó."""
+    inicio = time.perf_counter()
+    fig = dibujar(spec)
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", suffix=".png", dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            fig.savefig(f, format="png", dpi=spec.get('dpi', DPI), bbox_inches='tight',
+                        metadata={'huella': huella_spec or huella(spec)})
+        os.chmod(temporal, 0o644)  # mkstemp lo crea sólo para el dueño; los informes se comparten
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return time.perf_counter() - inicio
+
+
+def renderizar(specs, directorio, procesos=None, forzar=False):
+    """Guarda cada especificación en directorio/spec['archivo'].
+
+    Las que ya tienen un PNG con la misma huella se saltean (salvo `forzar`); el
+    resto se dibuja en un pool de `procesos` (None: todos los núcleos; 1: en
+    este proceso). Devuelve [(archivo, 'dibujado' | 'sin cambios', segundos)].
+    """
+    os.makedirs(directorio, exist_ok=True)
+    resultado, pendientes = {}, []
+    for spec in specs:
+        ruta = os.path.join(directorio, spec['archivo'])
+        huella_spec = huella(spec)
+        if not forzar and huella_guardada(ruta) == huella_spec:
+            resultado[spec['archivo']] = (spec['archivo'], 'sin cambios', 0.0)
+        else:
+            pendientes.append((spec, ruta, huella_spec))
+    procesos = min(procesos or os.cpu_count() or 1, len(pendientes))
+    if procesos <= 1:
+        segundos = [guardar(*pendiente) for pendiente in pendientes]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            # Cientos de gráficos chicos: de a varios por envío al proceso
+            segundos = list(pool.map(guardar, *zip(*pendientes), chunksize=max(1, len(pendientes) // (procesos * 4))))
+    for (spec, _, _), tiempo in zip(pendientes, segundos):
+        resultado[spec['archivo']] = (spec['archivo'], 'dibujado', tiempo)
+    return [resultado[spec['archivo']] for spec in specs]
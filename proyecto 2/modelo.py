@@ -0,0 +1,135 @@
+import os
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.metrics import classification_report, confusion_matrix
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import FunctionTransformer
+from sklearn.tree import DecisionTreeClassifier
+
+from datos import huella_datos
+
+
+# Modelo de recompra: Pipeline (codificación + árbol de decisión) guardado con
+# joblib junto al libro, con la huella de los datos con que se entrenó. Si los
+# datos y los parámetros no cambiaron, se reutiliza sin volver a entrenar.
+
+CARACTERISTICAS = ['Genero', 'Edad', 'Recibio_Promo', 'Monto_Promo', 'Total_Compras', 'Ingreso_Mensual']
+OBJETIVO = 'Recompra'
+CODIGOS = {
+    'Genero': {'F': 0, 'M': 1},
+    'Recibio_Promo': {'Si': 1, 'No': 0},
+}
+CODIGOS_OBJETIVO = {'Si': 1, 'No': 0}
+CLASES = ["No Recompra", "Recompra"]
+
+PARAMETROS = {'max_depth': 4, 'random_state': 42}
+PRUEBA = 0.2
+SEMILLA_PARTICION = 42
+
+VERSION_MODELO = 1  # cambiarla si cambia el Pipeline o lo que se guarda en el artefacto
+
+
+def ruta_modelo(ruta_excel):
+    return os.path.splitext(ruta_excel)[0] + ".modelo.joblib"
+
+
+def _a_codigos(serie, codigos):
+    """Serie de texto a float según `codigos` (NaN si no está), vía categorías: se
+    busca cada valor distinto una vez y no cada fila."""
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype('category')
+    # Una posición más al final para el código -1 (faltante)
+    tabla = np.array([codigos.get(c, np.nan) for c in serie.cat.categories] + [np.nan], dtype=float)
+    return tabla[serie.cat.codes.to_numpy()]
+
+
+def codificar(X):
+    """Genero y Recibio_Promo a 0/1 (los valores desconocidos quedan NaN); el resto, igual."""
+    X = X.copy()
+    for columna, codigos in CODIGOS.items():
+        X[columna] = _a_codigos(X[columna], codigos)
+    return X
+
+
+def armar_pipeline(**parametros):
+    return Pipeline([
+        ('codificar', FunctionTransformer(codificar, feature_names_out='one-to-one')),
+        ('arbol', DecisionTreeClassifier(**{**PARAMETROS, **parametros})),
+    ])
+
+
+def preparar(df):
+    """X e y del modelo: sólo las filas con valor de recompra."""
+    y = df[OBJETIVO].astype(object).map(CODIGOS_OBJETIVO)
+    conocidos = y.notna().to_numpy()
+    return df.loc[conocidos, CARACTERISTICAS], y[conocidos].astype(int)
+
+
+def entrenar(df, parametros=None):
+    """Entrena con la partición 80/20 y evalúa sobre la prueba. Devuelve el artefacto."""
+    parametros = {**PARAMETROS, **(parametros or {})}
+    X, y = preparar(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=PRUEBA, random_state=SEMILLA_PARTICION)
+    inicio = time.perf_counter()
+    pipeline = armar_pipeline(**parametros).fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+    return {
+        'version': VERSION_MODELO,
+        'sklearn': sklearn.__version__,
+        'huella': huella_datos(df),
+        'parametros': parametros,
+        'pipeline': pipeline,
+        'matriz_confusion': confusion_matrix(y_test, y_pred),
+        'reporte': classification_report(y_test, y_pred, zero_division=0),
+        'filas': len(X),
+        'segundos': time.perf_counter() - inicio,
+        'entrenado': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def guardar(artefacto, ruta):
+    """Escritura atómica del artefacto (joblib)."""
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(ruta)))
+    os.close(fd)
+    try:
+        joblib.dump(artefacto, temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def cargar(ruta):
+    """Artefacto guardado, o None si no hay uno legible de esta versión."""
+    try:
+        artefacto = joblib.load(ruta)
+    except (OSError, EOFError, ValueError, AttributeError, ImportError):
+        return None
+    if not isinstance(artefacto, dict) or artefacto.get('version') != VERSION_MODELO \
+            or artefacto.get('sklearn') != sklearn.__version__:
+        return None
+    return artefacto
+
+
+def obtener(df, ruta, parametros=None, forzar=False):
+    """(artefacto, reutilizado): el guardado en `ruta` si se entrenó con estos mismos
+    datos y parámetros; si no, entrena y lo guarda."""
+    parametros = {**PARAMETROS, **(parametros or {})}
+    if not forzar:
+        artefacto = cargar(ruta)
+        if artefacto is not None and artefacto['huella'] == huella_datos(df) \
+                and artefacto['parametros'] == parametros:
+            return artefacto, True
+    artefacto = entrenar(df, parametros)
+    try:
+        guardar(artefacto, ruta)
+    except OSError as e:
+        print(f" No se pudo guardar {ruta}:", e)
+    return artefacto, False
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import modelo
+from puntuar import Lotes
+
+
+def _pipeline():
+    aleatorio = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        'Genero': aleatorio.choice(['F', 'M'], n),
+        'Edad': aleatorio.integers(18, 70, n),
+        'Recibio_Promo': aleatorio.choice(['Si', 'No'], n),
+        'Monto_Promo': aleatorio.integers(0, 1000, n),
+        'Total_Compras': aleatorio.integers(0, 50, n),
+        'Ingreso_Mensual': aleatorio.integers(300, 5000, n),
+    })
+    y = aleatorio.integers(0, 2, n)
+    return modelo.armar_pipeline().fit(df, y)
+
+
+CLIENTE = {'Genero': 'F', 'Edad': 30, 'Recibio_Promo': 'Si', 'Monto_Promo': 500,
+           'Total_Compras': 10, 'Ingreso_Mensual': 2000}
+
+
+def test_cliente_que_no_es_objeto_no_entra_al_lote():
+    lotes = Lotes(_pipeline())
+    with pytest.raises(TypeError):
+        lotes.enviar(5)
+    assert 0 <= lotes.enviar(CLIENTE).result(timeout=5)['probabilidad'] <= 1
+
+
+def test_cliente_mal_formado_no_hace_fallar_al_resto_del_lote():
+    # Los cuatro en el mismo micro-lote: se cierra al llegar a max_lote
+    lotes = Lotes(_pipeline(), max_lote=4, espera=5)
+    validos = [lotes.enviar({**CLIENTE, 'Edad': edad}) for edad in (25, 40, 60)]
+    malo = lotes.enviar({**CLIENTE, 'Genero': ['F', 'M']})
+    for pendiente, edad in zip(validos, (25, 40, 60)):
+        resultado = pendiente.result(timeout=5)
+        assert resultado['Edad'] == edad
+        assert resultado['recompra'] in ('Si', 'No')
+    with pytest.raises(Exception):
+        malo.result(timeout=5)
+    assert lotes.lotes == 1 and lotes.pedidos == 4
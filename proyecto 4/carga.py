@@ -0,0 +1,219 @@
+import argparse
+import glob
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import datos
+import riesgo
+import servicio
+from filtros import Filtro, MotorFiltros
+from regiones import agregar_ubicacion
+
+
+# Prueba de carga del Dashboard Interactivo sin navegador: varios procesos
+# "servidor" (como varias réplicas de Streamlit), cada uno con sesiones
+# simuladas en hilos que mueven los sliders y piden todo lo que pide la página.
+# Informa la latencia de cada página (p50/p95/p99) y la memoria de cada proceso.
+
+COLUMNAS_RUIDO = ['magnitude', 'depth', 'dmin', 'gap', 'latitude', 'longitude']
+
+
+def catalogo_sintetico(ruta_csv, filas, carpeta, semilla=0):
+    """CSV de `filas` eventos remuestreados del catálogo, con un poco de ruido."""
+    df = datos.leer_csv(ruta_csv)
+    grande = df.sample(filas, replace=True, random_state=semilla).reset_index(drop=True)
+    aleatorio = np.random.default_rng(semilla)
+    for columna in COLUMNAS_RUIDO:
+        grande[columna] = (grande[columna] + aleatorio.normal(0, 0.05, filas)).round(4)
+    grande['magnitude'] = grande['magnitude'].clip(lower=0).round(2)
+    grande['depth'] = grande['depth'].clip(lower=0)
+    grande['latitude'] = grande['latitude'].clip(-90, 90)
+    ruta = os.path.join(carpeta, f"sintetico_{filas}.csv")
+    grande.to_csv(ruta, index=False)
+    return ruta
+
+
+def armar_motor(ruta_csv, compartido):
+    """El motor como lo arma el dashboard (ver cargar_catalogo_vivo)."""
+    modelo = riesgo.obtener(ruta_csv)
+    armar = lambda: MotorFiltros(modelo.agregar_riesgo(agregar_ubicacion(datos.cargar_catalogo(ruta_csv))))
+    motor = servicio.motor_compartido(ruta_csv, armar, clave=modelo.huella) if compartido else armar()
+    motor.estadisticas()
+    return motor
+
+
+def pagina(motor, tareas, filtro, dispersion='dispersion_magnitud_profundidad'):
+    """Lo que calcula una ejecución del Dashboard Interactivo para `filtro`."""
+    metricas = motor.metricas(filtro)
+    if metricas['total'] == 0:
+        return
+    nombres = ('histograma_magnitud', dispersion, 'caja_magnitud_tsunami', 'histograma_profundidad', 'mapa')
+    tareas.anticipar(filtro, nombres)
+    motor.por_anio(filtro)
+    for nombre in nombres:
+        tareas.resultado(nombre, filtro)
+    motor.por_region(filtro)
+    motor.mas_fuertes(filtro, 10)
+    if metricas['total'] > 5:
+        motor.prob_tsunami_magnitud(filtro, bins=5)
+    motor.profundidad_por_tsunami(filtro)
+    motor.correlacion(filtro)
+    motor.resumen()
+
+
+def _valores(desde, hasta, pasos):
+    return np.round(np.linspace(desde, hasta, pasos), 2).tolist()
+
+
+class Sesion(threading.Thread):
+    """Un usuario que, con una pausa entre cambios, mueve un control por vez."""
+
+    def __init__(self, motor, tareas, hasta, pausa, semilla):
+        super().__init__(daemon=True)
+        self.motor, self.tareas, self.hasta, self.pausa = motor, tareas, hasta, pausa
+        self.aleatorio = np.random.default_rng(semilla)
+        self.latencias = []
+        # Algunas sesiones colorean por el riesgo del modelo
+        self.dispersion = 'dispersion_riesgo' if self.aleatorio.random() < 0.3 else 'dispersion_magnitud_profundidad'
+
+    def _mover(self, filtro, limites):
+        # Posiciones discretas, como las de un slider: se repiten combinaciones entre sesiones
+        control = self.aleatorio.integers(5)
+        if control == 3:
+            return filtro._replace(tsunami=str(self.aleatorio.choice(["Todos", "Con Tsunami", "Sin Tsunami"])))
+        if control == 4:
+            # Riesgo en pasos de 5%; el rango completo es "sin filtro", como en el dashboard
+            valores = _valores(0, 1, 21)
+            a, b = sorted(self.aleatorio.choice(len(valores), 2))
+            return filtro._replace(riesgo=None if (a, b) == (0, 20) else (valores[a], valores[b]))
+        campo, pasos = [('anios', None), ('magnitud', 21), ('profundidad', 21)][control]
+        desde, hasta = limites[campo]
+        valores = list(range(desde, hasta + 1)) if pasos is None else _valores(desde, hasta, pasos)
+        a, b = sorted(self.aleatorio.choice(len(valores), 2))
+        return filtro._replace(**{campo: (valores[a], valores[b])})
+
+    def run(self):
+        limites = self.motor.limites()
+        filtro = Filtro(limites['anios'], limites['magnitud'], limites['profundidad'], "Todos")
+        while time.monotonic() < self.hasta:
+            inicio = time.perf_counter()
+            pagina(self.motor, self.tareas, filtro, self.dispersion)
+            self.latencias.append(time.perf_counter() - inicio)
+            time.sleep(self.aleatorio.exponential(self.pausa))
+            filtro = self._mover(filtro, limites)
+
+
+def memoria(pid):
+    """(RSS, PSS) del proceso en MB. PSS reparte las páginas compartidas entre quienes las mapean."""
+    kb = {}
+    for archivo, campo in ((f"/proc/{pid}/status", "VmRSS:"), (f"/proc/{pid}/smaps_rollup", "Pss:")):
+        try:
+            with open(archivo) as f:
+                for linea in f:
+                    if linea.startswith(campo):
+                        kb[campo] = int(linea.split()[1])
+                        break
+        except OSError:
+            pass
+    return kb.get("VmRSS:", 0) / 1024, kb.get("Pss:", 0) / 1024
+
+
+def hijos(pid):
+    resultado = []
+    for archivo in glob.glob(f"/proc/{pid}/task/*/children"):
+        with open(archivo) as f:
+            resultado += [int(p) for p in f.read().split()]
+    return resultado
+
+
+def servidor(numero, ruta_csv, sesiones, duracion, pausa, procesos, compartido, cola):
+    inicio = time.perf_counter()
+    motor = armar_motor(ruta_csv, compartido)
+    pool = servicio.PoolTareas(servicio.ruta_instantanea(ruta_csv), procesos) if procesos else None
+    tareas = servicio.Tareas(motor, pool, servicio.version_compartida(ruta_csv, riesgo.obtener(ruta_csv).huella))
+    arranque = time.perf_counter() - inicio
+    hasta = time.monotonic() + duracion
+    hilos = [Sesion(motor, tareas, hasta, pausa, semilla=numero * 1000 + i) for i in range(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    procesos_memoria = [(f"servidor {numero}", os.getpid(), *memoria(os.getpid()))]
+    procesos_memoria += [(f"  pool {numero}.{i}", pid, *memoria(pid)) for i, pid in enumerate(hijos(os.getpid()))]
+    cola.put({'arranque': arranque, 'latencias': [l for hilo in hilos for l in hilo.latencias],
+              'memoria': procesos_memoria})
+    if pool is not None:
+        pool.cerrar()
+
+
+def correr(ruta_csv, servidores, sesiones, duracion, pausa, procesos, compartido):
+    """Lanza los servidores y junta sus resultados."""
+    riesgo.obtener(ruta_csv)  # si hay que entrenar el modelo, una sola vez
+    if compartido:
+        # Una sola publicación de la instantánea, antes de que arranquen las réplicas
+        armar_motor(ruta_csv, compartido=True)
+    contexto = multiprocessing.get_context("spawn")  # procesos independientes, como réplicas separadas
+    cola = contexto.Queue()
+    hijos_servidor = [contexto.Process(target=servidor, args=(i, ruta_csv, sesiones, duracion, pausa,
+                                                               procesos, compartido, cola))
+                      for i in range(servidores)]
+    for p in hijos_servidor:
+        p.start()
+    resultados = [cola.get() for _ in hijos_servidor]
+    for p in hijos_servidor:
+        p.join()
+    return resultados
+
+
+def informar(resultados, duracion):
+    latencias = np.array([l for r in resultados for l in r['latencias']]) * 1000
+    print("Arranque de cada servidor: " + ", ".join(f"{r['arranque']:.1f} s" for r in resultados))
+    if len(latencias) == 0:
+        print("Ninguna página terminó dentro de la duración de la prueba")
+    else:
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99])
+        print(f"Páginas: {len(latencias):,} ({len(latencias) / duracion:.1f}/s)")
+        print(f"Latencia (ms): p50 {p50:.1f} · p95 {p95:.1f} · p99 {p99:.1f} · máx {latencias.max():.1f}")
+    print(f"{'Proceso':<14}{'PID':>8}{'RSS (MB)':>11}{'PSS (MB)':>11}")
+    total_rss = total_pss = 0
+    for r in resultados:
+        for nombre, pid, rss, pss in r['memoria']:
+            print(f"{nombre:<14}{pid:>8}{rss:>11.1f}{pss:>11.1f}")
+            total_rss += rss
+            total_pss += pss
+    print(f"{'Total':<22}{total_rss:>11.1f}{total_pss:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga del Dashboard Interactivo con sesiones simuladas.")
+    parser.add_argument("--csv", default="earthquake_data_tsunami.csv", help="catálogo de sismos")
+    parser.add_argument("--filas", type=int, help="usar un catálogo sintético de esta cantidad de eventos")
+    parser.add_argument("--servidores", type=int, default=2, help="procesos servidor (réplicas)")
+    parser.add_argument("--sesiones", type=int, default=8, help="sesiones simultáneas por servidor")
+    parser.add_argument("--duracion", type=float, default=30, help="segundos de prueba")
+    parser.add_argument("--pausa", type=float, default=0.5, help="pausa media entre cambios de una sesión (s)")
+    parser.add_argument("--procesos", type=int, default=0, help="procesos del pool de cada servidor (implica --compartido)")
+    parser.add_argument("--compartido", action="store_true", help="mapear la instantánea compartida (ver servicio.py)")
+    args = parser.parse_args()
+
+    carpeta = None
+    ruta = args.csv
+    try:
+        if args.filas:
+            carpeta = tempfile.mkdtemp(prefix="carga_")
+            ruta = catalogo_sintetico(args.csv, args.filas, carpeta)
+        compartido = args.compartido or args.procesos > 0
+        pool = f"pool de {args.procesos} procesos por servidor" if args.procesos else "sin pool"
+        print(f"{args.servidores} servidores x {args.sesiones} sesiones, {args.duracion:.0f} s, "
+              f"{'instantánea compartida' if compartido else 'copia por proceso'}, {pool}")
+        informar(correr(ruta, args.servidores, args.sesiones, args.duracion, args.pausa,
+                        args.procesos, compartido), args.duracion)
+    finally:
+        if carpeta is not None:
+            shutil.rmtree(carpeta, ignore_errors=True)
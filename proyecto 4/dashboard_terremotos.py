@@ -6,9 +6,16 @@ import plotly.graph_objects as go
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
-import folium
 from streamlit_folium import folium_static
-from folium.plugins import HeatMap
+from mapa import mapa_de_agregado
+from filtros import Filtro, MotorFiltros
+from datos import cargar_catalogo
+from ingesta import Catalogo, Ingesta
+from regiones import ANILLO, agregar_ubicacion
+import informe
+import servicio
+import riesgo
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -21,20 +28,104 @@ st.set_page_config(
 )
 
 # Cargar datos
-@st.cache_data
+RUTA_DATOS = "earthquake_data_tsunami.csv"
+
+# Despliegue con varios procesos (ver servicio.py): SISMOS_COMPARTIDO=1 mapea el
+# catálogo preparado desde una instantánea compartida por todos los servidores;
+# SISMOS_PROCESOS=N además reparte los cálculos pesados en N procesos. Con varios
+# servidores y la misma carpeta o feed de ingesta, ingresa uno solo (cerrojo
+# <catálogo>.ingesta.lock) y los demás suman los segmentos que guarda (ver ingesta.py).
+# Prueba de carga: python carga.py (ver carga.py).
+PROCESOS = int(os.environ.get("SISMOS_PROCESOS", "0"))
+COMPARTIDO = PROCESOS > 0 or os.environ.get("SISMOS_COMPARTIDO") == "1"
+
+# Modelo de riesgo de tsunami (ver riesgo.py): el que deja `python riesgo.py` junto
+# al CSV; si no hay ninguno, se entrena una vez al arrancar y se guarda.
+@st.cache_resource
+def cargar_modelo():
+    return riesgo.obtener(RUTA_DATOS)
+
+def preparar(df):
+    """Columnas calculadas de los eventos, al cargar y al ingresar: celda del mapa,
+    región (ver regiones.py) y riesgo del modelo."""
+    return cargar_modelo().agregar_riesgo(agregar_ubicacion(df))
+
+# Tipos compactos y copia .feather mapeada en memoria (ver datos.py), más las columnas
+# calculadas. cache_resource comparte el mismo DataFrame entre sesiones, sin copiarlo
+# en cada llamada.
+@st.cache_resource
 def load_data():
-    df = pd.read_csv("earthquake_data_tsunami.csv")
-    # Limpiar y preparar datos
-    df['date'] = pd.to_datetime(df[['Year', 'Month']].assign(Day=1))
-    return df
-
-df = load_data()
+    return preparar(cargar_catalogo(RUTA_DATOS))
+
+# Catálogo compartido por todas las sesiones: índice de los filtros (ver filtros.py)
+# y agregados del informe. El hilo de ingesta le suma los eventos nuevos que llegan
+# a la carpeta SISMOS_CARPETA_ENTRADA o al feed SISMOS_FEED (ver ingesta.py).
+@st.cache_resource
+def cargar_catalogo_vivo():
+    if COMPARTIDO:
+        motor = servicio.motor_compartido(RUTA_DATOS, lambda: MotorFiltros(load_data()),
+                                          clave=cargar_modelo().huella)
+    else:
+        motor = MotorFiltros(load_data())
+    catalogo = Catalogo(motor, preparar=preparar)
+    # Estadísticas por celda para métricas y correlación (ver estadisticas.py), armadas
+    # al arrancar y no en la primera visita; después la ingesta sólo suma los nuevos
+    catalogo.motor.estadisticas()
+    carpeta = os.environ.get("SISMOS_CARPETA_ENTRADA", "nuevos_eventos")
+    carpeta = carpeta if os.path.isdir(carpeta) else None
+    feed = os.environ.get("SISMOS_FEED")
+    ingesta = None
+    if carpeta or feed:
+        ingesta = Ingesta(catalogo, RUTA_DATOS, carpeta=carpeta, feed=feed)
+        ingesta.start()
+    return catalogo, ingesta
+
+@st.cache_resource
+def cargar_pool():
+    return servicio.PoolTareas(servicio.ruta_instantanea(RUTA_DATOS), PROCESOS) if PROCESOS > 0 else None
+
+# Figuras y mapa de cada filtro (ver servicio.TAREAS), uno por versión del catálogo.
+# Con pool, el motor de cada versión se publica para sus procesos en una instantánea
+# propia de este servidor (ver servicio.PoolTareas).
+@st.cache_resource(max_entries=2)
+def cargar_tareas(version, _motor):
+    pool = cargar_pool()
+    if pool is None:
+        return servicio.Tareas(_motor)
+    instantanea = servicio.version_compartida(RUTA_DATOS, cargar_modelo().huella)
+    return servicio.Tareas(_motor, pool, instantanea + (f"+{version}" if version else ""))
+
+catalogo, ingesta = cargar_catalogo_vivo()
+# Una sola lectura por ejecución: si llegan eventos a mitad de camino, se ven en la próxima
+version_catalogo, motor = catalogo.version, catalogo.motor
+df = motor.df
+tareas = cargar_tareas(version_catalogo, motor)
+
+if ingesta is not None:
+    version = catalogo.version
+
+    # Vuelve a ejecutar la página cuando la ingesta agrega eventos
+    @st.fragment(run_every="5s")
+    def vigilar_ingesta():
+        if catalogo.version != version:
+            st.rerun()
+
+    vigilar_ingesta()
 
 # Navegación principal
 st.sidebar.title("🌍 Navegación")
 pagina = st.sidebar.radio("Selecciona una sección:", ["📖 Introducción e Informe", "📊 Dashboard Interactivo"])
 
+# Informe precalculado (ver informe.py): se arma una vez por versión de los datos y
+# se guarda junto al CSV; la página sólo muestra las figuras y tablas ya listas.
+@st.cache_resource(max_entries=2)
+def cargar_informe(version):
+    datos_informe = informe.obtener(catalogo, RUTA_DATOS)
+    return datos_informe, informe.figuras(datos_informe)
+
 if pagina == "📖 Introducción e Informe":
+    datos_informe, figuras = cargar_informe(catalogo.version)
+    metricas = datos_informe['metricas']
     
     # Título principal
     st.title("📖 Informe Analítico: Patrones Sísmicos y Riesgo de Tsunami (2002-2022)")
@@ -49,14 +140,14 @@ if pagina == "📖 Introducción e Informe":
         st.metric("Período de Análisis", "2002-2022")
     
     with col2:
-        st.metric("Total de Eventos", f"{len(df):,}")
+        st.metric("Total de Eventos", f"{metricas['total']:,}")
     
     with col3:
-        tsunami_count = df['tsunami'].sum()
-        st.metric("Tsunamis Documentados", f"{tsunami_count} ({tsunami_count/len(df)*100:.1f}%)")
+        tsunami_count = metricas['tsunamis']
+        st.metric("Tsunamis Documentados", f"{tsunami_count} ({tsunami_count/metricas['total']*100:.1f}%)")
     
     with col4:
-        st.metric("Magnitud Máxima", f"{df['magnitude'].max():.1f}")
+        st.metric("Magnitud Máxima", f"{metricas['magnitud_max']:.1f}")
     
     st.info("""
     **Región Más Activa:** Anillo de Fuego del Pacífico  
@@ -77,15 +168,7 @@ if pagina == "📖 Introducción e Informe":
     
     with col1:
         st.subheader("Distribución Anual de Eventos")
-        yearly_summary = df.groupby('Year').agg({
-            'magnitude': 'count',
-            'tsunami': 'sum'
-        }).reset_index()
-        
-        fig = px.line(yearly_summary, x='Year', y='magnitude', 
-                     title='Evolución Anual de Terremotos',
-                     markers=True)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figuras['anual'], use_container_width=True)
         
         st.write("""
         **Hallazgo Clave:** Se observa un **ciclo de actividad intensa cada 4-6 años**, con períodos de relativa calma intermedios. 
@@ -94,37 +177,26 @@ if pagina == "📖 Introducción e Informe":
     
     with col2:
         st.subheader("Distribución por Magnitud")
-        magnitude_bins = pd.cut(df['magnitude'], bins=[6.5, 7.0, 7.5, 8.0, 10])
-        mag_dist = df.groupby(magnitude_bins).size().reset_index(name='count')
-        mag_dist['magnitude'] = mag_dist['magnitude'].astype(str)
-        
-        fig = px.pie(mag_dist, values='count', names='magnitude',
-                    title='Distribución de Terremotos por Rango de Magnitud')
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figuras['magnitud'], use_container_width=True)
     
     # Análisis Geográfico
     st.header("🌋 Análisis Geográfico: Las Zonas Críticas")
     
-    st.subheader("Anillo de Fuego del Pacífico - 72% de Eventos")
+    # Región de cada evento asignada al cargar (ver regiones.py)
+    region_df = pd.DataFrame(datos_informe['regiones'])
+    pacific_ring = metricas['anillo']
     
-    # Mapa simplificado
-    pacific_ring = df[
-        (df['latitude'].between(-60, 60)) & 
-        (df['longitude'].between(100, 300))
-    ]
+    st.subheader(f"Anillo de Fuego del Pacífico - {pacific_ring/metricas['total']*100:.0f}% de Eventos")
     
-    st.write(f"**Eventos en Anillo de Fuego:** {len(pacific_ring):,} ({len(pacific_ring)/len(df)*100:.1f}% del total)")
+    st.write(f"**Eventos en Anillo de Fuego:** {pacific_ring:,} ({pacific_ring/metricas['total']*100:.1f}% del total)")
     
     # Tabla de regiones
     st.subheader("Distribución por Regiones Principales")
     
-    region_data = {
-        'Región': ['Pacífico NW', 'Sudamérica', 'Pacífico SW', 'Mediterráneo', 'Otras'],
-        'Total Eventos': [387, 246, 198, 89, len(df) - 920],
-        '% Tsunamis': ['24%', '15%', '19%', '3%', '12%'],
-        'Magnitud Promedio': ['6.9', '6.7', '6.8', '6.5', '6.6']
-    }
-    region_df = pd.DataFrame(region_data)
+    region_df = region_df.assign(**{
+        '% Tsunamis': region_df['% Tsunamis'].map(lambda x: f"{x:.0f}%"),
+        'Magnitud Promedio': region_df['Magnitud Promedio'].map(lambda x: f"{x:.1f}"),
+    })
     st.dataframe(region_df, use_container_width=True)
     
     # Análisis de Magnitud
@@ -134,16 +206,7 @@ if pagina == "📖 Introducción e Informe":
     
     with col1:
         st.subheader("Probabilidad de Tsunami por Magnitud")
-        magnitude_bins = pd.cut(df['magnitude'], bins=5)
-        tsunami_prob = df.groupby(magnitude_bins)['tsunami'].mean().reset_index()
-        # Convertir los Interval a string para que Plotly pueda serializarlo
-        tsunami_prob['magnitude_range'] = tsunami_prob['magnitude'].astype(str)
-        tsunami_prob['tsunami_pct'] = tsunami_prob['tsunami'] * 100
-
-        fig = px.bar(tsunami_prob, x='magnitude_range', y='tsunami_pct',
-                    title='Probabilidad de Tsunami (%) por Rango de Magnitud',
-                    labels={'tsunami_pct': 'Probabilidad (%)', 'magnitude_range': 'Rango de Magnitud'})
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(figuras['prob_tsunami'], use_container_width=True)
     
     with col2:
         st.subheader("Umbrales Identificados")
@@ -159,8 +222,7 @@ if pagina == "📖 Introducción e Informe":
     # Análisis de Profundidad
     st.header("🌊 Análisis de Profundidad: La Variable Oculta")
     
-    depth_analysis = df.groupby('tsunami')['depth'].agg(['mean', 'median', 'std']).reset_index()
-    depth_analysis['tsunami'] = depth_analysis['tsunami'].map({0: 'Sin Tsunami', 1: 'Con Tsunami'})
+    depth_analysis = pd.DataFrame(datos_informe['profundidad'])
     
     col1, col2 = st.columns(2)
     
@@ -190,14 +252,7 @@ if pagina == "📖 Introducción e Informe":
     # Matriz de Correlación
     st.header("🔗 Matriz de Correlación: Interrelaciones Clave")
     
-    numeric_cols = ['magnitude', 'cdi', 'mmi', 'sig', 'nst', 'dmin', 'gap', 'depth', 'tsunami']
-    correlation_matrix = df[numeric_cols].corr()
-    
-    fig = px.imshow(correlation_matrix,
-                  title='Matriz de Correlación entre Variables',
-                  color_continuous_scale='RdBu_r',
-                  aspect='auto')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(figuras['correlacion'], use_container_width=True)
     
     st.write("""
     **Correlaciones Significativas Identificadas:**
@@ -283,21 +338,22 @@ else:  # Dashboard Interactivo
     # Sidebar con filtros
     st.sidebar.header("🔧 Filtros Interactivos")
 
+    limites = motor.limites()
+
     # Filtro de años
-    years = sorted(df['Year'].unique())
     year_range = st.sidebar.slider(
         "Rango de Años",
-        min_value=int(min(years)),
-        max_value=int(max(years)),
-        value=(int(min(years)), int(max(years)))
+        min_value=limites['anios'][0],
+        max_value=limites['anios'][1],
+        value=limites['anios']
     )
 
     # Filtro de magnitud
     magnitude_range = st.sidebar.slider(
         "Rango de Magnitud",
-        min_value=float(df['magnitude'].min()),
-        max_value=float(df['magnitude'].max()),
-        value=(float(df['magnitude'].min()), float(df['magnitude'].max()))
+        min_value=limites['magnitud'][0],
+        max_value=limites['magnitud'][1],
+        value=limites['magnitud']
     )
 
     # Filtro de tsunami
@@ -309,25 +365,35 @@ else:  # Dashboard Interactivo
     # Filtro de profundidad
     depth_range = st.sidebar.slider(
         "Rango de Profundidad (km)",
-        min_value=float(df['depth'].min()),
-        max_value=float(df['depth'].max()),
-        value=(float(df['depth'].min()), float(df['depth'].max()))
+        min_value=limites['profundidad'][0],
+        max_value=limites['profundidad'][1],
+        value=limites['profundidad']
+    )
+
+    # Filtro por la probabilidad de tsunami que estima el modelo (ver riesgo.py)
+    riesgo_range = st.sidebar.slider(
+        "Riesgo de Tsunami del Modelo (%)",
+        min_value=0,
+        max_value=100,
+        value=(0, 100)
     )
+    riesgo_filtro = None if tuple(riesgo_range) == (0, 100) else (riesgo_range[0] / 100, riesgo_range[1] / 100)
 
-    # Aplicar filtros
-    filtered_df = df[
-        (df['Year'] >= year_range[0]) & 
-        (df['Year'] <= year_range[1]) &
-        (df['magnitude'] >= magnitude_range[0]) & 
-        (df['magnitude'] <= magnitude_range[1]) &
-        (df['depth'] >= depth_range[0]) & 
-        (df['depth'] <= depth_range[1])
-    ]
-
-    if tsunami_filter == "Con Tsunami":
-        filtered_df = filtered_df[filtered_df['tsunami'] == 1]
-    elif tsunami_filter == "Sin Tsunami":
-        filtered_df = filtered_df[filtered_df['tsunami'] == 0]
+    color_por = st.sidebar.radio(
+        "Colorear mapa y dispersión por",
+        options=["Tsunami registrado", "Riesgo del modelo"]
+    )
+    por_riesgo = color_por == "Riesgo del modelo"
+    dispersion = 'dispersion_riesgo' if por_riesgo else 'dispersion_magnitud_profundidad'
+
+    # Aplicar filtros: búsqueda binaria sobre los datos ordenados, con los
+    # resultados y agregados de cada combinación de filtros en caché
+    filtro = Filtro(tuple(year_range), tuple(magnitude_range), tuple(depth_range), tsunami_filter, riesgo_filtro)
+    metricas = motor.metricas(filtro)
+    if metricas['total'] > 0:
+        # Con pool, las figuras y el mapa se calculan en paralelo mientras se dibuja el resto
+        tareas.anticipar(filtro, ('histograma_magnitud', dispersion, 'caja_magnitud_tsunami',
+                                  'histograma_profundidad', 'mapa'))
 
     # Métricas principales
     st.subheader("📊 Métricas Principales (Filtradas)")
@@ -337,27 +403,27 @@ else:  # Dashboard Interactivo
     with col1:
         st.metric(
             "Total de Terremotos",
-            len(filtered_df),
-            delta=f"{len(filtered_df) - len(df)} vs total"
+            metricas['total'],
+            delta=f"{metricas['total'] - len(df)} vs total"
         )
 
     with col2:
-        tsunami_count = filtered_df['tsunami'].sum()
+        tsunami_count = metricas['tsunamis']
         st.metric(
             "Terremotos con Tsunami",
             tsunami_count,
-            delta=f"{tsunami_count/len(filtered_df)*100:.1f}%" if len(filtered_df) > 0 else "0%"
+            delta=f"{tsunami_count/metricas['total']*100:.1f}%" if metricas['total'] > 0 else "0%"
         )
 
     with col3:
-        avg_magnitude = filtered_df['magnitude'].mean() if len(filtered_df) > 0 else 0
+        avg_magnitude = metricas['magnitud_promedio']
         st.metric(
             "Magnitud Promedio",
             f"{avg_magnitude:.2f}"
         )
 
     with col4:
-        max_magnitude = filtered_df['magnitude'].max() if len(filtered_df) > 0 else 0
+        max_magnitude = metricas['magnitud_max']
         st.metric(
             "Magnitud Máxima",
             f"{max_magnitude:.2f}"
@@ -371,11 +437,8 @@ else:  # Dashboard Interactivo
 
     with col1:
         # Evolución temporal de terremotos
-        if len(filtered_df) > 0:
-            yearly_data = filtered_df.groupby('Year').agg({
-                'magnitude': 'count',
-                'tsunami': 'sum'
-            }).reset_index()
+        if metricas['total'] > 0:
+            yearly_data = motor.por_anio(filtro)
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(
@@ -404,15 +467,10 @@ else:  # Dashboard Interactivo
 
     with col2:
         # Distribución de magnitudes
-        if len(filtered_df) > 0:
-            fig = px.histogram(
-                filtered_df,
-                x='magnitude',
-                nbins=30,
-                title='Distribución de Magnitudes de Terremotos',
-                color_discrete_sequence=['orange']
-            )
-            fig.update_layout(height=400)
+        if metricas['total'] > 0:
+            # Con muchas filas, conteos / cuartiles / muestra en lugar de puntos crudos
+            # (ver graficos.py); con pool, calculados en otro proceso (ver servicio.py)
+            fig = tareas.resultado('histograma_magnitud', filtro)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No hay datos para mostrar con los filtros aplicados")
@@ -422,35 +480,16 @@ else:  # Dashboard Interactivo
 
     with col1:
         # Relación magnitud vs profundidad
-        if len(filtered_df) > 0:
-            fig = px.scatter(
-                filtered_df,
-                x='magnitude',
-                y='depth',
-                color='tsunami',
-                title='Relación: Magnitud vs Profundidad',
-                labels={'magnitude': 'Magnitud', 'depth': 'Profundidad (km)'},
-                color_discrete_map={0: 'blue', 1: 'red'},
-                hover_data=['Year', 'latitude', 'longitude']
-            )
-            fig.update_layout(height=400)
+        if metricas['total'] > 0:
+            fig = tareas.resultado(dispersion, filtro)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No hay datos para mostrar con los filtros aplicados")
 
     with col2:
         # Boxplot de magnitudes por tsunami
-        if len(filtered_df) > 0:
-            fig = px.box(
-                filtered_df,
-                x='tsunami',
-                y='magnitude',
-                title='Distribución de Magnitudes vs Tsunami',
-                labels={'tsunami': 'Tsunami', 'magnitude': 'Magnitud'},
-                color='tsunami',
-                color_discrete_map={0: 'blue', 1: 'red'}
-            )
-            fig.update_layout(height=400)
+        if metricas['total'] > 0:
+            fig = tareas.resultado('caja_magnitud_tsunami', filtro)
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.warning("No hay datos para mostrar con los filtros aplicados")
@@ -459,77 +498,36 @@ else:  # Dashboard Interactivo
     st.markdown("---")
     st.subheader("🗺️ Mapa de Distribución Geográfica Interactivo")
 
-    if len(filtered_df) > 0:
+    if metricas['total'] > 0:
         col1, col2 = st.columns([3, 1])
 
         with col1:
-            # Crear mapa base
-            m = folium.Map(
-                location=[filtered_df['latitude'].mean(), filtered_df['longitude'].mean()],
-                zoom_start=2,
-                tiles='OpenStreetMap'
-            )
-            
-            # Agregar marcadores para terremotos con tsunami
-            tsunami_df = filtered_df[filtered_df['tsunami'] == 1]
-            for idx, row in tsunami_df.iterrows():
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=row['magnitude'] * 0.8,
-                    popup=f"""
-                    Magnitud: {row['magnitude']}<br>
-                    Profundidad: {row['depth']}km<br>
-                    Año: {row['Year']}<br>
-                    Tsunami: Sí
-                    """,
-                    color='red',
-                    fill=True,
-                    fillColor='red',
-                    fillOpacity=0.6
-                ).add_to(m)
-            
-            # Agregar marcadores para terremotos sin tsunami
-            no_tsunami_df = filtered_df[filtered_df['tsunami'] == 0]
-            for idx, row in no_tsunami_df.iterrows():
-                folium.CircleMarker(
-                    location=[row['latitude'], row['longitude']],
-                    radius=row['magnitude'] * 0.5,
-                    popup=f"""
-                    Magnitud: {row['magnitude']}<br>
-                    Profundidad: {row['depth']}km<br>
-                    Año: {row['Year']}<br>
-                    Tsunami: No
-                    """,
-                    color='blue',
-                    fill=True,
-                    fillColor='blue',
-                    fillOpacity=0.4
-                ).add_to(m)
-            
+            # Eventos agregados por celdas de una grilla: la cantidad de círculos
+            # enviados al navegador está acotada aunque pasen millones de filas
+            agregado = tareas.resultado('mapa', filtro)
+            m = mapa_de_agregado(agregado, color='riesgo' if por_riesgo else 'tsunamis')
             folium_static(m, width=800, height=500)
 
         with col2:
             st.subheader("Leyenda del Mapa")
-            st.markdown("""
-            🔴 **Círculos Rojos**: Terremotos que generaron tsunami
-            🔵 **Círculos Azules**: Terremotos sin tsunami
+            if por_riesgo:
+                color = "riesgo medio de tsunami según el modelo"
+            else:
+                color = "proporción de eventos que generaron tsunami"
+            st.markdown(f"""
+            Cada círculo agrupa los eventos cercanos (ver detalle al hacer clic).
+            
+            🔵 → 🔴 **Color**: {color}, de 0% (azul) a 100% (rojo)
             
-            **Tamaño del círculo**: Proporcional a la magnitud
+            **Tamaño del círculo**: Crece con la cantidad de eventos que agrupa y con su magnitud máxima
             """)
             
             # Estadísticas por región
             st.subheader("Estadísticas por Región")
-            pacific_ring = filtered_df[
-                (filtered_df['latitude'].between(-60, 60)) & 
-                (filtered_df['longitude'].between(100, 300))
-            ]
-            st.metric("Anillo de Fuego", len(pacific_ring))
+            por_region = motor.por_region(filtro).set_index('Región')
+            st.metric("Anillo de Fuego", int(por_region['Total Eventos'].iloc[ANILLO].sum()))
             
-            mediterranean = filtered_df[
-                (filtered_df['latitude'].between(30, 50)) & 
-                (filtered_df['longitude'].between(-10, 40))
-            ]
-            st.metric("Mediterráneo", len(mediterranean))
+            st.metric("Mediterráneo", int(por_region.loc['Mediterráneo', 'Total Eventos']))
     else:
         st.warning("No hay datos para mostrar en el mapa con los filtros aplicados")
 
@@ -537,24 +535,23 @@ else:  # Dashboard Interactivo
     st.markdown("---")
     st.subheader("📊 Análisis Detallado")
 
-    if len(filtered_df) > 0:
+    if metricas['total'] > 0:
         col1, col2 = st.columns(2)
 
         with col1:
             # Top 10 terremotos más fuertes
-            top_earthquakes = filtered_df.nlargest(10, 'magnitude')[['Year', 'magnitude', 'depth', 'tsunami', 'latitude', 'longitude']]
+            top_earthquakes = motor.mas_fuertes(filtro, 10)
             st.subheader("🔝 Top 10 Terremotos Más Fuertes (Filtrados)")
             st.dataframe(top_earthquakes.style.format({
                 'magnitude': '{:.1f}',
-                'depth': '{:.1f}'
+                'depth': '{:.1f}',
+                'riesgo': '{:.1%}'
             }).background_gradient(subset=['magnitude'], cmap='Reds'), use_container_width=True)
 
         with col2:
             # Probabilidad de tsunami por magnitud
-            if len(filtered_df) > 5:
-                magnitude_bins = pd.cut(filtered_df['magnitude'], bins=5)
-                tsunami_prob = filtered_df.groupby(magnitude_bins)['tsunami'].mean().reset_index()
-                tsunami_prob['magnitude_range'] = tsunami_prob['magnitude'].astype(str)
+            if metricas['total'] > 5:
+                tsunami_prob = motor.prob_tsunami_magnitud(filtro, bins=5)
                 
                 fig = px.bar(
                     tsunami_prob,
@@ -578,20 +575,12 @@ else:  # Dashboard Interactivo
 
         with col1:
             # Distribución de profundidades
-            fig = px.histogram(
-                filtered_df,
-                x='depth',
-                nbins=30,
-                title='Distribución de Profundidades (Filtrado)',
-                color='tsunami',
-                color_discrete_map={0: 'blue', 1: 'red'}
-            )
-            fig.update_layout(height=400)
+            fig = tareas.resultado('histograma_profundidad', filtro)
             st.plotly_chart(fig, use_container_width=True)
 
         with col2:
             # Profundidad vs tsunami
-            depth_stats = filtered_df.groupby('tsunami')['depth'].agg(['mean', 'median', 'std']).reset_index()
+            depth_stats = motor.profundidad_por_tsunami(filtro)
             depth_stats['tsunami'] = depth_stats['tsunami'].map({0: 'Sin Tsunami', 1: 'Con Tsunami'})
             
             st.subheader("Estadísticas de Profundidad (Filtrado)")
@@ -607,7 +596,7 @@ else:  # Dashboard Interactivo
 
         # Seleccionar solo columnas numéricas
         numeric_cols = ['magnitude', 'cdi', 'mmi', 'sig', 'nst', 'dmin', 'gap', 'depth', 'tsunami']
-        correlation_matrix = filtered_df[numeric_cols].corr()
+        correlation_matrix = motor.correlacion(filtro, tuple(numeric_cols))
 
         fig = px.imshow(
             correlation_matrix,
@@ -624,12 +613,37 @@ else:  # Dashboard Interactivo
     # Información adicional en el sidebar
     st.sidebar.markdown("---")
     st.sidebar.subheader("ℹ️ Información del Dataset")
+    resumen = motor.resumen()
     st.sidebar.info(f"""
-    **Total de registros:** {len(df):,}
-    **Período:** {df['Year'].min()} - {df['Year'].max()}
-    **Tsunamis registrados:** {df['tsunami'].sum():,}
-    **Magnitud máxima:** {df['magnitude'].max():.1f}
+    **Total de registros:** {resumen['total']:,}
+    **Período:** {resumen['anio_min']} - {resumen['anio_max']}
+    **Tsunamis registrados:** {resumen['tsunamis']:,}
+    **Magnitud máxima:** {resumen['magnitud_max']:.1f}
     """)
+    if ingesta is not None:
+        st.sidebar.caption(f"Eventos ingresados desde el arranque: {catalogo.ingresados:,}"
+                           f" (descartados: {ingesta.estado['descartados']:,})")
+        if ingesta.estado['error']:
+            st.sidebar.warning(f"Ingesta: {ingesta.estado['error']}")
+
+    # Puntaje de un evento nuevo con el modelo (producto escalar en Python, sin recorrer el catálogo)
+    modelo = cargar_modelo()
+    with st.sidebar.expander("🧮 Evaluar un Evento"):
+        evento = {
+            'magnitude': st.number_input("Magnitud", 0.0, 10.0, 7.5, 0.1),
+            'depth': st.number_input("Profundidad (km)", 0.0, 700.0, 30.0, 5.0),
+            'latitude': st.number_input("Latitud", -90.0, 90.0, 38.3, 0.5),
+            'longitude': st.number_input("Longitud", -180.0, 180.0, 142.4, 0.5),
+            'sig': st.number_input("sig", 0, 3000, 900, 10),
+            'mmi': st.number_input("mmi", 0, 12, 7),
+            'cdi': st.number_input("cdi", 0, 12, 6),
+            'gap': st.number_input("gap", 0.0, 360.0, 20.0, 1.0),
+            'dmin': st.number_input("dmin", 0.0, 50.0, 1.0, 0.1),
+        }
+        st.metric("Probabilidad de Tsunami", f"{modelo.puntuar_evento(evento) * 100:.1f}%")
+        metricas_modelo = modelo.artefacto['metricas']
+        st.caption(f"Regresión logística entrenada con {modelo.artefacto['eventos']:,} eventos "
+                   f"({modelo.artefacto['entrenado']}) · AUC de prueba {metricas_modelo['auc']:.3f}")
 
     st.sidebar.markdown("---")
     st.sidebar.subheader("📖 Descripción de Variables")
@@ -638,6 +652,7 @@ else:  # Dashboard Interactivo
     - **cdi, mmi**: Intensidad percibida
     - **depth**: Profundidad (km)
     - **tsunami**: Indica si generó tsunami (1=Sí, 0=No)
+    - **riesgo**: Probabilidad de tsunami según el modelo (ver riesgo.py)
     - **latitude/longitude**: Coordenadas
     """)
 
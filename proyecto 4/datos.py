@@ -0,0 +1,309 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # pyarrow es opcional: sin él se lee siempre el CSV (ya tipado)
+    pa = feather = None
+
+
+# Tipos compactos de cada columna del catálogo. Los rangos reales entran
+# holgados: magnitud < 10, intensidades 0-12, sig < 32767, nst/gap < 1000.
+ESQUEMA = {
+    'magnitude': 'float32',
+    'cdi': 'int8',
+    'mmi': 'int8',
+    'sig': 'int16',
+    'nst': 'int16',
+    'dmin': 'float32',
+    'gap': 'float32',
+    'depth': 'float32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'Year': 'int16',
+    'Month': 'int8',
+    'tsunami': 'int8',
+}
+
+VERSION_CACHE = 1  # cambiarla si cambia ESQUEMA, para descartar las copias viejas
+
+
+def ruta_cache(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".feather"
+
+
+def huella(ruta, tam_bloque=1 << 20):
+    """Hash (blake2b) del contenido del archivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _origen(ruta_csv, con_huella=True):
+    estado = os.stat(ruta_csv)
+    origen = {'version': VERSION_CACHE, 'mtime': estado.st_mtime_ns, 'tamano': estado.st_size}
+    if con_huella:
+        origen['huella'] = huella(ruta_csv)
+    return origen
+
+
+def leer_csv(ruta_csv):
+    """Lee el CSV directamente con los tipos de ESQUEMA."""
+    return pd.read_csv(ruta_csv, dtype=ESQUEMA)
+
+
+def escribir_cache(df, ruta_csv, origen):
+    """Guarda la copia Feather sin compresión (para poder mapearla en memoria), con
+    los datos del CSV de origen en los metadatos."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    metadatos = dict(tabla.schema.metadata or {})
+    metadatos[b'origen'] = json.dumps(origen).encode()
+    escribir_feather(tabla.replace_schema_metadata(metadatos), ruta_cache(ruta_csv))
+
+
+def escribir_feather(tabla, ruta):
+    """Escritura atómica: archivo temporal en la misma carpeta + os.replace().
+
+    Un solo bloque de registros: con varios (por defecto, de 64K filas), to_pandas()
+    tiene que concatenarlos y copia todas las columnas en lugar de usar el mapeo.
+    """
+    _escribir_atomico(ruta, "wb", lambda f: feather.write_feather(tabla, f, compression="uncompressed",
+                                                                  chunksize=max(tabla.num_rows, 1)))
+
+
+def escribir_json(valor, ruta):
+    """Escritura atómica de un JSON: un corte deja el anterior entero, nunca uno a medias."""
+    _escribir_atomico(ruta, "w", lambda f: json.dump(valor, f), encoding="utf-8")
+
+
+def _escribir_atomico(ruta, modo, escribir, **opciones):
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(fd, modo, **opciones) as f:
+            escribir(f)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def _origen_cache(ruta):
+    """Metadatos 'origen' guardados en la copia Feather, o None si no hay copia legible."""
+    try:
+        with pa.memory_map(ruta) as archivo:
+            metadatos = pa.ipc.open_file(archivo).schema.metadata or {}
+        return json.loads(metadatos[b'origen'])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+
+def cache_vigente(ruta_csv):
+    """True si la copia Feather corresponde al CSV actual.
+
+    Coinciden fecha de modificación y tamaño: vigente sin leer el CSV. Si sólo
+    cambió la fecha (archivo copiado o tocado), se compara el hash del contenido.
+    """
+    ruta = ruta_cache(ruta_csv)
+    if feather is None or not os.path.exists(ruta):
+        return False
+    guardado = _origen_cache(ruta)
+    if guardado is None or guardado.get('version') != VERSION_CACHE:
+        return False
+    actual = _origen(ruta_csv, con_huella=False)
+    if guardado['tamano'] != actual['tamano']:
+        return False
+    return guardado['mtime'] == actual['mtime'] or guardado.get('huella') == huella(ruta_csv)
+
+
+def leer_cache(ruta_csv, columnas=None):
+    """Lee la copia Feather mapeada en memoria. Las columnas numéricas sin nulos quedan
+    sobre el mapeo (sin copiarlas), así varios procesos comparten las mismas páginas."""
+    tabla = feather.read_table(ruta_cache(ruta_csv), columns=columnas, memory_map=True)
+    return tabla.to_pandas(split_blocks=True)
+
+
+def agregar_derivadas(df):
+    """Columnas calculadas a partir de las originales: 'date' (primer día del mes)."""
+    if 'Year' not in df or 'Month' not in df:
+        return df
+    meses = (df['Year'].to_numpy(dtype=np.int64) - 1970) * 12 + df['Month'].to_numpy(dtype=np.int64) - 1
+    df['date'] = meses.astype('datetime64[M]').astype('datetime64[ns]')
+    return df
+
+
+def tipar(df):
+    """Convierte un DataFrame con las columnas del catálogo a los tipos de ESQUEMA."""
+    return df[list(ESQUEMA)].astype(ESQUEMA)
+
+
+# --- eventos agregados después de leer el CSV (ver ingesta.py) ---
+# Se guardan como segmentos <nombre>.nuevos.<n>.feather junto al CSV: no
+# dependen de la versión del CSV y se suman al catálogo al cargarlo.
+MAX_SEGMENTOS = 16
+
+
+def segmentos(ruta_csv):
+    base = os.path.splitext(ruta_csv)[0] + ".nuevos."
+    return sorted(glob.glob(glob.escape(base) + "*.feather"), key=_numero_segmento)
+
+
+def _numero_segmento(ruta):
+    try:
+        return int(ruta.rsplit(".", 2)[1])
+    except ValueError:
+        return 0
+
+
+def anexar_segmento(df, ruta_csv, fuente=None):
+    """Guarda eventos nuevos (con los tipos de ESQUEMA) como un segmento más y
+    devuelve su número. `fuente` (algo serializable como JSON: de qué archivo o
+    parte del feed vienen) queda en sus metadatos; ver fuentes_segmentos.
+
+    Cuando se juntan MAX_SEGMENTOS se combinan en uno, para no abrir cientos de
+    archivos. El combinado anota en sus metadatos qué segmentos incluye, así un
+    corte antes de borrar los viejos no duplica eventos (ver leer_segmentos), y
+    qué filas son de cada uno (ver segmentos_nuevos). De las fuentes conserva
+    sólo la del último, el único cuyo lote puede no haberse dado por terminado.
+    """
+    existentes = segmentos(ruta_csv)
+    numero = max([_numero_segmento(r) for r in existentes] + [0]) + 1
+    ruta = f"{os.path.splitext(ruta_csv)[0]}.nuevos.{numero}.feather"
+    tabla = pa.Table.from_pandas(tipar(df), preserve_index=False)
+    if fuente is not None:
+        tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}),
+                                               b'fuente': json.dumps(fuente).encode()})
+    escribir_feather(tabla, ruta)
+    if len(existentes) + 1 < MAX_SEGMENTOS:
+        return numero
+    tablas = [feather.read_table(r) for r in existentes + [ruta]]
+    partes = []
+    for r, tabla in zip(existentes + [ruta], tablas):
+        partes += _partes(tabla, _numero_segmento(r))
+    tabla = pa.concat_tables(tablas).combine_chunks()
+    metadatos = {**(tabla.schema.metadata or {}),
+                 b'incluye': json.dumps(sorted(p for p, _ in partes[:-1])).encode(),
+                 b'partes': json.dumps(partes).encode()}
+    metadatos.pop(b'fuente', None)
+    if fuente is not None:
+        metadatos[b'fuente'] = json.dumps(fuente).encode()
+    tabla = tabla.replace_schema_metadata(metadatos)
+    escribir_feather(tabla, ruta)
+    for viejo in existentes:
+        os.remove(viejo)
+    return numero
+
+
+def _incluidos(tabla):
+    return set(json.loads((tabla.schema.metadata or {}).get(b'incluye', b'[]')))
+
+
+def _partes(tabla, numero):
+    """[[número de segmento, filas], ...] en el orden de las filas del segmento `numero`."""
+    partes = (tabla.schema.metadata or {}).get(b'partes')
+    return json.loads(partes) if partes else [[numero, tabla.num_rows]]
+
+
+def _metadatos_segmentos(ruta_csv):
+    """(número, metadatos) de cada segmento, sin leer los eventos."""
+    for ruta in segmentos(ruta_csv) if feather is not None else []:
+        try:
+            with pa.memory_map(ruta) as archivo:
+                metadatos = pa.ipc.open_file(archivo).schema.metadata or {}
+        except (OSError, pa.ArrowException):  # se borró al combinarse: está en el combinado
+            continue
+        yield _numero_segmento(ruta), metadatos
+
+
+def numeros_segmentos(ruta_csv):
+    """Números de los segmentos guardados, incluidos los que ya están dentro de un combinado."""
+    numeros = set()
+    for numero, metadatos in _metadatos_segmentos(ruta_csv):
+        numeros |= {numero} | set(json.loads(metadatos.get(b'incluye', b'[]')))
+    return numeros
+
+
+def fuentes_segmentos(ruta_csv):
+    """Las `fuente` con que se guardaron los segmentos que hay (ver anexar_segmento)."""
+    return [json.loads(metadatos[b'fuente']) for _, metadatos in _metadatos_segmentos(ruta_csv)
+            if b'fuente' in metadatos]
+
+
+def segmentos_nuevos(ruta_csv, vistos):
+    """(eventos, números) de los segmentos que no están en `vistos`, o (None, set()).
+
+    Para los procesos que no ingresan (ver ingesta.Ingesta): de un combinado se
+    toman sólo las filas de las partes que no estaban en `vistos`.
+    """
+    trozos, numeros = [], set()
+    for ruta in segmentos(ruta_csv) if feather is not None else []:
+        numero = _numero_segmento(ruta)
+        if numero in vistos or numero in numeros:
+            continue
+        try:
+            tabla = feather.read_table(ruta)
+        except (OSError, pa.ArrowException):  # se borró al combinarse: lo trae el combinado
+            continue
+        inicio = 0
+        for parte, filas in _partes(tabla, numero):
+            if parte not in vistos and parte not in numeros:
+                trozos.append(tabla.slice(inicio, filas))
+                numeros.add(parte)
+            inicio += filas
+    if not trozos:
+        return None, numeros
+    return pa.concat_tables(trozos).to_pandas(), numeros
+
+
+def leer_segmentos(ruta_csv, columnas=None):
+    """Eventos de todos los segmentos (o None si no hay), sin los ya incluidos en un combinado."""
+    rutas = segmentos(ruta_csv) if feather is not None else []
+    tablas = {_numero_segmento(r): feather.read_table(r, columns=columnas, memory_map=True) for r in rutas}
+    incluidos = set().union(*[_incluidos(t) for t in tablas.values()]) if tablas else set()
+    tablas = [t for numero, t in tablas.items() if numero not in incluidos]
+    if not tablas:
+        return None
+    return pa.concat_tables(tablas).to_pandas(split_blocks=True)
+
+
+def version_datos(ruta_csv):
+    """Identificador del contenido del catálogo: hash del CSV más los segmentos agregados.
+    Cambia cuando cambian los datos, no cuando sólo se toca el archivo."""
+    guardado = _origen_cache(ruta_cache(ruta_csv)) if cache_vigente(ruta_csv) else None
+    partes = [guardado['huella'] if guardado and 'huella' in guardado else huella(ruta_csv)]
+    partes += [f"{os.path.basename(r)}:{os.path.getsize(r)}" for r in segmentos(ruta_csv)]
+    return hashlib.blake2b("|".join(partes).encode(), digest_size=8).hexdigest()
+
+
+def cargar_catalogo(ruta_csv, columnas=None):
+    """Carga el catálogo de sismos con tipos compactos.
+
+    Usa la copia Feather junto al CSV si está vigente (ver cache_vigente); si no,
+    lee el CSV y regenera la copia para los próximos arranques y procesos. Suma
+    los eventos ingresados después (segmentos .nuevos.<n>.feather).
+    """
+    if cache_vigente(ruta_csv):
+        df = leer_cache(ruta_csv, columnas)
+    else:
+        origen = _origen(ruta_csv)
+        df = leer_csv(ruta_csv)
+        if feather is not None:
+            try:
+                escribir_cache(df, ruta_csv, origen)
+            except OSError as e:
+                print(f" No se pudo guardar {ruta_cache(ruta_csv)}:", e)
+        if columnas is not None:
+            df = df[columnas]
+    nuevos = leer_segmentos(ruta_csv, columnas)
+    if nuevos is not None:
+        df = pd.concat([df, nuevos], ignore_index=True)
+    return agregar_derivadas(df)
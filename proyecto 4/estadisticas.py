@@ -0,0 +1,269 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNAS_NUMERICAS = ['magnitude', 'cdi', 'mmi', 'sig', 'nst', 'dmin', 'gap', 'depth', 'tsunami']
+
+# Bordes de los rangos de magnitud (0.1) y profundidad (25 km). Los extremos
+# infinitos juntan lo que quede afuera; esos rangos nunca están enteros dentro
+# de un filtro, así que sus eventos se suman fila por fila.
+CORTES_MAGNITUD = np.concatenate([[-np.inf], np.round(np.arange(0, 101) / 10, 1), [np.inf]])
+CORTES_PROFUNDIDAD = np.concatenate([[-np.inf], np.arange(0, 725, 25, dtype=float), [np.inf]])
+
+
+class Resumen:
+    """Estadísticos suficientes de un conjunto de eventos: cantidad, sumas, productos
+    cruzados, mínimos y máximos de las columnas. Dos resúmenes se combinan sumándolos (+).
+
+    Las sumas son de los valores menos `referencia` (un valor típico de cada
+    columna), para no perder precisión al calcular varianzas con millones de filas.
+    """
+
+    def __init__(self, n, sumas, productos, minimos, maximos, referencia, columnas=COLUMNAS_NUMERICAS):
+        self.n = n
+        self.sumas = sumas
+        self.productos = productos
+        self.minimos = minimos
+        self.maximos = maximos
+        self.referencia = referencia
+        self.columnas = list(columnas)
+
+    @classmethod
+    def de_filas(cls, valores, referencia, columnas=COLUMNAS_NUMERICAS):
+        """Resumen de una matriz filas x columnas."""
+        centrados = valores - referencia
+        minimos = valores.min(axis=0) if len(valores) else np.full(len(columnas), np.inf)
+        maximos = valores.max(axis=0) if len(valores) else np.full(len(columnas), -np.inf)
+        return cls(len(valores), centrados.sum(axis=0), centrados.T @ centrados, minimos, maximos,
+                   referencia, columnas)
+
+    def __add__(self, otro):
+        return Resumen(self.n + otro.n, self.sumas + otro.sumas, self.productos + otro.productos,
+                       np.minimum(self.minimos, otro.minimos), np.maximum(self.maximos, otro.maximos),
+                       self.referencia, self.columnas)
+
+    def _posicion(self, columna):
+        return self.columnas.index(columna)
+
+    def suma(self, columna):
+        i = self._posicion(columna)
+        return self.sumas[i] + self.n * self.referencia[i]
+
+    def media(self, columna):
+        return self.suma(columna) / self.n if self.n else np.nan
+
+    def maximo(self, columna):
+        return self.maximos[self._posicion(columna)] if self.n else np.nan
+
+    def covarianza(self):
+        if self.n < 2:
+            return np.full((len(self.columnas),) * 2, np.nan)
+        covarianza = (self.productos - np.outer(self.sumas, self.sumas) / self.n) / (self.n - 1)
+        # Una columna constante deja un residuo de redondeo (~1e-20) en vez de 0: se
+        # anula con los extremos, como en DataFrame.cov(), y su correlación da NaN
+        constantes = self.minimos == self.maximos
+        covarianza[constantes, :] = 0
+        covarianza[:, constantes] = 0
+        return covarianza
+
+    def correlacion(self, columnas=None):
+        """Matriz de correlación de Pearson (como DataFrame.corr()) de las columnas pedidas."""
+        columnas = list(columnas or self.columnas)
+        posiciones = [self._posicion(c) for c in columnas]
+        covarianza = self.covarianza()[np.ix_(posiciones, posiciones)]
+        desvio = np.sqrt(np.maximum(np.diag(covarianza), 0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matriz = covarianza / np.outer(desvio, desvio)
+        # Como np.corrcoef: recortado a [-1, 1] por el redondeo
+        matriz = np.clip(matriz, -1, 1)
+        return pd.DataFrame(matriz, index=columnas, columns=columnas)
+
+
+class Estadisticas:
+    """Resúmenes (ver Resumen) por celda tsunami x año x rango de magnitud x rango de profundidad.
+
+    Un filtro del dashboard se responde sumando las celdas que quedan enteras
+    dentro de él, más las filas sueltas de las celdas que corta (ver
+    MotorFiltros.resumen_filtro). Los eventos nuevos se suman a sus celdas con
+    agregar(), sin recorrer los anteriores.
+
+    Las celdas ocupadas se guardan en orden de clave: `claves` (año, tsunami
+    (0 ó 1), rango de magnitud y rango de profundidad en un solo número) y una
+    fila de `n`, `sumas`, `productos`, `minimos` y `maximos` por celda.
+    """
+
+    def __init__(self, referencia, columnas=COLUMNAS_NUMERICAS,
+                 cortes_magnitud=CORTES_MAGNITUD, cortes_profundidad=CORTES_PROFUNDIDAD):
+        self.columnas = list(columnas)
+        self.referencia = np.asarray(referencia, dtype=float)
+        self.cortes_magnitud = cortes_magnitud
+        self.cortes_profundidad = cortes_profundidad
+        self._rangos = (len(cortes_magnitud) - 1) * (len(cortes_profundidad) - 1)
+        k = len(self.columnas)
+        self.claves = np.empty(0, dtype=np.int64)
+        self.n = np.empty(0, dtype=np.int64)
+        self.sumas = np.empty((0, k))
+        self.productos = np.empty((0, k, k))
+        self.minimos = np.empty((0, k))
+        self.maximos = np.empty((0, k))
+
+    @classmethod
+    def desde(cls, df, columnas=COLUMNAS_NUMERICAS):
+        """Estadísticas de un DataFrame (o dict de arreglos) del catálogo."""
+        referencia = [np.round(np.mean(df[c], dtype=float), 1) if len(df[c]) else 0.0 for c in columnas]
+        estadisticas = cls(referencia, columnas)
+        estadisticas.agregar(df)
+        return estadisticas
+
+    def celdas(self, magnitud, profundidad):
+        """Rango de magnitud x rango de profundidad de cada evento, en un solo código."""
+        rango_magnitud = np.searchsorted(self.cortes_magnitud, magnitud, side='right') - 1
+        rango_profundidad = np.searchsorted(self.cortes_profundidad, profundidad, side='right') - 1
+        return (rango_magnitud * (len(self.cortes_profundidad) - 1) + rango_profundidad).astype(np.int32)
+
+    def _claves(self, df):
+        anio = np.asarray(df['Year'], dtype=np.int64)
+        tsunami = np.asarray(df['tsunami'], dtype=np.int64)
+        celda = self.celdas(np.asarray(df['magnitude']), np.asarray(df['depth']))
+        return (anio * 2 + tsunami) * self._rangos + celda
+
+    def _partes(self):
+        """(año, tsunami, código de celda) de cada celda ocupada."""
+        anio_tsunami, celda = np.divmod(self.claves, self._rangos)
+        return anio_tsunami // 2, anio_tsunami % 2, celda
+
+    def copia(self):
+        otra = Estadisticas(self.referencia, self.columnas, self.cortes_magnitud, self.cortes_profundidad)
+        otra.claves, otra.n, otra.sumas = self.claves.copy(), self.n.copy(), self.sumas.copy()
+        otra.productos, otra.minimos, otra.maximos = self.productos.copy(), self.minimos.copy(), self.maximos.copy()
+        return otra
+
+    def agregar(self, df, tam_bloque=1_000_000):
+        """Suma eventos nuevos a sus celdas (modifica estas estadísticas).
+
+        Las sumas se acumulan con bincount sobre el código de celda, por bloques
+        de filas para no tener todas las columnas en float64 a la vez.
+        """
+        claves = self._claves(df)
+        if len(claves) == 0:
+            return
+        primera = claves.min()
+        if claves.max() - primera < 4 * len(claves) + 1_000_000:
+            # Pocas claves posibles (unos años): contar sin ordenar y numerar sólo las ocupadas
+            celda = claves - primera
+            ocupadas = np.flatnonzero(np.bincount(celda))
+            celda = np.searchsorted(ocupadas, celda)
+            claves = ocupadas + primera
+        else:
+            claves, celda = np.unique(claves, return_inverse=True)
+        m = len(claves)
+        k = len(self.columnas)
+        n = np.bincount(celda, minlength=m)
+        sumas = np.zeros((m, k))
+        productos = np.zeros((m, k, k))
+        minimos = np.full((m, k), np.inf)
+        maximos = np.full((m, k), -np.inf)
+        for inicio in range(0, len(celda), tam_bloque):
+            bloque = slice(inicio, inicio + tam_bloque)
+            en_bloque = celda[bloque]
+            valores = [np.asarray(df[c][bloque], dtype=float) for c in self.columnas]
+            centrados = [v - r for v, r in zip(valores, self.referencia)]
+            for i in range(k):
+                sumas[:, i] += np.bincount(en_bloque, weights=centrados[i], minlength=m)
+                np.minimum.at(minimos[:, i], en_bloque, valores[i])
+                np.maximum.at(maximos[:, i], en_bloque, valores[i])
+                for j in range(i, k):
+                    productos[:, i, j] += np.bincount(en_bloque, weights=centrados[i] * centrados[j], minlength=m)
+        productos = np.triu(productos) + np.triu(productos, 1).transpose(0, 2, 1)
+        # Unión de las celdas ocupadas, en orden de clave
+        todas = np.union1d(self.claves, claves)
+        viejas, nuevas = np.searchsorted(todas, self.claves), np.searchsorted(todas, claves)
+        for nombre, lote, vacio in (('n', n, 0), ('sumas', sumas, 0.0), ('productos', productos, 0.0),
+                                    ('minimos', minimos, np.inf), ('maximos', maximos, -np.inf)):
+            actual = getattr(self, nombre)
+            combinado = np.full((len(todas),) + actual.shape[1:], vacio, dtype=actual.dtype)
+            combinado[viejas] = actual
+            if nombre == 'minimos':
+                combinado[nuevas] = np.minimum(combinado[nuevas], lote)
+            elif nombre == 'maximos':
+                combinado[nuevas] = np.maximum(combinado[nuevas], lote)
+            else:
+                combinado[nuevas] += lote
+            setattr(self, nombre, combinado)
+        self.claves = todas
+
+    _ARREGLOS = ('claves', 'n', 'sumas', 'productos', 'minimos', 'maximos')
+
+    def guardar(self, ruta):
+        """Guarda las estadísticas en un .npz (escritura atómica), para otros procesos."""
+        fd, temporal = tempfile.mkstemp(prefix=".tmp_", suffix=".npz", dir=os.path.dirname(os.path.abspath(ruta)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, columnas=np.array(self.columnas), referencia=self.referencia,
+                         cortes_magnitud=self.cortes_magnitud, cortes_profundidad=self.cortes_profundidad,
+                         **{nombre: getattr(self, nombre) for nombre in self._ARREGLOS})
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    @classmethod
+    def cargar(cls, ruta):
+        with np.load(ruta) as archivo:
+            estadisticas = cls(archivo['referencia'], [str(c) for c in archivo['columnas']],
+                               archivo['cortes_magnitud'], archivo['cortes_profundidad'])
+            for nombre in cls._ARREGLOS:
+                setattr(estadisticas, nombre, archivo[nombre])
+        return estadisticas
+
+    def con_nuevos(self, df):
+        """Copia con los eventos nuevos sumados (ésta no cambia)."""
+        otra = self.copia()
+        otra.agregar(df)
+        return otra
+
+    # --- consulta ---
+    def _sumar(self, seleccion):
+        return Resumen(int(self.n[seleccion].sum()), self.sumas[seleccion].sum(axis=0),
+                       self.productos[seleccion].sum(axis=0),
+                       self.minimos[seleccion].min(axis=0, initial=np.inf),
+                       self.maximos[seleccion].max(axis=0, initial=-np.inf), self.referencia, self.columnas)
+
+    def total(self):
+        """Resumen del catálogo completo."""
+        return self._sumar(slice(None))
+
+    def anios(self):
+        """(primer año, último año) con eventos."""
+        anios = self._partes()[0]
+        return int(anios.min()), int(anios.max())
+
+    def partir(self, anios, tsunamis, magnitud, profundidad):
+        """Para un filtro: Resumen de las celdas enteras dentro de él y, por código de
+        celda (ver celdas()), si hay que sumar sus eventos fila por fila.
+
+        Una celda está entera dentro si sus valores mínimo y máximo de magnitud y
+        profundidad lo están (no sólo los bordes del rango: los extremos del
+        catálogo no cortan celdas). Si el filtro corta una celda, todas las de ese
+        código se suman por filas, para no contar dos veces ningún evento.
+        `magnitud` y `profundidad` son (mínimo, máximo) inclusive, en el tipo de la columna.
+        """
+        anio, tsunami, celda = self._partes()
+        en_filtro = (anio >= anios[0]) & (anio <= anios[1]) & np.isin(tsunami, tsunamis)
+        dentro, afuera = en_filtro.copy(), np.zeros(len(celda), dtype=bool)
+        for columna, (minimo, maximo) in (('magnitude', magnitud), ('depth', profundidad)):
+            i = self.columnas.index(columna)
+            dentro &= (self.minimos[:, i] >= float(minimo)) & (self.maximos[:, i] <= float(maximo))
+            afuera |= (self.maximos[:, i] < float(minimo)) | (self.minimos[:, i] > float(maximo))
+        cortada = np.zeros(self._rangos, dtype=bool)
+        cortada[celda[en_filtro & ~dentro & ~afuera]] = True
+        return self._sumar(dentro & ~cortada[celda]), cortada
+
+    def resumir(self, valores):
+        """Resumen de filas sueltas (matriz filas x columnas, en el orden de self.columnas)."""
+        return Resumen.de_filas(np.asarray(valores, dtype=float).reshape(-1, len(self.columnas)),
+                                self.referencia, self.columnas)
@@ -0,0 +1,316 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from estadisticas import COLUMNAS_NUMERICAS, Estadisticas
+from regiones import resumen_regiones
+
+
+# Valores de los filtros del sidebar. Es hashable: sirve de clave de la caché.
+# `riesgo`: rango de probabilidad del modelo (ver riesgo.py), o None para no filtrar.
+Filtro = namedtuple('Filtro', ['anios', 'magnitud', 'profundidad', 'tsunami', 'riesgo'], defaults=(None,))
+
+OPCIONES_TSUNAMI = {"Todos": (0, 1), "Con Tsunami": (1,), "Sin Tsunami": (0,)}
+
+
+class CacheLRU:
+    """Diccionario acotado que descarta lo usado hace más tiempo. Seguro entre hilos
+    (Streamlit atiende cada sesión en un hilo distinto)."""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        with self._bloqueo:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                return self._datos[clave]
+        valor = calcular()
+        with self._bloqueo:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+        return valor
+
+    def __contains__(self, clave):
+        with self._bloqueo:
+            return clave in self._datos
+
+    def limpiar(self):
+        with self._bloqueo:
+            self._datos.clear()
+
+
+class MotorFiltros:
+    """Responde los filtros del dashboard (años, magnitud, profundidad, tsunami) sin
+    recorrer el catálogo completo, y memoriza lo que se calcula para cada filtro.
+
+    Los eventos se guardan ordenados por (tsunami, año, magnitud): cada par
+    (tsunami, año) es un tramo contiguo y, dentro de él, el rango de magnitud se
+    resuelve con búsqueda binaria. Sólo las filas de esos tramos se comparan
+    contra el rango de profundidad. Cada agregado (serie anual, probabilidad
+    por magnitud, correlación, ...) se guarda en una caché LRU con el filtro
+    como clave, así que volver a una combinación de filtros ya vista es inmediato.
+    """
+
+    def __init__(self, df, tam_cache=256, tam_cache_filas=32, ordenado=False, estadisticas=None):
+        if not ordenado:
+            orden = np.lexsort((df['magnitude'].to_numpy(), df['Year'].to_numpy(), df['tsunami'].to_numpy()))
+            df = df.iloc[orden].reset_index(drop=True)
+        self.df = df
+        self._tam_caches = (tam_cache, tam_cache_filas)
+        self._columnas = {c: self.df[c].to_numpy() for c in self.df.columns if pd.api.types.is_numeric_dtype(self.df[c])}
+        self._magnitud = self._columnas['magnitude']
+        self._profundidad = self._columnas['depth']
+        self._tramos = self._armar_tramos(self.df['tsunami'].to_numpy(), self.df['Year'].to_numpy())
+        self._cache = CacheLRU(tam_cache)
+        # Las filas y columnas filtradas ocupan mucho más que los agregados: caché aparte, más chica
+        self._cache_filas = CacheLRU(tam_cache_filas)
+        # Estadísticas por celda (ver estadisticas.py): se arman con la primera consulta que las usa
+        self._estadisticas = estadisticas
+        self._codigos_celda = None
+        self._bloqueo_estadisticas = threading.Lock()
+
+    @staticmethod
+    def _clave_orden(df):
+        """(tsunami, año, magnitud) en un solo número, con el mismo orden que el lexsort."""
+        return ((df['tsunami'].to_numpy(dtype=float) * 10000 + df['Year'].to_numpy(dtype=float)) * 100
+                + df['magnitude'].to_numpy(dtype=float))
+
+    def con_nuevos(self, nuevos):
+        """Otro motor con los eventos nuevos intercalados en su lugar, sin reordenar el catálogo.
+
+        No modifica éste (las sesiones que lo estén usando siguen con datos coherentes)
+        y arranca con las cachés vacías, porque los resultados cambian.
+        """
+        nuevos = nuevos[list(self.df.columns)]
+        clave = self._clave_orden(nuevos)
+        orden = np.argsort(clave, kind='stable')
+        nuevos = nuevos.iloc[orden]
+        # Cada nuevo va después de los existentes con la misma clave (searchsorted 'right')
+        destino = np.searchsorted(self._clave_orden(self.df), clave[orden], side='right') + np.arange(len(nuevos))
+        es_nuevo = np.zeros(len(self.df) + len(nuevos), dtype=bool)
+        es_nuevo[destino] = True
+        columnas = {}
+        for campo in self.df.columns:
+            viejos = self.df[campo].to_numpy()
+            valores = np.empty(len(es_nuevo), dtype=viejos.dtype)
+            valores[~es_nuevo] = viejos
+            valores[es_nuevo] = nuevos[campo].to_numpy(dtype=viejos.dtype)
+            columnas[campo] = valores
+        tam_cache, tam_cache_filas = self._tam_caches
+        # Las estadísticas por celda, si ya estaban armadas, sólo suman los nuevos
+        estadisticas = self._estadisticas.con_nuevos(nuevos) if self._estadisticas is not None else None
+        return MotorFiltros(pd.DataFrame(columnas), tam_cache, tam_cache_filas, ordenado=True,
+                            estadisticas=estadisticas)
+
+    @staticmethod
+    def _armar_tramos(tsunami, anio):
+        """(tsunami, año) -> (inicio, fin) en el orden de self.df."""
+        if len(tsunami) == 0:
+            return {}
+        cortes = np.flatnonzero((np.diff(tsunami) != 0) | (np.diff(anio) != 0)) + 1
+        inicios = np.concatenate([[0], cortes])
+        fines = np.concatenate([cortes, [len(tsunami)]])
+        return {(int(tsunami[i]), int(anio[i])): (int(i), int(f)) for i, f in zip(inicios, fines)}
+
+    # --- consulta ---
+    def posiciones(self, filtro):
+        """Posiciones (en self.df) de los eventos que cumplen el filtro."""
+        return self._cache.obtener(('posiciones', filtro), lambda: self._posiciones(filtro))
+
+    def _rangos(self, filtro):
+        """Rangos de magnitud y profundidad del filtro en el tipo de cada columna: 6.9 en
+        float32 es algo más que 6.9 en float64, y se compara contra valores float32."""
+        (mag_min, mag_max), (prof_min, prof_max) = filtro.magnitud, filtro.profundidad
+        return ((self._magnitud.dtype.type(mag_min), self._magnitud.dtype.type(mag_max)),
+                (self._profundidad.dtype.type(prof_min), self._profundidad.dtype.type(prof_max)))
+
+    def _posiciones(self, filtro):
+        anio_min, anio_max = filtro.anios
+        (mag_min, mag_max), (prof_min, prof_max) = self._rangos(filtro)
+        trozos = []
+        for tsunami in OPCIONES_TSUNAMI[filtro.tsunami]:
+            for anio in range(int(anio_min), int(anio_max) + 1):
+                tramo = self._tramos.get((tsunami, anio))
+                if tramo is None:
+                    continue
+                inicio, fin = tramo
+                magnitudes = self._magnitud[inicio:fin]
+                desde = inicio + np.searchsorted(magnitudes, mag_min, side='left')
+                hasta = inicio + np.searchsorted(magnitudes, mag_max, side='right')
+                if desde < hasta:
+                    trozos.append(np.arange(desde, hasta))
+        if not trozos:
+            return np.empty(0, dtype=np.int64)
+        posiciones = np.concatenate(trozos)
+        profundidad = self._profundidad[posiciones]
+        posiciones = posiciones[(profundidad >= prof_min) & (profundidad <= prof_max)]
+        if filtro.riesgo is not None:
+            riesgo = self._columnas['riesgo']
+            riesgo_min, riesgo_max = (riesgo.dtype.type(v) for v in filtro.riesgo)
+            valores = riesgo[posiciones]
+            posiciones = posiciones[(valores >= riesgo_min) & (valores <= riesgo_max)]
+        return posiciones
+
+    def filas(self, filtro):
+        """DataFrame con los eventos que cumplen el filtro."""
+        return self._cache_filas.obtener(filtro, lambda: self.df.take(self.posiciones(filtro)))
+
+    def memo(self, nombre, filtro, calcular):
+        """Memoriza calcular(filas del filtro) con clave (nombre, filtro)."""
+        return self._cache.obtener((nombre, filtro), lambda: calcular(self.filas(filtro)))
+
+    def limpiar(self):
+        self._cache.limpiar()
+        self._cache_filas.limpiar()
+
+    # --- datos del catálogo completo (para los sliders y el sidebar) ---
+    def limites(self):
+        df = self.df
+        # Redondeados: 9.1 guardado en float32 se lee 9.100000381; al filtrar se vuelve a float32
+        return self._cache.obtener(('limites', None), lambda: {
+            'anios': (int(df['Year'].min()), int(df['Year'].max())),
+            'magnitud': (round(float(df['magnitude'].min()), 6), round(float(df['magnitude'].max()), 6)),
+            'profundidad': (round(float(df['depth'].min()), 6), round(float(df['depth'].max()), 6)),
+        })
+
+    def resumen(self):
+        def calcular():
+            total = self.estadisticas().total()
+            anio_min, anio_max = self.estadisticas().anios()
+            return {
+                'total': total.n,
+                'anio_min': anio_min,
+                'anio_max': anio_max,
+                'tsunamis': int(round(total.suma('tsunami'))),
+                'magnitud_max': float(total.maximo('magnitude')),
+            }
+        return self._cache.obtener(('resumen', None), calcular)
+
+    # --- estadísticos suficientes por celda (ver estadisticas.py) ---
+    def estadisticas(self):
+        with self._bloqueo_estadisticas:
+            if self._estadisticas is None:
+                self._estadisticas = Estadisticas.desde(self._columnas)
+            if self._codigos_celda is None:
+                self._codigos_celda = self._estadisticas.celdas(self._magnitud, self._profundidad)
+            return self._estadisticas
+
+    def resumen_filtro(self, filtro):
+        """Resumen (cantidad, sumas, productos cruzados, mínimos y máximos) de los eventos del filtro.
+
+        Suma las celdas año x magnitud x profundidad que quedan enteras dentro del
+        filtro; de las que el filtro corta, se suman sólo sus filas. Si no corta
+        ninguna (p. ej. con los rangos completos) no se mira ninguna fila. Las celdas
+        no separan por riesgo: con filtro de riesgo se suman todas las filas.
+        """
+        def calcular():
+            estadisticas = self.estadisticas()
+            if filtro.riesgo is not None:
+                posiciones = self.posiciones(filtro)
+                return estadisticas.resumir(np.column_stack([self._columnas[c][posiciones]
+                                                             for c in estadisticas.columnas]))
+            magnitud, profundidad = self._rangos(filtro)
+            enteras, cortada = estadisticas.partir(filtro.anios, OPCIONES_TSUNAMI[filtro.tsunami],
+                                                   magnitud, profundidad)
+            if not cortada.any():
+                return enteras
+            posiciones = self.posiciones(filtro)
+            sueltas = posiciones[cortada[self._codigos_celda[posiciones]]]
+            valores = np.column_stack([self._columnas[c][sueltas] for c in estadisticas.columnas])
+            return enteras + estadisticas.resumir(valores)
+        return self._cache.obtener(('resumen_filtro', filtro), calcular)
+
+    # --- agregados por filtro (con NumPy sobre las posiciones, sin armar el DataFrame) ---
+    def _columna(self, nombre, filtro):
+        """Valores de una columna para el filtro (compartidos entre los agregados del mismo filtro)."""
+        return self._cache_filas.obtener((nombre, filtro), lambda: self._columnas[nombre][self.posiciones(filtro)])
+
+    def metricas(self, filtro):
+        def calcular():
+            resumen = self.resumen_filtro(filtro)
+            return {
+                'total': resumen.n,
+                'tsunamis': int(round(resumen.suma('tsunami'))),
+                'magnitud_promedio': float(resumen.media('magnitude')) if resumen.n else 0,
+                'magnitud_max': float(resumen.maximo('magnitude')) if resumen.n else 0,
+            }
+        return self._cache.obtener(('metricas', filtro), calcular)
+
+    def por_anio(self, filtro):
+        """Cantidad de terremotos ('magnitude') y de tsunamis por año, como groupby('Year')."""
+        def calcular():
+            anio, tsunami = self._columna('Year', filtro), self._columna('tsunami', filtro)
+            if len(anio) == 0:
+                return pd.DataFrame({'Year': [], 'magnitude': [], 'tsunami': []})
+            primero = anio.min()
+            cantidad = np.bincount(anio - primero)
+            tsunamis = np.bincount(anio - primero, weights=tsunami).astype(np.int64)
+            presentes = np.flatnonzero(cantidad)
+            return pd.DataFrame({'Year': presentes + primero, 'magnitude': cantidad[presentes],
+                                 'tsunami': tsunamis[presentes]})
+        return self._cache.obtener(('por_anio', filtro), calcular)
+
+    def prob_tsunami_magnitud(self, filtro, bins=5):
+        """Proporción de tsunamis en `bins` rangos iguales de magnitud (los de pd.cut(bins=bins))."""
+        def calcular():
+            magnitud, tsunami = self._columna('magnitude', filtro), self._columna('tsunami', filtro)
+            # pd.cut sobre los extremos da los mismos cortes y etiquetas que sobre todos los valores
+            _, cortes = pd.cut(np.array([magnitud.min(), magnitud.max()]), bins=bins, retbins=True)
+            rangos = pd.cut(np.array([magnitud.min(), magnitud.max()]), bins=cortes, include_lowest=False).categories
+            grupo = np.clip(np.searchsorted(cortes, magnitud, side='left') - 1, 0, bins - 1)
+            cantidad = np.bincount(grupo, minlength=bins)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                prob = np.bincount(grupo, weights=tsunami, minlength=bins) / cantidad
+            return pd.DataFrame({'magnitude': rangos, 'tsunami': prob, 'magnitude_range': rangos.astype(str)})
+        return self._cache.obtener(('prob_tsunami_magnitud', bins, filtro), calcular)
+
+    def profundidad_por_tsunami(self, filtro):
+        def calcular():
+            profundidad, tsunami = self._columna('depth', filtro), self._columna('tsunami', filtro)
+            filas = []
+            for valor in (0, 1):
+                grupo = profundidad[tsunami == valor]
+                if len(grupo):
+                    filas.append({'tsunami': valor, 'mean': grupo.mean(), 'median': np.median(grupo),
+                                  'std': grupo.std(ddof=1) if len(grupo) > 1 else np.nan})
+            return pd.DataFrame(filas, columns=['tsunami', 'mean', 'median', 'std'])
+        return self._cache.obtener(('profundidad_por_tsunami', filtro), calcular)
+
+    def por_region(self, filtro=None):
+        """Eventos, % de tsunamis y magnitud promedio por región (ver regiones.py).
+        Sin filtro, del catálogo completo."""
+        def calcular():
+            if filtro is None:
+                columna = self._columnas.__getitem__
+            else:
+                columna = lambda nombre: self._columna(nombre, filtro)
+            return resumen_regiones(columna('region'), columna('tsunami'), columna('magnitude'))
+        return self._cache.obtener(('por_region', filtro), calcular)
+
+    def correlacion(self, filtro, columnas=tuple(COLUMNAS_NUMERICAS)):
+        def calcular():
+            if set(columnas) <= set(self.estadisticas().columnas):
+                return self.resumen_filtro(filtro).correlacion(columnas)
+            datos = np.vstack([self._columna(c, filtro).astype(float) for c in columnas])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                matriz = np.corrcoef(datos) if datos.shape[1] > 1 else np.full((len(columnas),) * 2, np.nan)
+            return pd.DataFrame(matriz, index=list(columnas), columns=list(columnas))
+        return self._cache.obtener(('correlacion', columnas, filtro), calcular)
+
+    def mas_fuertes(self, filtro, n=10):
+        def calcular():
+            posiciones = self.posiciones(filtro)
+            magnitud = self._magnitud[posiciones]
+            if len(magnitud) > n:
+                posiciones = posiciones[np.argpartition(-magnitud, n)[:n]]
+            filas = self.df.take(posiciones)
+            columnas = ['Year', 'magnitude', 'depth', 'tsunami', 'latitude', 'longitude']
+            return filas.nlargest(n, 'magnitude')[columnas + (['riesgo'] if 'riesgo' in filas else [])]
+        return self._cache.obtener(('mas_fuertes', n, filtro), calcular)
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+# Hasta esta cantidad de filas los gráficos llevan los puntos crudos (como px.*);
+# por encima, se mandan al navegador conteos, cuartiles o una muestra.
+UMBRAL_PUNTOS = int(os.environ.get("SISMOS_UMBRAL_PUNTOS", 20_000))
+MAX_PUNTOS_DISPERSION = 10_000
+MAX_ATIPICOS = 2_000
+GRILLA_MUESTRA = 100  # celdas por eje para la muestra del gráfico de dispersión
+
+# plotly.express no es seguro entre hilos: dos sesiones que arman figuras a la vez
+# recorren la misma plantilla y fallan con "ValueError: Invalid value". Es código
+# Python puro (no suelta el GIL), así que serializarlo no cuesta paralelismo.
+_bloqueo_px = threading.Lock()
+
+
+def _px(funcion, *args, **kwargs):
+    with _bloqueo_px:
+        return funcion(*args, **kwargs)
+
+
+def _colores(valores, color, mapa_colores):
+    """Grupos [(valor, máscara, color)] o un único grupo si no se colorea."""
+    if color is None:
+        return [(None, np.ones(len(valores), dtype=bool), None)]
+    grupos = np.unique(color)
+    return [(g, color == g, (mapa_colores or {}).get(g)) for g in grupos]
+
+
+def histograma(df, x, nbins=30, color=None, color_discrete_map=None, color_discrete_sequence=None,
+               umbral=UMBRAL_PUNTOS, **kwargs):
+    """px.histogram, o con muchas filas barras ya contadas con NumPy (sólo `nbins` valores por grupo)."""
+    if len(df) <= umbral:
+        return _px(px.histogram, df, x=x, nbins=nbins, color=color, color_discrete_map=color_discrete_map,
+                   color_discrete_sequence=color_discrete_sequence, **kwargs)
+    valores = df[x].to_numpy(dtype=float)
+    cortes = np.histogram_bin_edges(valores, bins=nbins)
+    centros, anchos = (cortes[:-1] + cortes[1:]) / 2, np.diff(cortes)
+    fig = go.Figure()
+    grupos = _colores(valores, None if color is None else df[color].to_numpy(), color_discrete_map)
+    for valor, mascara, tono in grupos:
+        cantidad, _ = np.histogram(valores[mascara], bins=cortes)
+        tono = tono or (color_discrete_sequence or [None])[0]
+        fig.add_trace(go.Bar(x=centros, y=cantidad, width=anchos, marker_color=tono,
+                             name=str(valor) if valor is not None else x, showlegend=valor is not None,
+                             hovertemplate=f"{x}=%{{x}}<br>count=%{{y}}<extra></extra>"))
+    fig.update_layout(barmode='stack', bargap=0, xaxis_title=x, yaxis_title='count',
+                      legend_title_text=color, title=kwargs.get('title'))
+    return fig
+
+
+def _resumen_caja(valores):
+    """Cuartiles y bigotes (1.5 IQR, recortados a los datos) como los calcula Plotly."""
+    q1, mediana, q3 = np.quantile(valores, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    dentro = valores[(valores >= q1 - 1.5 * iqr) & (valores <= q3 + 1.5 * iqr)]
+    bajo, alto = (dentro.min(), dentro.max()) if len(dentro) else (q1, q3)
+    atipicos = valores[(valores < bajo) | (valores > alto)]
+    return q1, mediana, q3, bajo, alto, atipicos
+
+
+def caja(df, x, y, color=None, color_discrete_map=None, umbral=UMBRAL_PUNTOS, **kwargs):
+    """px.box, o con muchas filas sólo los cuartiles por grupo y una muestra de los atípicos."""
+    if len(df) <= umbral:
+        return _px(px.box, df, x=x, y=y, color=color, color_discrete_map=color_discrete_map, **kwargs)
+    labels = kwargs.get('labels', {})
+    valores = df[y].to_numpy(dtype=float)
+    grupos = df[x].to_numpy()
+    fig = go.Figure()
+    aleatorio = np.random.default_rng(0)
+    for grupo in np.unique(grupos):
+        en_grupo = valores[grupos == grupo]
+        q1, mediana, q3, bajo, alto, atipicos = _resumen_caja(en_grupo)
+        tono = (color_discrete_map or {}).get(grupo)
+        fig.add_trace(go.Box(x=[grupo], q1=[q1], median=[mediana], q3=[q3], lowerfence=[bajo], upperfence=[alto],
+                             name=str(grupo), marker_color=tono, boxpoints=False))
+        if len(atipicos) > MAX_ATIPICOS:
+            atipicos = aleatorio.choice(atipicos, MAX_ATIPICOS, replace=False)
+        if len(atipicos):
+            fig.add_trace(go.Scattergl(x=np.full(len(atipicos), grupo), y=atipicos, mode='markers',
+                                       marker=dict(color=tono, size=4), showlegend=False, name=str(grupo)))
+    fig.update_layout(title=kwargs.get('title'), xaxis_title=labels.get(x, x), yaxis_title=labels.get(y, y),
+                      legend_title_text=labels.get(color, color))
+    return fig
+
+
+def muestra_por_densidad(x, y, maximo, grilla=GRILLA_MUESTRA, semilla=0):
+    """Posiciones de una muestra de a lo sumo `maximo` puntos que conserva las zonas ralas.
+
+    Los puntos se reparten en una grilla de grilla x grilla celdas y de cada celda
+    se toman, al azar, unos `cupo`: las celdas densas se ralean y las poco pobladas
+    (atípicos incluidos) quedan completas. El cupo es el mayor que entra en `maximo`.
+    Sin ordenar: cada punto entra con probabilidad cupo / puntos de su celda.
+    """
+    n = len(x)
+    if n <= maximo:
+        return np.arange(n)
+
+    def indice(v):
+        v = np.asarray(v, dtype=float)
+        minimo, rango = v.min(), np.ptp(v) or 1.0
+        return np.minimum(((v - minimo) / rango * grilla).astype(np.int64), grilla - 1)
+
+    celda = indice(x) * grilla + indice(y)
+    por_celda = np.bincount(celda, minlength=grilla * grilla)
+    cantidades = np.sort(por_celda[por_celda > 0])
+    # total con cupo c = suma(min(cantidad, c)); se busca el mayor c que no supera `maximo`
+    acumulado = np.concatenate([[0], np.cumsum(cantidades)])
+    restantes = len(cantidades) - np.arange(len(cantidades) + 1)
+    cupos = np.arange(1, cantidades[-1] + 1)
+    k = np.searchsorted(cantidades, cupos, side='left')
+    totales = acumulado[k] + cupos * restantes[k]
+    cupo = cupos[max(np.searchsorted(totales, maximo, side='right') - 1, 0)]
+    aleatorio = np.random.default_rng(semilla)
+    elegidos = np.flatnonzero(aleatorio.random(n) * por_celda[celda] < cupo)
+    if len(elegidos) > maximo:  # por azar, o por haber más celdas ocupadas que `maximo`
+        elegidos = np.sort(aleatorio.choice(elegidos, maximo, replace=False))
+    return elegidos
+
+
+def dispersion(df, x, y, umbral=UMBRAL_PUNTOS, maximo=MAX_PUNTOS_DISPERSION, **kwargs):
+    """px.scatter, o con muchas filas sobre una muestra por densidad (ver muestra_por_densidad)."""
+    if len(df) <= umbral:
+        return _px(px.scatter, df, x=x, y=y, **kwargs)
+    posiciones = muestra_por_densidad(df[x].to_numpy(), df[y].to_numpy(), maximo)
+    fig = _px(px.scatter, df.take(posiciones), x=x, y=y, render_mode='webgl', **kwargs)
+    titulo = kwargs.get('title') or ''
+    fig.update_layout(title=f"{titulo} (muestra de {len(posiciones):,} de {len(df):,} eventos)")
+    return fig
@@ -0,0 +1,181 @@
+import argparse
+import html
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+import datos
+from filtros import COLUMNAS_NUMERICAS, MotorFiltros
+from ingesta import Catalogo
+from regiones import ANILLO, agregar_ubicacion
+
+
+# Cambiarla si cambia lo que guarda construir(), para descartar informes viejos
+VERSION_INFORME = 1
+
+
+def ruta_informe(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".informe.json"
+
+
+def construir(catalogo):
+    """Calcula los agregados y figuras de la página 'Introducción e Informe'.
+
+    Devuelve un dict serializable: métricas, tablas (listas de registros) y
+    figuras (JSON de Plotly). No depende de Streamlit.
+    """
+    df, motor, agregados = catalogo.df, catalogo.motor, catalogo.agregados
+
+    yearly_summary = agregados.anual()
+    fig_anual = px.line(yearly_summary, x='Year', y='magnitude',
+                        title='Evolución Anual de Terremotos',
+                        markers=True)
+
+    mag_dist = agregados.distribucion_magnitud()
+    fig_magnitud = px.pie(mag_dist, values='count', names='magnitude',
+                          title='Distribución de Terremotos por Rango de Magnitud')
+
+    tsunami_prob = agregados.prob_tsunami(bins=5)
+    tsunami_prob['tsunami_pct'] = tsunami_prob['tsunami'] * 100
+    fig_prob = px.bar(tsunami_prob, x='magnitude_range', y='tsunami_pct',
+                      title='Probabilidad de Tsunami (%) por Rango de Magnitud',
+                      labels={'tsunami_pct': 'Probabilidad (%)', 'magnitude_range': 'Rango de Magnitud'})
+
+    correlation_matrix = df[COLUMNAS_NUMERICAS].corr()
+    fig_correlacion = px.imshow(correlation_matrix,
+                                title='Matriz de Correlación entre Variables',
+                                color_continuous_scale='RdBu_r',
+                                aspect='auto')
+
+    depth_analysis = df.groupby('tsunami')['depth'].agg(['mean', 'median', 'std']).reset_index()
+    depth_analysis['tsunami'] = depth_analysis['tsunami'].map({0: 'Sin Tsunami', 1: 'Con Tsunami'})
+
+    region_df = motor.por_region()
+    return {
+        'version': VERSION_INFORME,
+        'generado': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'metricas': {
+            'total': len(df),
+            'tsunamis': int(df['tsunami'].sum()),
+            'magnitud_max': float(df['magnitude'].max()),
+            'anillo': int(region_df['Total Eventos'].iloc[ANILLO].sum()),
+        },
+        'regiones': region_df.to_dict('records'),
+        'profundidad': depth_analysis.astype({c: float for c in ('mean', 'median', 'std')}).to_dict('records'),
+        'figuras': {
+            'anual': fig_anual.to_json(),
+            'magnitud': fig_magnitud.to_json(),
+            'prob_tsunami': fig_prob.to_json(),
+            'correlacion': fig_correlacion.to_json(),
+        },
+    }
+
+
+def guardar(informe, ruta):
+    """Escritura atómica del informe (JSON)."""
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def leer(ruta, clave):
+    """Informe guardado si corresponde a la versión `clave` de los datos; si no, None."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            informe = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if informe.get('version') != VERSION_INFORME or informe.get('clave') != clave:
+        return None
+    return informe
+
+
+def obtener(catalogo, ruta_csv):
+    """Informe de la versión actual de los datos: el guardado junto al CSV si está al
+    día; si no, lo construye y lo guarda para los próximos arranques."""
+    clave = datos.version_datos(ruta_csv)
+    ruta = ruta_informe(ruta_csv)
+    informe = leer(ruta, clave)
+    if informe is None:
+        informe = construir(catalogo)
+        informe['clave'] = clave
+        try:
+            guardar(informe, ruta)
+        except OSError as e:
+            print(f" No se pudo guardar {ruta}:", e)
+    return informe
+
+
+def figuras(informe):
+    """Figuras de Plotly del informe (se deserializan una vez por versión)."""
+    return {nombre: pio.from_json(texto) for nombre, texto in informe['figuras'].items()}
+
+
+def exportar_html(informe, ruta):
+    """Informe independiente en un solo archivo HTML (Plotly incluido, sin conexión)."""
+    metricas = informe['metricas']
+    regiones = pd.DataFrame(informe['regiones'])
+    profundidad = pd.DataFrame(informe['profundidad'])
+    figs = figuras(informe)
+
+    def figura(nombre, primera=False):
+        return pio.to_html(figs[nombre], full_html=False, include_plotlyjs=primera)
+
+    partes = [
+        "<!DOCTYPE html><html lang='es'><head><meta charset='utf-8'>",
+        "<title>Informe Analítico: Patrones Sísmicos y Riesgo de Tsunami</title>",
+        "<style>body{font-family:sans-serif;max-width:1100px;margin:auto;padding:1em}"
+        "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}</style>",
+        "</head><body>",
+        "<h1>📖 Informe Analítico: Patrones Sísmicos y Riesgo de Tsunami</h1>",
+        f"<p><small>Generado: {html.escape(informe['generado'])} · versión de datos {html.escape(informe.get('clave', ''))}</small></p>",
+        "<h2>📊 Resumen Ejecutivo</h2><ul>",
+        f"<li><b>Total de Eventos:</b> {metricas['total']:,}</li>",
+        f"<li><b>Tsunamis Documentados:</b> {metricas['tsunamis']:,} ({metricas['tsunamis'] / metricas['total'] * 100:.1f}%)</li>",
+        f"<li><b>Magnitud Máxima:</b> {metricas['magnitud_max']:.1f}</li>",
+        f"<li><b>Eventos en Anillo de Fuego:</b> {metricas['anillo']:,} ({metricas['anillo'] / metricas['total'] * 100:.1f}% del total)</li>",
+        "</ul>",
+        "<h2>📈 Análisis Temporal: Evolución y Tendencias</h2>",
+        figura('anual', primera=True),
+        figura('magnitud'),
+        "<h2>🌋 Análisis Geográfico: Las Zonas Críticas</h2>",
+        regiones.to_html(index=False, float_format=lambda x: f"{x:.1f}"),
+        "<h2>⚡ Análisis de Magnitud: Umbrales Críticos</h2>",
+        figura('prob_tsunami'),
+        "<h2>🌊 Análisis de Profundidad</h2>",
+        profundidad.to_html(index=False, float_format=lambda x: f"{x:.1f} km"),
+        "<h2>🔗 Matriz de Correlación: Interrelaciones Clave</h2>",
+        figura('correlacion'),
+        "</body></html>",
+    ]
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("\n".join(partes))
+
+
+def cargar(ruta_csv):
+    """Catálogo completo como lo arma el dashboard (con región y celda del mapa)."""
+    return Catalogo(MotorFiltros(agregar_ubicacion(datos.cargar_catalogo(ruta_csv))), preparar=agregar_ubicacion)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera el informe estático del dashboard de terremotos.")
+    parser.add_argument("--csv", default="earthquake_data_tsunami.csv", help="catálogo de sismos")
+    parser.add_argument("--html", help="además, exportar el informe como HTML independiente")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    informe = obtener(cargar(args.csv), args.csv)
+    print(f"Informe {informe['clave']} listo en {ruta_informe(args.csv)} ({time.perf_counter() - inicio:.1f} s)")
+    if args.html:
+        exportar_html(informe, args.html)
+        print(f"HTML exportado en {args.html}")
@@ -0,0 +1,392 @@
+import glob
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import datos
+from datos import ESQUEMA
+
+
+# Cortes de la torta 'Distribución por Magnitud' del informe
+CORTES_MAGNITUD = [6.5, 7.0, 7.5, 8.0, 10]
+
+
+class Agregados:
+    """Resúmenes del catálogo completo que se actualizan sumando sólo los eventos nuevos.
+
+    Guarda cantidad de eventos y de tsunamis por año y por cada valor distinto de
+    magnitud (son pocos: vienen con uno o dos decimales). Con eso se arman los
+    gráficos anuales y por rango de magnitud sin recorrer el histórico.
+    """
+
+    def __init__(self, df=None):
+        self._cerrojo = threading.Lock()
+        self._anual = pd.DataFrame({'cantidad': [], 'tsunamis': []}, dtype=np.int64)
+        self._magnitudes = pd.DataFrame({'cantidad': [], 'tsunamis': []}, dtype=np.int64)
+        if df is not None:
+            self.agregar(df)
+
+    @staticmethod
+    def _contar(df, campo):
+        grupos = df.groupby(campo)['tsunami']
+        return pd.DataFrame({'cantidad': grupos.size(), 'tsunamis': grupos.sum()}).astype(np.int64)
+
+    def agregar(self, df):
+        anual, magnitudes = self._contar(df, 'Year'), self._contar(df, 'magnitude')
+        with self._cerrojo:
+            self._anual = self._anual.add(anual, fill_value=0).astype(np.int64)
+            self._magnitudes = self._magnitudes.add(magnitudes, fill_value=0).astype(np.int64)
+
+    def anual(self):
+        """Cantidad de terremotos ('magnitude') y de tsunamis por año, como groupby('Year')."""
+        with self._cerrojo:
+            anual = self._anual
+        return pd.DataFrame({'Year': anual.index.to_numpy(), 'magnitude': anual['cantidad'].to_numpy(),
+                             'tsunami': anual['tsunamis'].to_numpy()})
+
+    def _por_rango(self, bins):
+        with self._cerrojo:
+            magnitudes = self._magnitudes
+        rangos = pd.cut(magnitudes.index.to_numpy(), bins=bins)
+        codigos = rangos.codes
+        dentro = codigos >= 0
+        n = len(rangos.categories)
+        cantidad = np.bincount(codigos[dentro], weights=magnitudes['cantidad'].to_numpy()[dentro], minlength=n)
+        tsunamis = np.bincount(codigos[dentro], weights=magnitudes['tsunamis'].to_numpy()[dentro], minlength=n)
+        return rangos.categories, cantidad.astype(np.int64), tsunamis
+
+    def distribucion_magnitud(self, bins=CORTES_MAGNITUD):
+        """Cantidad de eventos por rango de magnitud, con las etiquetas de pd.cut como texto."""
+        rangos, cantidad, _ = self._por_rango(bins)
+        return pd.DataFrame({'magnitude': rangos.astype(str), 'count': cantidad})
+
+    def prob_tsunami(self, bins=5):
+        """Proporción de tsunamis en `bins` rangos iguales de magnitud (los de pd.cut(bins=bins))."""
+        rangos, cantidad, tsunamis = self._por_rango(bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            prob = tsunamis / cantidad
+        return pd.DataFrame({'magnitude': rangos, 'tsunami': prob, 'magnitude_range': rangos.astype(str)})
+
+
+class Catalogo:
+    """El catálogo en uso: motor de filtros + agregados, reemplazados al llegar eventos.
+
+    Quien lo lee toma `motor` una vez por consulta; agregar() arma un motor nuevo
+    y lo cambia de una vez, así nadie ve un catálogo a medio actualizar.
+    `preparar` completa las columnas calculadas de los eventos nuevos.
+    """
+
+    def __init__(self, motor, preparar=None):
+        self.motor = motor
+        self.agregados = Agregados(motor.df)
+        self.preparar = preparar
+        self.version = 0
+        self.ingresados = 0
+        self._cerrojo = threading.Lock()
+
+    @property
+    def df(self):
+        return self.motor.df
+
+    def agregar(self, nuevos):
+        """Suma eventos nuevos (columnas de ESQUEMA) al catálogo."""
+        if len(nuevos) == 0:
+            return
+        nuevos = datos.agregar_derivadas(datos.tipar(nuevos).reset_index(drop=True))
+        if self.preparar is not None:
+            nuevos = self.preparar(nuevos)
+        with self._cerrojo:
+            self.motor = self.motor.con_nuevos(nuevos)
+            self.agregados.agregar(nuevos)
+            self.ingresados += len(nuevos)
+            self.version += 1
+
+
+def normalizar(df):
+    """Deja sólo las filas válidas de un lote recibido, con los tipos de ESQUEMA.
+
+    Devuelve (válidas, descartadas). Un lote sin alguna columna obligatoria se
+    rechaza entero; una fila con un valor no numérico, vacío o fuera del rango
+    de su tipo (o con tsunami distinto de 0 y 1) se descarta.
+    """
+    faltan = [c for c in ESQUEMA if c not in df.columns]
+    if faltan:
+        raise ValueError(f"Faltan columnas: {', '.join(faltan)}")
+    valores = pd.DataFrame({c: pd.to_numeric(df[c], errors='coerce') for c in ESQUEMA})
+    validas = valores.notna().all(axis=1)
+    for campo, tipo in ESQUEMA.items():
+        tipo = np.dtype(tipo)
+        if tipo.kind == 'i':
+            limites = np.iinfo(tipo)
+            validas &= valores[campo].between(limites.min, limites.max) & (valores[campo] % 1 == 0)
+        else:
+            validas &= np.isfinite(valores[campo])
+    validas &= valores['tsunami'].isin([0, 1])
+    return datos.tipar(valores[validas]), int((~validas).sum())
+
+
+def leer_lote(texto, formato, encabezado=None):
+    """DataFrame con las filas de un texto CSV (con `encabezado` delante si hace falta) o
+    JSON Lines. Las líneas JSON ilegibles se cuentan como descartadas."""
+    if formato == 'csv':
+        if encabezado is not None:
+            texto = encabezado + texto
+        return pd.read_csv(io.StringIO(texto), dtype=str), 0
+    registros, malas = [], 0
+    for linea in texto.splitlines():
+        if not linea.strip():
+            continue
+        try:
+            registro = json.loads(linea)
+        except ValueError:
+            malas += 1
+            continue
+        if isinstance(registro, dict):
+            registros.append(registro)
+        else:
+            malas += 1
+    return pd.DataFrame.from_records(registros), malas
+
+
+def _formato(ruta):
+    return 'csv' if os.path.splitext(ruta)[1].lower() == '.csv' else 'jsonl'
+
+
+def _tomar_cerrojo(ruta):
+    """Cerrojo exclusivo sobre `ruta`, sin esperar: el archivo abierto (el cerrojo dura
+    mientras esté abierto y el sistema lo suelta si el proceso muere), o None si lo
+    tiene otro proceso."""
+    archivo = open(ruta, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            archivo.seek(0)
+            msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        archivo.close()
+        return None
+    return archivo
+
+
+class Ingesta(threading.Thread):
+    """Hilo que incorpora eventos nuevos al catálogo cada `intervalo` segundos.
+
+    Fuentes (cualquiera de las dos, o ambas):
+    - `carpeta`: cada archivo .csv / .jsonl que aparece se lee entero y se mueve a
+      <carpeta>/procesados (o <carpeta>/rechazados si no se pudo leer). Conviene
+      escribirlo con otro nombre (p. ej. empezando con '.') y renombrarlo al final.
+    - `feed`: un CSV o JSON Lines al que se le agregan líneas; se lee sólo lo nuevo
+      hasta el último salto de línea. La posición se guarda en <feed>.ingesta.json.
+      Si el feed es el mismo CSV del catálogo, se arranca desde su tamaño actual y
+      no se guardan segmentos: el próximo arranque relee el CSV completo.
+
+    Los eventos válidos se guardan como segmento Feather (datos.anexar_segmento),
+    para que sobrevivan a un reinicio, y se suman al catálogo (Catalogo.agregar).
+    El segmento anota de dónde vienen (archivo, o hasta qué byte del feed): si el
+    proceso se corta antes de mover el archivo o de guardar la posición, el que
+    sigue no vuelve a ingresar ese lote.
+
+    Con varios servidores sobre el mismo catálogo, sólo uno lee la carpeta y el
+    feed y guarda segmentos: el que tiene el cerrojo <catálogo>.ingesta.lock. Los
+    demás suman los segmentos que él guarda (datos.segmentos_nuevos); si termina,
+    el cerrojo queda libre y lo toma otro. El feed que es el CSV del catálogo lo
+    lee cada proceso por su cuenta, porque no escribe nada.
+    """
+
+    def __init__(self, catalogo, ruta_csv, carpeta=None, feed=None, intervalo=2.0):
+        super().__init__(name="ingesta-sismos", daemon=True)
+        self.catalogo = catalogo
+        self.ruta_csv = ruta_csv
+        self.carpeta = carpeta
+        self.feed = feed
+        self.intervalo = intervalo
+        self.estado = {'eventos': 0, 'descartados': 0, 'archivos': 0, 'ultimo': None, 'error': None,
+                       'lider': False}
+        self._detener = threading.Event()
+        self._es_origen = feed is not None and os.path.abspath(feed) == os.path.abspath(ruta_csv)
+        self._cerrojo = None
+        self._vistos = datos.numeros_segmentos(ruta_csv)  # ya sumados al cargar el catálogo
+        self._guardados = set()  # archivos de la carpeta que ya tienen segmento
+        self._posicion, self._encabezado = self._leer_posicion()
+
+    def run(self):
+        try:
+            while not self._detener.wait(self.intervalo):
+                try:
+                    self.revisar()
+                    self.estado['error'] = None
+                except Exception as e:  # el hilo no debe morir por un archivo o lote malo
+                    self.estado['error'] = str(e)
+        finally:
+            self.soltar()
+
+    def detener(self):
+        self._detener.set()
+
+    def soltar(self):
+        """Deja de ingresar: libera el cerrojo para que lo tome otro proceso."""
+        if self._cerrojo is not None:
+            self._cerrojo.close()
+            self._cerrojo = None
+            self.estado['lider'] = False
+
+    def _ruta_cerrojo(self):
+        return os.path.splitext(self.ruta_csv)[0] + ".ingesta.lock"
+
+    def _es_lider(self):
+        """Si este proceso es el que ingresa (ver la clase); lo intenta en cada vuelta."""
+        if self._cerrojo is None and (self.carpeta is not None or (self.feed is not None and not self._es_origen)):
+            self._cerrojo = _tomar_cerrojo(self._ruta_cerrojo())
+            if self._cerrojo is not None:
+                # Sigue desde donde quedó el anterior
+                self._sincronizar()
+                self._posicion, self._encabezado = self._leer_posicion()
+                self._retomar()
+                self.estado['lider'] = True
+        return self._cerrojo is not None
+
+    def revisar(self):
+        """Procesa lo que haya llegado desde la última vez. Devuelve la cantidad de eventos agregados."""
+        agregados = self._sincronizar()
+        lider = self._es_lider()
+        if lider and self.carpeta is not None and os.path.isdir(self.carpeta):
+            for ruta in sorted(glob.glob(os.path.join(glob.escape(self.carpeta), "*.csv"))
+                               + glob.glob(os.path.join(glob.escape(self.carpeta), "*.jsonl"))):
+                agregados += self._procesar_archivo(ruta)
+        if (lider or self._es_origen) and self.feed is not None and os.path.exists(self.feed):
+            agregados += self._procesar_feed()
+        return agregados
+
+    def _sincronizar(self):
+        """Suma al catálogo los segmentos que guardó el proceso que ingresa."""
+        nuevos, numeros = datos.segmentos_nuevos(self.ruta_csv, self._vistos)
+        self._vistos |= numeros
+        if nuevos is None:
+            return 0
+        self.catalogo.agregar(nuevos)
+        self.estado['eventos'] += len(nuevos)
+        self.estado['ultimo'] = time.time()
+        return len(nuevos)
+
+    def _retomar(self):
+        """Da por terminados los lotes que ya tienen segmento aunque el proceso que los
+        guardó no haya llegado a mover el archivo o a guardar la posición del feed."""
+        feed = os.path.abspath(self.feed) if self.feed is not None else None
+        for fuente in datos.fuentes_segmentos(self.ruta_csv):
+            if 'archivo' in fuente:
+                self._guardados.add(tuple(fuente['archivo']))
+            elif fuente.get('feed') == feed and fuente['hasta'] > self._posicion:
+                self._posicion, self._encabezado = fuente['hasta'], fuente['encabezado']
+
+    def _incorporar(self, df, descartados, guardar=True, fuente=None):
+        if len(df) == 0:
+            self.estado['descartados'] += descartados
+            return 0
+        validas, invalidas = normalizar(df)
+        self.estado['descartados'] += descartados + invalidas
+        if len(validas) == 0:
+            return 0
+        # Primero en memoria: lo que se calcule con la versión en disco (datos.version_datos)
+        # nunca queda con menos eventos de los que esa versión dice tener
+        self.catalogo.agregar(validas)
+        if guardar and datos.feather is not None:
+            self._vistos.add(datos.anexar_segmento(validas, self.ruta_csv, fuente))
+        self.estado['eventos'] += len(validas)
+        self.estado['ultimo'] = time.time()
+        return len(validas)
+
+    @staticmethod
+    def _identificar(ruta):
+        """Nombre, tamaño y fecha del archivo: lo que anota su segmento."""
+        info = os.stat(ruta)
+        return os.path.basename(ruta), info.st_size, info.st_mtime_ns
+
+    def _procesar_archivo(self, ruta):
+        formato = _formato(ruta)
+        archivo = self._identificar(ruta)
+        try:
+            if archivo in self._guardados:  # ya tiene segmento: sólo faltó moverlo
+                agregados = 0
+            else:
+                with open(ruta, encoding="utf-8") as f:
+                    df, malas = leer_lote(f.read(), formato)
+                agregados = self._incorporar(df, malas, fuente={'archivo': archivo})
+                self._guardados.add(archivo)
+            destino = "procesados"
+        except (OSError, ValueError, pd.errors.ParserError) as e:
+            self.estado['error'] = f"{os.path.basename(ruta)}: {e}"
+            agregados, destino = 0, "rechazados"
+        carpeta = os.path.join(self.carpeta, destino)
+        os.makedirs(carpeta, exist_ok=True)
+        shutil.move(ruta, os.path.join(carpeta, os.path.basename(ruta)))
+        self._guardados.discard(archivo)
+        self.estado['archivos'] += 1
+        return agregados
+
+    # --- feed al que se le agregan líneas ---
+
+    def _ruta_posicion(self):
+        return os.path.splitext(self.feed)[0] + ".ingesta.json"
+
+    def _leer_posicion(self):
+        if self.feed is None:
+            return 0, None
+        if self._es_origen:
+            return (os.path.getsize(self.feed) if os.path.exists(self.feed) else 0), None
+        try:
+            with open(self._ruta_posicion(), encoding="utf-8") as f:
+                guardada = json.load(f)
+            return guardada['posicion'], guardada.get('encabezado')
+        except (OSError, ValueError, KeyError):
+            return 0, None
+
+    def _guardar_posicion(self):
+        if self._es_origen:
+            return
+        datos.escribir_json({'posicion': self._posicion, 'encabezado': self._encabezado}, self._ruta_posicion())
+
+    def _procesar_feed(self):
+        formato = _formato(self.feed)
+        tamano = os.path.getsize(self.feed)
+        if tamano < self._posicion:  # el archivo se truncó o se reemplazó: se relee
+            self._posicion, self._encabezado = 0, None
+        if tamano == self._posicion:
+            return 0
+        with open(self.feed, "rb") as f:
+            if formato == 'csv' and self._encabezado is None:
+                self._encabezado = f.readline().decode("utf-8")
+                if not self._encabezado.endswith("\n"):  # encabezado todavía incompleto
+                    self._encabezado = None
+                    return 0
+                self._posicion = max(self._posicion, f.tell())
+            f.seek(self._posicion)
+            bloque = f.read(tamano - self._posicion)
+        fin = bloque.rfind(b"\n") + 1  # sólo líneas completas; el resto, en la próxima vuelta
+        if fin == 0:
+            return 0
+        try:
+            df, malas = leer_lote(bloque[:fin].decode("utf-8", errors="replace"), formato, self._encabezado)
+            fuente = {'feed': os.path.abspath(self.feed), 'hasta': self._posicion + fin,
+                      'encabezado': self._encabezado}
+            agregados = self._incorporar(df, malas, guardar=not self._es_origen, fuente=fuente)
+        except (ValueError, pd.errors.ParserError) as e:
+            # Un bloque ilegible se saltea: quedarse en la misma posición trabaría el feed
+            self.estado['error'] = f"{os.path.basename(self.feed)}: {e}"
+            self.estado['descartados'] += bloque[:fin].count(b"\n")
+            agregados = 0
+        self._posicion += fin
+        self._guardar_posicion()
+        return agregados
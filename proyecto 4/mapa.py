@@ -0,0 +1,156 @@
+import folium
+import numpy as np
+import pandas as pd
+
+
+# Grilla en pirámide: en el nivel z el mundo se divide en 2^z x 2^z celdas,
+# y cada celda del nivel z contiene exactamente 4 del nivel z + 1.
+NIVEL_MAXIMO = 12        # celdas de ~0.09° x 0.04°: prácticamente un evento por celda
+MAX_ELEMENTOS = 1500     # círculos que se envían al navegador como máximo
+
+COLUMNAS_SUMA = ['eventos', 'tsunamis', 'suma_magnitud', 'suma_profundidad', 'suma_lat', 'suma_lon']
+COLUMNA_RIESGO = 'suma_riesgo'  # sólo si los eventos traen 'riesgo' (ver riesgo.py)
+
+
+def normalizar_longitud(lon):
+    """Lleva longitudes como 200 (0..360) al rango -180..180."""
+    return (np.asarray(lon, dtype=float) + 180) % 360 - 180
+
+
+def celdas(lat, lon, nivel=NIVEL_MAXIMO):
+    """Código de la celda de cada punto en la grilla del nivel (fila * 2^nivel + columna)."""
+    lado = 2 ** nivel
+    columna = ((normalizar_longitud(lon) + 180) / 360 * lado).astype(np.int64)
+    fila = ((np.asarray(lat, dtype=float) + 90) / 180 * lado).astype(np.int64)
+    return np.clip(fila, 0, lado - 1) * lado + np.clip(columna, 0, lado - 1)
+
+
+def agregar_celdas(df, nivel=NIVEL_MAXIMO):
+    """Agrega los eventos por celda del nivel: cantidades, sumas (para promedios) y extremos.
+
+    Usa la columna 'celda' si el DataFrame ya la trae (calculada al cargar los datos)
+    y suma también el riesgo del modelo si trae 'riesgo'.
+    """
+    codigo = df['celda'].to_numpy() if 'celda' in df else celdas(df['latitude'], df['longitude'], nivel)
+    datos = pd.DataFrame({
+        'celda': codigo,
+        'eventos': 1,
+        'tsunamis': df['tsunami'].to_numpy(dtype=np.int64),
+        # Sumas en float64 aunque las columnas vengan en float32
+        'suma_magnitud': df['magnitude'].to_numpy(dtype=float),
+        'suma_profundidad': df['depth'].to_numpy(dtype=float),
+        'suma_lat': df['latitude'].to_numpy(dtype=float),
+        'suma_lon': normalizar_longitud(df['longitude']),
+        'magnitud_max': df['magnitude'].to_numpy(dtype=float),
+        'anio_min': df['Year'].to_numpy(),
+        'anio_max': df['Year'].to_numpy(),
+    })
+    if 'riesgo' in df:
+        datos[COLUMNA_RIESGO] = df['riesgo'].to_numpy(dtype=float)
+    return _combinar(datos, 'celda')
+
+
+def _combinar(df, claves):
+    grupos = df.groupby(claves, sort=False)
+    columnas = COLUMNAS_SUMA + ([COLUMNA_RIESGO] if COLUMNA_RIESGO in df else [])
+    sumas = grupos[columnas].sum()
+    sumas['magnitud_max'] = grupos['magnitud_max'].max()
+    sumas['anio_min'] = grupos['anio_min'].min()
+    sumas['anio_max'] = grupos['anio_max'].max()
+    return sumas
+
+
+def subir_nivel(agregado, nivel, destino):
+    """Pasa un agregado por celdas del `nivel` a las celdas (más grandes) de `destino`."""
+    lado = 2 ** nivel
+    factor = 2 ** (nivel - destino)
+    fila, columna = np.divmod(agregado.index.to_numpy(), lado)
+    codigo = (fila // factor) * (lado // factor) + columna // factor
+    return _combinar(agregado, codigo)
+
+
+def agregado_acotado(df, max_elementos=MAX_ELEMENTOS, nivel=NIVEL_MAXIMO):
+    """Agregado en el nivel más detallado de la pirámide que no supera max_elementos celdas.
+
+    Se agrega una sola vez al nivel máximo y los niveles superiores se arman
+    combinando celdas, que son muchas menos que los eventos.
+    """
+    agregado = agregar_celdas(df, nivel)
+    while len(agregado) > max_elementos and nivel > 0:
+        agregado = subir_nivel(agregado, nivel, nivel - 1)
+        nivel -= 1
+    return agregado, nivel
+
+
+def _colores(proporcion):
+    """Del azul (sin tsunamis) al rojo (todos con tsunami)."""
+    rojo = (proporcion * 255).round().astype(int)
+    azul = 255 - rojo
+    return [f"#{r:02x}00{b:02x}" for r, b in zip(rojo, azul)]
+
+
+def geojson_celdas(agregado, color='tsunamis'):
+    """FeatureCollection con un punto por celda (centroide de sus eventos) y sus estadísticas.
+
+    `color`: 'tsunamis' (proporción observada) o 'riesgo' (probabilidad media del modelo).
+    """
+    eventos = agregado['eventos'].to_numpy()
+    con_riesgo = COLUMNA_RIESGO in agregado
+    proporcion = agregado[COLUMNA_RIESGO if color == 'riesgo' else 'tsunamis'].to_numpy() / eventos
+    tabla = pd.DataFrame({
+        'lat': agregado['suma_lat'].to_numpy() / eventos,
+        'lon': agregado['suma_lon'].to_numpy() / eventos,
+        'Eventos': eventos,
+        'Tsunamis': agregado['tsunamis'].to_numpy(),
+        'Magnitud promedio': (agregado['suma_magnitud'].to_numpy() / eventos).round(2),
+        'Magnitud máxima': agregado['magnitud_max'].to_numpy().round(1),
+        'Profundidad promedio (km)': (agregado['suma_profundidad'].to_numpy() / eventos).round(1),
+        'Años': [f"{a}" if a == b else f"{a}-{b}" for a, b in zip(agregado['anio_min'], agregado['anio_max'])],
+        'radio': (agregado['magnitud_max'].to_numpy() * 0.6 + 4 * np.log10(eventos)).round(1),
+        'color': _colores(proporcion),
+    })
+    if con_riesgo:
+        tabla['Riesgo promedio (%)'] = (agregado[COLUMNA_RIESGO].to_numpy() / eventos * 100).round(1)
+    propiedades = tabla.drop(columns=['lat', 'lon']).to_dict(orient='records')
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]}, 'properties': p}
+            for lat, lon, p in zip(tabla['lat'].tolist(), tabla['lon'].tolist(), propiedades)
+        ],
+    }
+
+
+def _estilo(feature):
+    p = feature['properties']
+    return {'radius': p['radio'], 'color': p['color'], 'fillColor': p['color'], 'fillOpacity': 0.6, 'weight': 1}
+
+
+def mapa_agregado(df, max_elementos=MAX_ELEMENTOS, zoom_start=2):
+    """Mapa folium con los eventos agregados en a lo sumo max_elementos círculos.
+
+    Cada círculo es una celda de la grilla: el color va del azul al rojo según la
+    proporción de eventos con tsunami y el tamaño crece con la magnitud máxima y
+    con la cantidad de eventos. Con pocos eventos cada celda es un evento.
+    """
+    agregado, _ = agregado_acotado(df, max_elementos)
+    return mapa_de_agregado(agregado, zoom_start)
+
+
+def mapa_de_agregado(agregado, zoom_start=2, color='tsunamis'):
+    """Mapa folium a partir de un agregado ya calculado (ver agregado_acotado).
+    Con color='riesgo', el color sigue el riesgo medio del modelo en lugar de los tsunamis."""
+    eventos = agregado['eventos'].sum()
+    centro = [agregado['suma_lat'].sum() / eventos, agregado['suma_lon'].sum() / eventos]
+    m = folium.Map(location=centro, zoom_start=zoom_start, tiles='OpenStreetMap')
+    campos = ['Eventos', 'Tsunamis', 'Magnitud promedio', 'Magnitud máxima', 'Profundidad promedio (km)', 'Años']
+    if COLUMNA_RIESGO in agregado:
+        campos.append('Riesgo promedio (%)')
+    folium.GeoJson(
+        geojson_celdas(agregado, color),
+        name='Terremotos',
+        marker=folium.CircleMarker(fill=True),
+        style_function=_estilo,
+        popup=folium.GeoJsonPopup(fields=campos),
+    ).add_to(m)
+    return m
@@ -0,0 +1,175 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from mapa import celdas, normalizar_longitud
+
+
+Region = namedtuple('Region', ['nombre', 'anillo', 'poligonos'])
+
+# Regiones sísmicas aproximadas, como polígonos de vértices (longitud, latitud).
+# Un evento queda en la primera región que lo contiene (el orden resuelve los
+# solapamientos) y, si no cae en ninguna, en 'Otras'. Las que cruzan el
+# antimeridiano van partidas en dos polígonos. `anillo`: parte del Anillo de Fuego.
+REGIONES = [
+    Region('Pacífico NW', True, [
+        [(118, 4), (125, 2), (150, 0), (150, 20), (160, 40), (168, 56), (160, 62), (140, 48), (128, 36), (118, 22)],
+    ]),
+    Region('Alaska y Aleutianas', True, [
+        [(165, 48), (180, 48), (180, 66), (165, 62)],
+        [(-180, 48), (-150, 52), (-130, 54), (-130, 64), (-180, 66)],
+    ]),
+    Region('Norte y Centroamérica', True, [
+        [(-135, 54), (-130, 54), (-120, 50), (-110, 32), (-85, 16), (-75, 9), (-78, 5), (-92, 10), (-110, 16),
+         (-125, 32), (-135, 46)],
+    ]),
+    Region('Sudamérica', True, [
+        [(-82, 12), (-70, 12), (-62, -20), (-66, -56), (-78, -56), (-78, -40), (-76, -20), (-84, -4)],
+    ]),
+    Region('Pacífico SW', True, [
+        [(130, 0), (180, 0), (180, -56), (156, -56), (160, -25), (140, -12), (130, -10)],
+        [(-180, 0), (-168, 0), (-168, -40), (-180, -56)],
+    ]),
+    Region('Indonesia', True, [
+        [(90, 14), (100, 12), (118, 4), (130, 3), (132, -10), (115, -14), (100, -10), (88, 0)],
+    ]),
+    Region('Mediterráneo', False, [
+        [(-10, 30), (37, 30), (45, 38), (45, 47), (12, 48), (-10, 44)],
+    ]),
+]
+OTRAS = 'Otras'
+NOMBRES = [r.nombre for r in REGIONES] + [OTRAS]
+CODIGO_OTRAS = len(REGIONES)
+ANILLO = [i for i, r in enumerate(REGIONES) if r.anillo]
+
+LADO_CELDA = 1.0  # grados de la grilla del índice
+
+
+def dentro_poligono(lon, lat, vertices):
+    """Punto en polígono (cruce de rayos), vectorizado sobre todos los puntos a la vez."""
+    dentro = np.zeros(len(lon), dtype=bool)
+    x, y = np.asarray(vertices, dtype=float).T
+    for xi, yi, xj, yj in zip(x, y, np.roll(x, 1), np.roll(y, 1)):
+        if yi == yj:
+            continue
+        cruza = (yi > lat) != (yj > lat)
+        dentro ^= cruza & (lon < (xj - xi) * (lat - yi) / (yj - yi) + xi)
+    return dentro
+
+
+class IndiceRegiones:
+    """Asigna regiones con una grilla de LADO_CELDA grados como índice espacial.
+
+    Para cada celda se precalcula si está entera dentro o fuera de cada polígono:
+    los puntos de esas celdas (casi todos) se resuelven con una sola búsqueda en
+    un arreglo. Sólo los de celdas cortadas por algún borde se prueban contra
+    los polígonos candidatos de esa celda.
+    """
+
+    def __init__(self, regiones=REGIONES, lado=LADO_CELDA):
+        self.lado = lado
+        self.columnas = int(round(360 / lado))
+        self.filas = int(round(180 / lado))
+        # (código de región, vértices) en orden de prioridad
+        self.poligonos = [(codigo, np.asarray(vertices, dtype=float))
+                          for codigo, region in enumerate(regiones) for vertices in region.poligonos]
+        centros_lon, centros_lat = self._centros()
+        # estado[p, celda]: 1 dentro del polígono p, 0 fuera, 2 borde (hay que probar punto por punto)
+        self.estado = np.zeros((len(self.poligonos), self.filas * self.columnas), dtype=np.int8)
+        for p, (_, vertices) in enumerate(self.poligonos):
+            self.estado[p] = dentro_poligono(centros_lon, centros_lat, vertices)
+            self.estado[p, self._celdas_borde(vertices)] = 2
+        # Región de cada celda cuando ningún borde la corta antes de resolverse (-1: ver punto por punto)
+        self.resuelta = np.full(self.filas * self.columnas, -1, dtype=np.int16)
+        pendiente = np.ones(self.filas * self.columnas, dtype=bool)
+        for p, (codigo, _) in enumerate(self.poligonos):
+            estado = self.estado[p]
+            self.resuelta[pendiente & (estado == 1)] = codigo
+            pendiente &= estado == 0
+        self.resuelta[pendiente] = CODIGO_OTRAS
+
+    def _centros(self):
+        fila, columna = np.divmod(np.arange(self.filas * self.columnas), self.columnas)
+        return (columna + 0.5) * self.lado - 180, (fila + 0.5) * self.lado - 90
+
+    def _celda(self, lon, lat):
+        columna = np.clip(((lon + 180) / self.lado).astype(np.int64), 0, self.columnas - 1)
+        fila = np.clip(((lat + 90) / self.lado).astype(np.int64), 0, self.filas - 1)
+        return fila * self.columnas + columna
+
+    def _celdas_borde(self, vertices):
+        """Celdas que toca algún lado del polígono (y sus vecinas, para no perder esquinas)."""
+        puntos = []
+        for (x0, y0), (x1, y1) in zip(vertices, np.roll(vertices, 1, axis=0)):
+            pasos = int(np.ceil(max(abs(x1 - x0), abs(y1 - y0)) / (self.lado / 4))) + 1
+            t = np.linspace(0, 1, pasos)
+            puntos.append(np.column_stack([x0 + (x1 - x0) * t, y0 + (y1 - y0) * t]))
+        puntos = np.concatenate(puntos)
+        vecinos = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]) * self.lado
+        puntos = (puntos[:, None, :] + vecinos[None, :, :]).reshape(-1, 2)
+        return np.unique(self._celda(puntos[:, 0], puntos[:, 1]))
+
+    def asignar(self, lat, lon):
+        """Código de región (int8, índice en NOMBRES) de cada punto."""
+        lon = normalizar_longitud(lon)
+        lat = np.asarray(lat, dtype=float)
+        celda = self._celda(lon, lat)
+        codigos = self.resuelta[celda]
+        pendientes = np.flatnonzero(codigos < 0)
+        for p, (codigo, vertices) in enumerate(self.poligonos):
+            if len(pendientes) == 0:
+                break
+            estado = self.estado[p, celda[pendientes]]
+            probar = estado == 2
+            dentro = estado == 1
+            dentro[probar] = dentro_poligono(lon[pendientes[probar]], lat[pendientes[probar]], vertices)
+            codigos[pendientes[dentro]] = codigo
+            pendientes = pendientes[~dentro]
+        codigos[pendientes] = CODIGO_OTRAS
+        return codigos.astype(np.int8)
+
+    def region_punto(self, lat, lon):
+        """Código de región de un solo punto, sin armar arreglos si su celda está resuelta."""
+        lon = (lon + 180) % 360 - 180
+        columna = min(max(int((lon + 180) / self.lado), 0), self.columnas - 1)
+        fila = min(max(int((lat + 90) / self.lado), 0), self.filas - 1)
+        codigo = int(self.resuelta[fila * self.columnas + columna])
+        if codigo >= 0:
+            return codigo
+        return int(self.asignar(np.array([lat]), np.array([lon]))[0])
+
+
+_indice = None
+
+
+def indice_regiones():
+    """El índice se arma una vez por proceso."""
+    global _indice
+    if _indice is None:
+        _indice = IndiceRegiones()
+    return _indice
+
+
+def asignar_regiones(lat, lon):
+    """Código de región de cada evento (ver NOMBRES)."""
+    return indice_regiones().asignar(lat, lon)
+
+
+def agregar_ubicacion(df):
+    """Columnas de ubicación, calculadas una sola vez al cargar: 'celda' de la grilla
+    del mapa (ver mapa.py) y 'region'."""
+    df['celda'] = celdas(df['latitude'], df['longitude'])
+    df['region'] = asignar_regiones(df['latitude'], df['longitude'])
+    return df
+
+
+def resumen_regiones(codigos, tsunami, magnitud):
+    """Eventos, % de tsunamis y magnitud promedio por región, con bincount sobre los códigos."""
+    n = len(NOMBRES)
+    total = np.bincount(codigos, minlength=n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tsunamis = np.bincount(codigos, weights=tsunami, minlength=n) / total * 100
+        magnitud = np.bincount(codigos, weights=magnitud, minlength=n) / total
+    return pd.DataFrame({'Región': NOMBRES, 'Total Eventos': total,
+                         '% Tsunamis': tsunamis, 'Magnitud Promedio': magnitud})
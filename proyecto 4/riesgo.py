@@ -0,0 +1,275 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import datos
+from regiones import CODIGO_OTRAS, NOMBRES, agregar_ubicacion, indice_regiones
+
+
+# Modelo de probabilidad de tsunami: regresión logística sobre las variables del
+# sismo y la región. Se entrena con scikit-learn (python riesgo.py) y se guarda
+# como coeficientes en JSON: para puntuar alcanza con un producto escalar, en
+# NumPy para todo el catálogo o en Python puro para un evento suelto.
+
+VARIABLES = ['magnitude', 'depth', 'sig', 'mmi', 'cdi', 'gap', 'dmin']
+LOGARITMICAS = {'depth', 'dmin'}  # muy asimétricas: entran como log(1 + x)
+VERSION_MODELO = 1  # cambiarla si cambian las variables o el formato del artefacto
+
+
+def ruta_modelo(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".riesgo.json"
+
+
+def variables(df):
+    """Matriz (filas x VARIABLES) en float64, con las transformaciones del modelo."""
+    columnas = []
+    for nombre in VARIABLES:
+        valores = df[nombre].to_numpy(dtype=float) if nombre in df else np.full(len(df), np.nan)
+        columnas.append(np.log1p(np.maximum(valores, 0)) if nombre in LOGARITMICAS else valores)
+    return np.column_stack(columnas)
+
+
+def _numero(valor):
+    """float de un valor de un evento suelto ('6.5' también), o None si falta o no es un número."""
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(valor) else valor
+
+
+def entrenar(df, c=1.0, semilla=0, prueba=0.25):
+    """Entrena el modelo sobre el catálogo (con 'region', ver regiones.py).
+
+    Mide AUC, Brier y log-loss sobre una partición de prueba estratificada y
+    después reentrena con todos los eventos. Devuelve el artefacto (dict).
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    x = pd.DataFrame(variables(df), columns=VARIABLES)
+    x['region'] = df['region'].to_numpy()
+    y = df['tsunami'].to_numpy()
+
+    def pipeline():
+        return Pipeline([
+            ('columnas', ColumnTransformer([
+                ('numericas', StandardScaler(), VARIABLES),
+                ('region', OneHotEncoder(categories=[list(range(len(NOMBRES)))], handle_unknown='ignore'), ['region']),
+            ])),
+            ('logistica', LogisticRegression(C=c, max_iter=1000)),
+        ])
+
+    x_ent, x_pru, y_ent, y_pru = train_test_split(x, y, test_size=prueba, stratify=y, random_state=semilla)
+    prob = pipeline().fit(x_ent, y_ent).predict_proba(x_pru)[:, 1]
+    metricas = {
+        'auc': float(roc_auc_score(y_pru, prob)),
+        'brier': float(brier_score_loss(y_pru, prob)),
+        'log_loss': float(log_loss(y_pru, prob)),
+        'eventos_prueba': int(len(y_pru)),
+    }
+
+    modelo = pipeline().fit(x, y)
+    escalador = modelo.named_steps['columnas'].named_transformers_['numericas']
+    logistica = modelo.named_steps['logistica']
+    coeficientes = logistica.coef_[0]
+    return {
+        'version': VERSION_MODELO,
+        'variables': VARIABLES,
+        'logaritmicas': sorted(LOGARITMICAS),
+        'media': escalador.mean_.tolist(),
+        'escala': escalador.scale_.tolist(),
+        'coeficientes': coeficientes[:len(VARIABLES)].tolist(),
+        'regiones': coeficientes[len(VARIABLES):].tolist(),
+        'intercepto': float(logistica.intercept_[0]),
+        'metricas': metricas,
+        'eventos': int(len(y)),
+        'tasa_tsunami': float(y.mean()),
+        'entrenado': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+class ModeloRiesgo:
+    """Probabilidad de tsunami a partir del artefacto de entrenar().
+
+    La estandarización se pliega en los coeficientes (peso / escala y el
+    intercepto corrido), así puntuar es intercepto + pesos · variables +
+    coeficiente de la región, sin scikit-learn. Una variable que falta
+    (o NaN) toma el valor medio del entrenamiento.
+    """
+
+    def __init__(self, artefacto):
+        if artefacto.get('version') != VERSION_MODELO or artefacto['variables'] != VARIABLES:
+            raise ValueError("artefacto de riesgo de otra versión: volver a entrenar (python riesgo.py)")
+        self.artefacto = artefacto
+        self.media = np.asarray(artefacto['media'])
+        self.pesos = np.asarray(artefacto['coeficientes']) / np.asarray(artefacto['escala'])
+        self.intercepto = artefacto['intercepto'] - float(self.pesos @ self.media)
+        self.regiones = np.asarray(artefacto['regiones'])
+        # Para puntuar_evento: tuplas de Python, más rápidas que NumPy con un solo valor
+        self._terminos = [(nombre, nombre in LOGARITMICAS, media, peso)
+                          for nombre, media, peso in zip(VARIABLES, self.media.tolist(), self.pesos.tolist())]
+        self._regiones = self.regiones.tolist()
+        self.huella = hashlib.blake2b(json.dumps([artefacto['media'], artefacto['escala'], artefacto['coeficientes'],
+                                                  artefacto['regiones'], artefacto['intercepto']]).encode(),
+                                      digest_size=6).hexdigest()
+
+    def puntuar(self, df):
+        """Probabilidad (float32) de cada evento del DataFrame, vectorizada."""
+        x = variables(df)
+        x = np.where(np.isnan(x), self.media, x)
+        region = df['region'].to_numpy() if 'region' in df else indice_regiones().asignar(df['latitude'], df['longitude'])
+        z = self.intercepto + x @ self.pesos + self.regiones[region]
+        return (1 / (1 + np.exp(-z))).astype(np.float32)
+
+    def agregar_riesgo(self, df):
+        """Columna 'riesgo' (probabilidad de tsunami según el modelo)."""
+        df['riesgo'] = self.puntuar(df)
+        return df
+
+    def puntuar_evento(self, evento):
+        """Probabilidad de un solo evento (dict con las VARIABLES y 'region' o lat/lon).
+
+        Como en puntuar(), una variable que falta o no es un número toma la media;
+        sin región ni coordenadas válidas, el evento cuenta como de 'otras' regiones.
+        """
+        z = self.intercepto
+        for nombre, logaritmica, media, peso in self._terminos:
+            valor = _numero(evento.get(nombre))
+            if valor is None:
+                valor = media
+            elif logaritmica:
+                valor = math.log1p(max(valor, 0.0))
+            z += peso * valor
+        region = _numero(evento.get('region'))
+        if region is not None and region.is_integer() and 0 <= region < len(self._regiones):
+            region = int(region)
+        else:
+            lat, lon = _numero(evento.get('latitude')), _numero(evento.get('longitude'))
+            region = CODIGO_OTRAS if lat is None or lon is None else indice_regiones().region_punto(lat, lon)
+        z += self._regiones[region]
+        return 1 / (1 + math.exp(-z))
+
+
+def guardar(artefacto, ruta):
+    """Escritura atómica del artefacto (JSON)."""
+    fd, temporal = tempfile.mkstemp(prefix=".tmp_", dir=os.path.dirname(os.path.abspath(ruta)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(artefacto, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def cargar(ruta):
+    """ModeloRiesgo guardado, o None si no hay uno legible y de esta versión."""
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return ModeloRiesgo(json.load(f))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def catalogo_entrenamiento(ruta_csv):
+    return agregar_ubicacion(datos.cargar_catalogo(ruta_csv))
+
+
+def obtener(ruta_csv):
+    """El modelo guardado junto al CSV; si no hay, lo entrena y lo guarda."""
+    ruta = ruta_modelo(ruta_csv)
+    modelo = cargar(ruta)
+    if modelo is None:
+        artefacto = entrenar(catalogo_entrenamiento(ruta_csv))
+        try:
+            guardar(artefacto, ruta)
+        except OSError as e:
+            print(f" No se pudo guardar {ruta}:", e)
+        modelo = ModeloRiesgo(artefacto)
+    return modelo
+
+
+def comparar_boosting(df, semilla=0, prueba=0.25):
+    """AUC de HistGradientBoosting en la misma partición, como referencia."""
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import train_test_split
+
+    x = np.column_stack([variables(df), df['region'].to_numpy()])
+    y = df['tsunami'].to_numpy()
+    x_ent, x_pru, y_ent, y_pru = train_test_split(x, y, test_size=prueba, stratify=y, random_state=semilla)
+    modelo = HistGradientBoostingClassifier(categorical_features=[len(VARIABLES)], random_state=semilla)
+    return float(roc_auc_score(y_pru, modelo.fit(x_ent, y_ent).predict_proba(x_pru)[:, 1]))
+
+
+def evaluar_flujo(modelo, entrada, salida):
+    """Un evento JSON por línea en `entrada`; escribe el mismo evento con su 'riesgo'.
+    Una línea que no se puede puntuar escribe {"error": ...} y se sigue con la próxima."""
+    for linea in entrada:
+        if not linea.strip():
+            continue
+        try:
+            evento = json.loads(linea)
+            if not isinstance(evento, dict):
+                raise TypeError("se esperaba un objeto JSON")
+            evento['riesgo'] = round(modelo.puntuar_evento(evento), 4)
+            respuesta = evento
+        except Exception as e:
+            respuesta = {'error': str(e)}
+        salida.write(json.dumps(respuesta, ensure_ascii=False) + "\n")
+        salida.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entrena el modelo de riesgo de tsunami o puntúa eventos.")
+    parser.add_argument("--csv", default="earthquake_data_tsunami.csv", help="catálogo de sismos")
+    parser.add_argument("--c", type=float, default=1.0, help="inversa de la regularización de la logística")
+    parser.add_argument("--comparar", action="store_true", help="además, AUC de gradient boosting como referencia")
+    parser.add_argument("--evaluar", action="store_true",
+                        help="puntuar eventos JSON (uno por línea) de la entrada estándar con el modelo guardado")
+    args = parser.parse_args()
+
+    if args.evaluar:
+        modelo = cargar(ruta_modelo(args.csv))
+        if modelo is None:
+            sys.exit(f"No hay modelo en {ruta_modelo(args.csv)}: entrenarlo con python riesgo.py --csv {args.csv}")
+        evaluar_flujo(modelo, sys.stdin, sys.stdout)
+        sys.exit()
+
+    inicio = time.perf_counter()
+    df = catalogo_entrenamiento(args.csv)
+    artefacto = entrenar(df, c=args.c)
+    guardar(artefacto, ruta_modelo(args.csv))
+    metricas = artefacto['metricas']
+    print(f"Modelo entrenado con {artefacto['eventos']:,} eventos en {time.perf_counter() - inicio:.1f} s "
+          f"-> {ruta_modelo(args.csv)}")
+    print(f"Prueba ({metricas['eventos_prueba']:,} eventos): AUC {metricas['auc']:.3f} · "
+          f"Brier {metricas['brier']:.3f} · log-loss {metricas['log_loss']:.3f}")
+    if args.comparar:
+        print(f"Gradient boosting (referencia): AUC {comparar_boosting(df):.3f}")
+
+    modelo = ModeloRiesgo(artefacto)
+    inicio = time.perf_counter()
+    modelo.puntuar(df)
+    lote = time.perf_counter() - inicio
+    evento = df.iloc[0][VARIABLES + ['latitude', 'longitude']].astype(float).to_dict()
+    repeticiones = 10_000
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        modelo.puntuar_evento(evento)
+    print(f"Puntaje: catálogo completo en {lote * 1000:.1f} ms · "
+          f"un evento en {(time.perf_counter() - inicio) / repeticiones * 1e6:.1f} µs")
@@ -0,0 +1,263 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import datos
+import graficos
+from estadisticas import Estadisticas
+from filtros import CacheLRU, MotorFiltros
+from mapa import agregado_acotado
+
+
+# --- instantánea compartida del catálogo ---
+# El catálogo ya ordenado y con las columnas calculadas, en un Feather sin
+# compresión: cada proceso (servidores de Streamlit, procesos del pool) lo
+# mapea en memoria y el sistema operativo comparte las mismas páginas entre
+# todos, en lugar de tener una copia ordenada por proceso.
+
+def ruta_instantanea(ruta_csv):
+    return os.path.splitext(ruta_csv)[0] + ".motor.feather"
+
+
+def _ruta_estadisticas(ruta):
+    return os.path.splitext(ruta)[0] + ".estadisticas.npz"
+
+
+def publicar(motor, ruta, version):
+    """Guarda el catálogo del motor (en su orden) y sus estadísticas por celda."""
+    tabla = datos.pa.Table.from_pandas(motor.df, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), b'version': version.encode()})
+    # Primero las estadísticas: quien vea la instantánea nueva encuentra las suyas
+    motor.estadisticas().guardar(_ruta_estadisticas(ruta))
+    datos.escribir_feather(tabla, ruta)
+
+
+def version_instantanea(ruta):
+    """Versión de los datos guardada en la instantánea, o None si no hay una legible."""
+    try:
+        with datos.pa.memory_map(ruta) as archivo:
+            return (datos.pa.ipc.open_file(archivo).schema.metadata or {}).get(b'version', b'').decode()
+    except (OSError, datos.pa.ArrowException):
+        return None
+
+
+def abrir(ruta):
+    """MotorFiltros sobre la instantánea mapeada en memoria (sin copiar ni reordenar)."""
+    df = datos.feather.read_table(ruta, memory_map=True).to_pandas(split_blocks=True)
+    estadisticas = _ruta_estadisticas(ruta)
+    estadisticas = Estadisticas.cargar(estadisticas) if os.path.exists(estadisticas) else None
+    return MotorFiltros(df, ordenado=True, estadisticas=estadisticas)
+
+
+def version_compartida(ruta_csv, clave=""):
+    """Versión con que se publica la instantánea de los datos actuales (ver motor_compartido)."""
+    return datos.version_datos(ruta_csv) + (f"+{clave}" if clave else "")
+
+
+def motor_compartido(ruta_csv, armar, clave=""):
+    """Motor de la instantánea junto al CSV si corresponde a los datos actuales; si no,
+    lo arma con armar() y publica la instantánea para los demás procesos. `clave`
+    distingue lo demás que entra en las columnas calculadas (p. ej. el modelo de riesgo)."""
+    ruta = ruta_instantanea(ruta_csv)
+    version = version_compartida(ruta_csv, clave)
+    if version_instantanea(ruta) != version:
+        publicar(armar(), ruta, version)
+    return abrir(ruta)
+
+
+# --- cálculos pesados por filtro ---
+# Funciones de módulo (no lambdas) para poder mandarlas a otro proceso por nombre.
+
+def _histograma_magnitud(filas):
+    return graficos.histograma(
+        filas,
+        x='magnitude',
+        nbins=30,
+        title='Distribución de Magnitudes de Terremotos',
+        color_discrete_sequence=['orange']
+    ).update_layout(height=400)
+
+
+def _dispersion_magnitud_profundidad(filas):
+    return graficos.dispersion(
+        filas,
+        x='magnitude',
+        y='depth',
+        color='tsunami',
+        title='Relación: Magnitud vs Profundidad',
+        labels={'magnitude': 'Magnitud', 'depth': 'Profundidad (km)'},
+        color_discrete_map={0: 'blue', 1: 'red'},
+        hover_data=['Year', 'latitude', 'longitude']
+    ).update_layout(height=400)
+
+
+def _dispersion_riesgo(filas):
+    return graficos.dispersion(
+        filas,
+        x='magnitude',
+        y='depth',
+        color='riesgo',
+        title='Relación: Magnitud vs Profundidad (color: riesgo del modelo)',
+        labels={'magnitude': 'Magnitud', 'depth': 'Profundidad (km)', 'riesgo': 'Riesgo'},
+        color_continuous_scale='RdBu_r',
+        range_color=(0, 1),
+        hover_data=['Year', 'latitude', 'longitude', 'tsunami']
+    ).update_layout(height=400)
+
+
+def _caja_magnitud_tsunami(filas):
+    return graficos.caja(
+        filas,
+        x='tsunami',
+        y='magnitude',
+        title='Distribución de Magnitudes vs Tsunami',
+        labels={'tsunami': 'Tsunami', 'magnitude': 'Magnitud'},
+        color='tsunami',
+        color_discrete_map={0: 'blue', 1: 'red'}
+    ).update_layout(height=400)
+
+
+def _histograma_profundidad(filas):
+    return graficos.histograma(
+        filas,
+        x='depth',
+        nbins=30,
+        title='Distribución de Profundidades (Filtrado)',
+        color='tsunami',
+        color_discrete_map={0: 'blue', 1: 'red'}
+    ).update_layout(height=400)
+
+
+def _mapa(filas):
+    return agregado_acotado(filas)[0]
+
+
+TAREAS = {
+    'histograma_magnitud': _histograma_magnitud,
+    'dispersion_magnitud_profundidad': _dispersion_magnitud_profundidad,
+    'dispersion_riesgo': _dispersion_riesgo,
+    'caja_magnitud_tsunami': _caja_magnitud_tsunami,
+    'histograma_profundidad': _histograma_profundidad,
+    'mapa': _mapa,
+}
+
+
+# Estado de cada proceso del pool: su propio motor sobre la última instantánea pedida
+_instantanea_pool = None
+_motor_pool = None
+
+
+def _correr(instantanea, nombre, filtro):
+    """Corre una tarea en un proceso del pool sobre `instantanea` (ruta, versión), la
+    del motor de quien la envió. Si es otra que la abierta, la abre antes."""
+    global _instantanea_pool, _motor_pool
+    if instantanea != _instantanea_pool:
+        ruta, version = instantanea
+        guardada = version_instantanea(ruta)
+        if guardada != version:
+            raise RuntimeError(f"instantánea {os.path.basename(ruta)} de la versión {guardada}, no {version}")
+        _motor_pool, _instantanea_pool = abrir(ruta), instantanea
+    return _motor_pool.memo(nombre, filtro, TAREAS[nombre])
+
+
+def _enlazar(origen, destino):
+    """Enlace duro de origen en destino (mismo archivo, mismas páginas); False si no se puede."""
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        os.link(origen, temporal)
+        os.replace(temporal, destino)
+        return True
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return False
+
+
+class PoolTareas:
+    """Procesos que corren las TAREAS sobre instantáneas del catálogo.
+
+    Cada motor se publica con publicar() en una ruta propia de este proceso y de
+    su versión (no en la compartida `ruta`, que otro servidor puede reemplazar
+    por la de sus datos), y cada tarea lleva la ruta y la versión que espera.
+    Se conservan las dos últimas, las que puede estar usando una página.
+    """
+
+    CONSERVAR = 2
+
+    def __init__(self, ruta, procesos):
+        self.ruta = ruta
+        self._publicadas = []
+        self._ejecutor = ProcessPoolExecutor(procesos)
+
+    def publicar(self, motor, version):
+        """Deja el motor de `version` para los procesos y devuelve su (ruta, versión). Si
+        la instantánea compartida es de esa versión se enlaza en lugar de copiarla; las
+        estadísticas (chicas) se guardan siempre las del motor."""
+        ruta = f"{os.path.splitext(self.ruta)[0]}.{os.getpid()}.{version}.feather"
+        if (version_instantanea(self.ruta) == version and _enlazar(self.ruta, ruta)
+                and version_instantanea(ruta) == version):
+            motor.estadisticas().guardar(_ruta_estadisticas(ruta))
+        else:
+            publicar(motor, ruta, version)
+        if ruta in self._publicadas:
+            self._publicadas.remove(ruta)
+        self._publicadas.append(ruta)
+        for vieja in self._publicadas[:-self.CONSERVAR]:
+            self._borrar(vieja)
+        self._publicadas = self._publicadas[-self.CONSERVAR:]
+        return ruta, version
+
+    @staticmethod
+    def _borrar(ruta):
+        for archivo in (ruta, _ruta_estadisticas(ruta)):
+            try:
+                os.remove(archivo)
+            except OSError:  # en Windows, si algún proceso todavía la tiene mapeada
+                pass
+
+    def enviar(self, instantanea, nombre, filtro):
+        return self._ejecutor.submit(_correr, instantanea, nombre, filtro)
+
+    def cerrar(self):
+        self._ejecutor.shutdown(cancel_futures=True)
+        for ruta in self._publicadas:
+            self._borrar(ruta)
+        self._publicadas = []
+
+
+class Tareas:
+    """Resultados de las TAREAS de un motor, memorizados por filtro.
+
+    Sin pool se calculan en este proceso (MotorFiltros.memo). Con pool se mandan a
+    sus procesos: anticipar() las envía todas juntas, así corren en paralelo
+    mientras la página dibuja lo que ya tiene, y resultado() espera la que pide.
+    El motor se publica para el pool (PoolTareas.publicar) como `version`.
+    """
+
+    def __init__(self, motor, pool=None, version="", tam_cache=256):
+        self.motor = motor
+        self.pool = pool
+        self._instantanea = pool.publicar(motor, version) if pool is not None else None
+        self._cache = CacheLRU(tam_cache)
+        self._pendientes = {}
+        self._bloqueo = threading.Lock()
+
+    def anticipar(self, filtro, nombres=tuple(TAREAS)):
+        if self.pool is None:
+            return
+        with self._bloqueo:
+            for nombre in nombres:
+                if (nombre, filtro) not in self._pendientes and (nombre, filtro) not in self._cache:
+                    self._pendientes[(nombre, filtro)] = self.pool.enviar(self._instantanea, nombre, filtro)
+
+    def _esperar(self, nombre, filtro):
+        with self._bloqueo:
+            futuro = self._pendientes.pop((nombre, filtro), None)
+        if futuro is None:
+            futuro = self.pool.enviar(self._instantanea, nombre, filtro)
+        return futuro.result()
+
+    def resultado(self, nombre, filtro):
+        if self.pool is None:
+            return self.motor.memo(nombre, filtro, TAREAS[nombre])
+        return self._cache.obtener((nombre, filtro), lambda: self._esperar(nombre, filtro))
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import datos
+from estadisticas import COLUMNAS_NUMERICAS, Resumen
+from filtros import Filtro, MotorFiltros, OPCIONES_TSUNAMI
+
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earthquake_data_tsunami.csv")
+
+
+def _comparar(obtenido, esperado):
+    assert list(obtenido.index) == list(esperado.index)
+    np.testing.assert_allclose(obtenido.to_numpy(), esperado.to_numpy(), rtol=0, atol=1e-9, equal_nan=True)
+
+
+def test_columna_constante_da_nan_como_pandas():
+    aleatorio = np.random.default_rng(0)
+    df = pd.DataFrame(aleatorio.normal(100, 5, (500, len(COLUMNAS_NUMERICAS))), columns=COLUMNAS_NUMERICAS)
+    df['tsunami'] = 1.0
+    df['gap'] = 37.3  # lejos de la referencia: el residuo de redondeo no es 0
+    referencia = np.zeros(len(COLUMNAS_NUMERICAS))
+    mitad = len(df) // 2
+    resumen = (Resumen.de_filas(df.to_numpy()[:mitad], referencia)
+               + Resumen.de_filas(df.to_numpy()[mitad:], referencia))
+    correlacion = resumen.correlacion()
+    assert correlacion[['tsunami', 'gap']].isna().all().all()
+    _comparar(correlacion, df.corr())
+
+
+def test_filtros_de_tsunami_como_pandas():
+    df = datos.leer_csv(RUTA_CSV)
+    motor = MotorFiltros(df)
+    anios = (int(df['Year'].min()), int(df['Year'].max()))
+    magnitud = (float(df['magnitude'].min()), float(df['magnitude'].max()))
+    for tsunami in OPCIONES_TSUNAMI:
+        for profundidad in ((0.0, float(df['depth'].max())), (10.0, 120.0)):
+            filtro = Filtro(anios, magnitud, profundidad, tsunami)
+            sub = df[df['tsunami'].isin(OPCIONES_TSUNAMI[tsunami]) & df['depth'].between(*profundidad)]
+            _comparar(motor.correlacion(filtro), sub[COLUMNAS_NUMERICAS].astype(float).corr())
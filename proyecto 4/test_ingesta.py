@@ -0,0 +1,91 @@
+import os
+import shutil
+
+import pytest
+
+import datos
+from datos import ESQUEMA
+from filtros import MotorFiltros
+from ingesta import Catalogo, Ingesta
+
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earthquake_data_tsunami.csv")
+
+
+def test_un_solo_proceso_ingresa_y_los_demas_suman_sus_segmentos(tmp_path, monkeypatch):
+    monkeypatch.setattr(datos, 'MAX_SEGMENTOS', 3)  # que también se combinen segmentos
+    ruta = str(tmp_path / "catalogo.csv")
+    shutil.copy(RUTA_CSV, ruta)
+    carpeta = tmp_path / "entrada"
+    carpeta.mkdir()
+    base = len(datos.cargar_catalogo(ruta))
+    ingestas = [Ingesta(Catalogo(MotorFiltros(datos.cargar_catalogo(ruta))), ruta, carpeta=str(carpeta))
+                for _ in range(3)]
+    eventos = datos.leer_csv(RUTA_CSV)[list(ESQUEMA)]
+    try:
+        for i in range(5):
+            eventos.iloc[i * 4:(i + 1) * 4].to_csv(carpeta / f"lote{i}.csv", index=False)
+            for ingesta in ingestas:
+                ingesta.revisar()
+        assert [ingesta.estado['lider'] for ingesta in ingestas] == [True, False, False]
+        # El que ingresa deja de hacerlo: otro toma el cerrojo y sigue
+        ingestas[0].soltar()
+        eventos.iloc[20:24].to_csv(carpeta / "lote5.csv", index=False)
+        for ingesta in ingestas[1:]:
+            ingesta.revisar()
+        assert ingestas[1].estado['lider']
+        ingestas[0].revisar()
+        for ingesta in ingestas:
+            assert len(ingesta.catalogo.df) == base + 24
+        assert len(datos.cargar_catalogo(ruta)) == base + 24
+    finally:
+        for ingesta in ingestas:
+            ingesta.soltar()
+
+
+class _Corte(Exception):
+    """El proceso se corta justo después de guardar el segmento."""
+
+
+def _cortar(*args, **kwargs):
+    raise _Corte()
+
+
+def test_un_corte_despues_del_segmento_no_duplica_el_lote(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "catalogo.csv")
+    shutil.copy(RUTA_CSV, ruta)
+    carpeta = tmp_path / "entrada"
+    carpeta.mkdir()
+    feed = tmp_path / "feed.csv"
+    base = len(datos.cargar_catalogo(ruta))
+    eventos = datos.leer_csv(RUTA_CSV)[list(ESQUEMA)]
+    eventos.iloc[:4].to_csv(carpeta / "lote.csv", index=False)
+    eventos.iloc[4:10].to_csv(feed, index=False)
+
+    def arrancar():
+        return Ingesta(Catalogo(MotorFiltros(datos.cargar_catalogo(ruta))), ruta, carpeta=str(carpeta),
+                       feed=str(feed))
+
+    primera = arrancar()
+    with monkeypatch.context() as parche:
+        parche.setattr(shutil, 'move', _cortar)
+        parche.setattr(datos, 'escribir_json', _cortar)
+        with pytest.raises(_Corte):
+            primera.revisar()  # el archivo
+        primera.carpeta = None
+        with pytest.raises(_Corte):
+            primera.revisar()  # el feed
+    primera.soltar()
+    assert len(datos.cargar_catalogo(ruta)) == base + 10
+    segunda = arrancar()
+    try:
+        segunda.revisar()
+        assert len(segunda.catalogo.df) == base + 10
+        assert not (carpeta / "lote.csv").exists()
+        with open(feed, "a") as f:
+            eventos.iloc[10:12].to_csv(f, index=False, header=False)
+        segunda.revisar()
+        assert len(segunda.catalogo.df) == base + 12
+        assert len(datos.cargar_catalogo(ruta)) == base + 12
+    finally:
+        segunda.soltar()
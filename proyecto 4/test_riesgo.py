@@ -0,0 +1,29 @@
+import io
+import json
+import os
+
+import pandas as pd
+
+import datos
+from regiones import agregar_ubicacion
+from riesgo import ModeloRiesgo, entrenar, evaluar_flujo
+
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "earthquake_data_tsunami.csv")
+
+
+def test_evento_incompleto_o_mal_formado_no_corta_el_flujo():
+    df = agregar_ubicacion(datos.leer_csv(RUTA_CSV))
+    modelo = ModeloRiesgo(entrenar(df))
+    evento = df.iloc[0]
+    completo = {nombre: float(evento[nombre]) for nombre in ('magnitude', 'depth', 'latitude', 'longitude')}
+    como_texto = {nombre: str(valor) for nombre, valor in completo.items()}
+    entrada = io.StringIO("\n".join([json.dumps({'magnitude': 6.5}), "{no es JSON", json.dumps(completo),
+                                     json.dumps(como_texto)]) + "\n")
+    salida = io.StringIO()
+    evaluar_flujo(modelo, entrada, salida)
+    sin_ubicacion, ilegible, numerico, texto = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+    assert 0 < sin_ubicacion['riesgo'] < 1
+    assert 'error' in ilegible
+    assert numerico['riesgo'] == texto['riesgo']
+    assert abs(numerico['riesgo'] - modelo.puntuar(pd.DataFrame([completo]))[0]) < 1e-4